@@ -0,0 +1,159 @@
+import os
+import asyncio
+import logging
+
+
+TRACKING_FLUSH_INTERVAL = float(os.getenv("TRACKING_FLUSH_INTERVAL", 5))
+TRACKING_MAX_BATCH = int(os.getenv("TRACKING_MAX_BATCH", 500))
+INCREMENT_FUNCTION = "increment_stacking_activity"
+
+
+class ActivityWriter:
+    """
+    Write-behind aggregator for stacking activity.
+
+    `add` only updates in-memory per-user deltas and queues the
+    message_tracking row, so embeds are processed without waiting on
+    Supabase. `flush` sends all the deltas in one call to the
+    `increment_stacking_activity` database function (see
+    stacking_activity.sql), which adds them to the stored totals atomically,
+    and batch-inserts the queued message rows. Failed writes are kept and
+    retried on the next flush.
+
+    With a `MessageJournal`, each message is journaled before it is counted:
+    messages already in the journal are ignored, and activity the journal
+    hasn't seen committed yet (e.g. after a crash) is queued again on start.
+    Each inserted batch of message rows is committed on its own, so a flush
+    failing part way never inserts the earlier batches again.
+
+    `client` only needs the supabase-py calls used here:
+    `client.rpc(name, params).execute()` and
+    `client.table(name).insert(rows).execute()`.
+    """
+
+    def __init__(
+        self,
+        client,
+        journal=None,
+        flush_interval: float = TRACKING_FLUSH_INTERVAL,
+        max_batch: int = TRACKING_MAX_BATCH,
+    ):
+        self.client = client
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.deltas = {}
+        self.messages = []
+        self.flushed_messages = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+        if journal is not None:
+            self._resume()
+
+    def _resume(self):
+        """Queue the journaled activity that was not stored before the last shutdown."""
+        for entry in self.journal.pending("activity"):
+            self._queue(entry["user"], entry["coins"], None)
+        for entry in self.journal.pending("messages"):
+            self.messages.append((entry["seq"], {"username": entry["user"], "message_id": entry["id"]}))
+        if self.deltas or self.messages:
+            logging.info(f"Resumed {len(self.messages)} unwritten message(s) from the journal")
+
+    def _queue(self, username: str, coins_earned: int, message_id, count: int = 1, seq: int = 0):
+        delta = self.deltas.setdefault(username, {"coins_earned": 0, "count": 0})
+        delta["coins_earned"] += coins_earned
+        delta["count"] += count
+        if message_id is not None:
+            # Rows are queued with their journal sequence number, 0 without a journal
+            self.messages.append((seq, {"username": username, "message_id": message_id}))
+
+    def add(self, username: str, coins_earned: int, message_id: int, count: int = 1) -> bool:
+        """Record activity for a user, written on the next flush; False if already counted."""
+        seq = 0
+        if self.journal is not None:
+            seq = self.journal.record(message_id, username, coins_earned)
+            if not seq:
+                logging.info(f"Skipping already counted message {message_id}")
+                return False
+        self._queue(username, coins_earned, message_id, count, seq)
+
+        if len(self.messages) >= self.max_batch and self._task is not None:
+            asyncio.get_running_loop().create_task(self.flush())
+        return True
+
+    def pending(self) -> int:
+        return len(self.messages)
+
+    def _increment(self, deltas: dict):
+        rows = [{"username": user, **delta} for user, delta in deltas.items()]
+        self.client.rpc(INCREMENT_FUNCTION, {"deltas": rows}).execute()
+
+    def _insert_messages(self, rows: list[dict]):
+        self.client.table("message_tracking").insert(rows).execute()
+
+    async def _commit(self, stage: str, seq: int):
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.commit, stage, seq)
+
+    def _restore(self, deltas: dict, messages: list[dict]):
+        """Put unwritten activity back in front of anything added since."""
+        for username, delta in deltas.items():
+            current = self.deltas.setdefault(username, {"coins_earned": 0, "count": 0})
+            current["coins_earned"] += delta["coins_earned"]
+            current["count"] += delta["count"]
+        self.messages[:0] = messages
+
+    async def flush(self):
+        """Write the pending deltas and message rows without blocking the event loop."""
+        async with self._lock:
+            deltas, self.deltas = self.deltas, {}
+            messages, self.messages = self.messages, []
+            if not deltas and not messages:
+                return
+            # Everything journaled so far is part of this flush
+            seq = self.journal.seq if self.journal is not None else 0
+            if self.journal is not None:
+                await asyncio.to_thread(self.journal.sync)
+
+            try:
+                if deltas:
+                    await asyncio.to_thread(self._increment, deltas)
+            except Exception as e:
+                print(f"Error writing stacking activity: {e}")
+                self._restore(deltas, messages)
+                return
+            await self._commit("activity", seq)
+
+            try:
+                for start in range(0, len(messages), self.max_batch):
+                    batch = messages[start : start + self.max_batch]
+                    await asyncio.to_thread(self._insert_messages, [row for _, row in batch])
+                    self.flushed_messages += len(batch)
+                    await self._commit("messages", batch[-1][0])
+            except Exception as e:
+                print(f"Error writing message tracking: {e}")
+                self._restore({}, messages[start:])
+                return
+            await self._commit("messages", seq)
+
+            logging.info(
+                f"Flushed activity for {len(deltas)} user(s) and {len(messages)} message(s)"
+            )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so stopping never abandons a write half way
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        """Flush every `flush_interval` seconds in the background."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flushes and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
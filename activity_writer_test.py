@@ -0,0 +1,40 @@
+import asyncio
+import unittest
+from activity_writer import ActivityWriter
+from fake_supabase import FakeSupabase
+
+
+class ActivityWriterTest(unittest.TestCase):
+
+    def test_flush_aggregates_per_user(self):
+        client = FakeSupabase()
+        writer = ActivityWriter(client, max_batch=2)
+        writer.add("alice", 100, 1)
+        writer.add("bob", 50, 2)
+        writer.add("alice", 100, 3)
+
+        asyncio.run(writer.flush())
+        self.assertEqual(client.activity["alice"], {"coins_earned": 200, "count": 2})
+        self.assertEqual(client.activity["bob"], {"coins_earned": 50, "count": 1})
+        self.assertEqual([r["message_id"] for r in client.tables["message_tracking"]], [1, 2, 3])
+        # One increment call and two message batches
+        self.assertEqual(client.calls, 3)
+        self.assertEqual(writer.pending(), 0)
+
+    def test_failed_flush_is_retried(self):
+        client = FakeSupabase()
+        writer = ActivityWriter(client)
+        writer.add("alice", 100, 1)
+        client.fail = True
+        asyncio.run(writer.flush())
+        self.assertEqual(client.activity, {})
+        writer.add("alice", 100, 2)
+
+        client.fail = False
+        asyncio.run(writer.flush())
+        self.assertEqual(client.activity["alice"], {"coins_earned": 200, "count": 2})
+        self.assertEqual(len(client.tables["message_tracking"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
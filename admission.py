@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+import logging
+from metrics import REGISTRY
+
+
+ASK_USER_BURST = int(os.getenv("ASK_USER_BURST", 3))
+ASK_USER_PER_MINUTE = float(os.getenv("ASK_USER_PER_MINUTE", 3))
+ASK_CHANNEL_BURST = int(os.getenv("ASK_CHANNEL_BURST", 10))
+ASK_CHANNEL_PER_MINUTE = float(os.getenv("ASK_CHANNEL_PER_MINUTE", 20))
+MAX_BUCKETS = 10_000
+
+LLM_CALLS_SAVED = REGISTRY.counter(
+    "rag_llm_calls_saved_total", "Questions answered or rejected without an LLM call, by reason"
+)
+
+
+class RateLimited(Exception):
+    """Raised when a user or channel has asked too many questions recently."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope} rate limit, retry after {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Holds up to `burst` tokens, refilled at `rate` tokens per second."""
+
+    def __init__(self, burst: int, rate: float, now: float):
+        self.burst = burst
+        self.rate = rate
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until a token is available; 0 if one is available now."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def is_full(self, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= self.burst
+
+
+class Admission:
+    """
+    Per-user and per-channel token buckets for questions.
+
+    A question takes one token from its user's bucket and one from its
+    channel's bucket, or neither if either is empty, so one user can't use up
+    the LLM quota and a busy channel can't starve the others. Buckets that
+    have refilled completely are forgotten once there are `max_buckets`.
+    """
+
+    def __init__(
+        self,
+        user_burst: int = ASK_USER_BURST,
+        user_per_minute: float = ASK_USER_PER_MINUTE,
+        channel_burst: int = ASK_CHANNEL_BURST,
+        channel_per_minute: float = ASK_CHANNEL_PER_MINUTE,
+        max_buckets: int = MAX_BUCKETS,
+        clock=time.monotonic,
+    ):
+        self.limits = {
+            "user": (user_burst, user_per_minute / 60),
+            "channel": (channel_burst, channel_per_minute / 60),
+        }
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.buckets = {}
+
+    def _bucket(self, scope: str, key, now: float) -> TokenBucket:
+        bucket = self.buckets.get((scope, key))
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                self._prune(now)
+            burst, rate = self.limits[scope]
+            bucket = self.buckets[(scope, key)] = TokenBucket(burst, rate, now)
+        return bucket
+
+    def _prune(self, now: float):
+        self.buckets = {k: b for k, b in self.buckets.items() if not b.is_full(now)}
+
+    def admit(self, user_id, channel_id):
+        """Take a token for the question, or raise `RateLimited` with the wait before retrying."""
+        now = self.clock()
+        buckets = [("user", self._bucket("user", user_id, now))]
+        if channel_id is not None:
+            buckets.append(("channel", self._bucket("channel", channel_id, now)))
+        for scope, bucket in buckets:
+            retry_after = bucket.retry_after(now)
+            if retry_after:
+                LLM_CALLS_SAVED.inc(reason=f"{scope}_limit")
+                raise RateLimited(scope, retry_after)
+        for _, bucket in buckets:
+            bucket.tokens -= 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one computation.
+
+    The first caller for a key runs it; callers arriving while it is still
+    running wait for the same result (or exception) instead of starting
+    their own.
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+        self.coalesced = 0
+
+    async def run(self, key, compute) -> tuple:
+        """Return `(result, shared)`; `shared` is True if another caller computed the result."""
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            LLM_CALLS_SAVED.inc(reason="coalesced")
+            logging.info(f"Coalesced question onto one in flight ({self.coalesced} so far)")
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # This caller was cancelled
+                return await self.run(key, compute)  # The caller computing it was cancelled
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self.in_flight[key]
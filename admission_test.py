@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+from admission import Admission, RateLimited, SingleFlight
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AdmissionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.admission = Admission(
+            user_burst=2, user_per_minute=6, channel_burst=3, channel_per_minute=60, clock=self.clock
+        )
+
+    def test_user_bucket_refills(self):
+        self.admission.admit("alice", "general")
+        self.admission.admit("alice", "general")
+        with self.assertRaises(RateLimited) as raised:
+            self.admission.admit("alice", "general")
+        self.assertEqual(raised.exception.scope, "user")
+        self.assertAlmostEqual(raised.exception.retry_after, 10)
+
+        self.clock.now = 10
+        self.admission.admit("alice", "general")
+
+    def test_channel_bucket_is_shared(self):
+        self.admission.admit("alice", "general")
+        self.admission.admit("bob", "general")
+        self.admission.admit("carol", "general")
+        with self.assertRaises(RateLimited) as raised:
+            self.admission.admit("dave", "general")
+        self.assertEqual(raised.exception.scope, "channel")
+        # A rejected question takes no token from the user's bucket either
+        self.admission.admit("dave", "help")
+        self.admission.admit("dave", "help")
+
+    def test_full_buckets_are_forgotten(self):
+        admission = Admission(max_buckets=4, clock=self.clock)
+        for user in range(4):
+            admission.admit(user, None)
+        self.clock.now = 3600
+        admission.admit("new", None)
+        self.assertEqual(list(admission.buckets), [("user", "new")])
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one_computation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.run("q", compute) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 4)
+        self.assertTrue(all(answer == "answer" for answer, _ in results))
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(flight.in_flight, {})
+
+        # Once finished, the next call computes again
+        await flight.run("q", compute)
+        self.assertEqual(len(calls), 2)
+
+    async def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("no answer")
+
+        results = await asyncio.gather(
+            flight.run("q", compute), flight.run("q", compute), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    async def test_waiter_takes_over_when_first_caller_is_cancelled(self):
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "answer"
+
+        first = asyncio.ensure_future(flight.run("q", slow))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.run("q", fast))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, ("answer", False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,309 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+ANSWER_CACHE_DIR = "answer_cache"
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 60 * 60))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 500))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.92))
+
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase the question and drop punctuation and repeated whitespace."""
+    question = NON_WORD_PATTERN.sub(" ", question.lower())
+    return WHITESPACE_PATTERN.sub(" ", question).strip()
+
+
+class AnswerCache:
+    """
+    Cache of previous answers, keyed by the normalized question.
+
+    A question that misses the exact lookup is embedded and compared against
+    the embeddings of the cached questions; the closest one is reused if its
+    cosine similarity is at least `similarity`. Entries expire after `ttl`
+    seconds, the least recently used are evicted past `max_entries`, and the
+    whole cache is dropped when the knowledge base version changes.
+
+    A `read_only` cache (in the secondary processes of a sharded bot) never
+    writes `cache_dir`; it memory-maps the vectors persisted by the primary
+    process and `refresh` picks up the entries it adds. Each save writes the
+    vectors under a new name, which `entries.json` records, so a reader
+    never pairs entries with the vectors of another save.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        kb_version: str = "",
+        cache_dir: str = ANSWER_CACHE_DIR,
+        ttl: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        read_only: bool = False,
+    ):
+        self.embeddings = embeddings
+        self.kb_version = kb_version
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.read_only = read_only
+        self.loaded_mtime = None
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._matrix = None
+        self._matrix_keys = []
+        self._matrix_created = None
+        self._saves = 0
+        self._saved = 0
+        self._vectors_name = None
+        self._save_lock = threading.Lock()
+        self.load()
+
+    @property
+    def entries_file(self):
+        return os.path.join(self.cache_dir, "entries.json")
+
+    def _remove_old_vectors(self, keep: set):
+        """Remove the vector files no longer referenced, keeping the previous save's for readers."""
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("vectors") and name.endswith(".npy") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError as e:
+                    print(f"Error removing answer cache vectors {name}: {e}")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
+
+    def _is_expired(self, entry: dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl
+
+    def _evict(self):
+        for key in [k for k, entry in self.entries.items() if self._is_expired(entry)]:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+    def _closest(self, vector):
+        """Return the key of the most similar unexpired cached question and its similarity."""
+        if self._matrix is None:
+            self._matrix_keys = [
+                k for k, entry in self.entries.items() if entry.get("vector") is not None
+            ]
+            self._matrix = (
+                np.array(
+                    [self.entries[k]["vector"] for k in self._matrix_keys],
+                    dtype=np.float32,
+                )
+                if self._matrix_keys
+                else None
+            )
+            self._matrix_created = np.array(
+                [self.entries[k]["created_at"] for k in self._matrix_keys], dtype=np.float64
+            )
+        if self._matrix is None:
+            return None, 0.0
+
+        scores = self._matrix @ vector
+        scores[time.time() - self._matrix_created > self.ttl] = -np.inf
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            return None, 0.0
+        return self._matrix_keys[best], float(scores[best])
+
+    def _lookup(self, question: str, vector=None):
+        """Return the cached answer and how it matched ("exact", "semantic" or `None`)."""
+        key = normalize_question(question)
+        entry = self.entries.get(key)
+        if entry and not self._is_expired(entry):
+            self.entries.move_to_end(key)
+            return entry["answer"], "exact"
+
+        if vector is not None and self.similarity < 1:
+            closest, score = self._closest(vector)
+            if closest and score >= self.similarity:
+                entry = self.entries[closest]
+                logging.info(
+                    f"Answer cache semantic hit ({score:.3f}): {question!r} ~ {entry['question']!r}"
+                )
+                self.entries.move_to_end(closest)
+                return entry["answer"], "semantic"
+
+        return None, None
+
+    def _count(self, match):
+        if match == "exact":
+            self.hits += 1
+        elif match == "semantic":
+            self.semantic_hits += 1
+        else:
+            self.misses += 1
+
+    async def aembed(self, question: str):
+        """Return the normalized embedding of the question, or `None` if unavailable."""
+        if self.embeddings is None or self.similarity >= 1:
+            return None
+        return self._normalize(await self.embeddings.aembed_query(question))
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aget(self, question: str, embed: bool = True):
+        """
+        Look up a cached answer, embedding the question only if needed.
+
+        Returns a tuple `(answer, vector)`; pass `vector` back to `aput` on a
+        miss so the question isn't embedded twice. With `embed=False` only the
+        exact lookup is tried and `vector` is `None`.
+        """
+        answer, match = self._lookup(question)
+        vector = None
+        if match is None and embed:
+            try:
+                vector = await self.aembed(question)
+            except Exception as e:
+                logging.error(f"Error embedding question for answer cache: {e}")
+            if vector is not None:
+                answer, match = self._lookup(question, vector)
+        self._count(match)
+        return answer, vector
+
+    async def aput(self, question: str, answer: str, vector=None):
+        """Cache the answer to a question and persist the cache from a worker thread."""
+        key = normalize_question(question)
+        self.entries[key] = {
+            "question": question,
+            "answer": answer,
+            "created_at": time.time(),
+            "vector": vector,
+        }
+        self.entries.move_to_end(key)
+        self._evict()
+        if not self.read_only:
+            await asyncio.to_thread(self._write, self._snapshot())
+
+    def invalidate(self, kb_version: str = None):
+        """Drop all cached answers, e.g. after the knowledge base is rebuilt."""
+        if kb_version is not None:
+            self.kb_version = kb_version
+        self.entries.clear()
+        self._matrix = None
+        self.save()
+        logging.info(f"Answer cache invalidated (knowledge base {self.kb_version})")
+
+    def load(self):
+        """Load the persisted cache, discarding it if it belongs to another knowledge base."""
+        if not os.path.exists(self.entries_file):
+            return
+        try:
+            mtime = os.path.getmtime(self.entries_file)
+            with open(self.entries_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("kb_version") != self.kb_version:
+                logging.info("Answer cache is from an older knowledge base, discarding it")
+                self.loaded_mtime = mtime
+                return
+
+            vectors_name = data.get("vectors_file")
+            vectors = (
+                np.load(
+                    os.path.join(self.cache_dir, vectors_name),
+                    mmap_mode="r" if self.read_only else None,
+                )
+                if vectors_name
+                else None
+            )
+            for entry in data.get("entries", []):
+                if self.read_only and normalize_question(entry["question"]) in self.entries:
+                    continue  # Keep the entry this process already has
+                index = entry.pop("vector_index", None)
+                entry["vector"] = (
+                    vectors[index] if vectors is not None and index is not None else None
+                )
+                self.entries[normalize_question(entry["question"])] = entry
+            self._matrix = None
+            self._evict()
+            self._vectors_name = vectors_name
+            self.loaded_mtime = mtime
+        except Exception as e:
+            print(f"Error loading answer cache: {e}")
+            if not self.read_only:
+                self.entries.clear()  # A reader keeps its entries and retries on the next refresh
+
+    def refresh(self):
+        """Load the entries persisted since the last load, e.g. by another process."""
+        try:
+            mtime = os.path.getmtime(self.entries_file)
+        except OSError:
+            return
+        if mtime != self.loaded_mtime:
+            self.load()
+
+    def _snapshot(self) -> tuple:
+        """The entries to persist, numbered so an older snapshot never overwrites a newer one."""
+        self._saves += 1
+        entries = [dict(entry) for entry in self.entries.values()]
+        return self._saves, self.kb_version, entries
+
+    def _write(self, snapshot: tuple):
+        seq, kb_version, entries = snapshot
+        with self._save_lock:
+            if seq < self._saved:
+                return
+            self._saved = seq
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                vectors = []
+                for entry in entries:
+                    vector = entry.pop("vector")
+                    if vector is not None:
+                        entry["vector_index"] = len(vectors)
+                        vectors.append(vector)
+
+                vectors_name = f"vectors-{time.time_ns()}-{seq}.npy" if vectors else None
+                if vectors:
+                    path = os.path.join(self.cache_dir, vectors_name)
+                    with open(path + ".tmp", "wb") as f:
+                        np.save(f, np.array(vectors, dtype=np.float32))
+                    os.replace(path + ".tmp", path)
+                with open(self.entries_file + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(
+                        {"kb_version": kb_version, "vectors_file": vectors_name, "entries": entries},
+                        f,
+                    )
+                os.replace(self.entries_file + ".tmp", self.entries_file)
+                self._remove_old_vectors({vectors_name, self._vectors_name})
+                self._vectors_name = vectors_name
+            except Exception as e:
+                print(f"Error saving answer cache: {e}")
+
+    def save(self):
+        """Persist the cache to `cache_dir`."""
+        if self.read_only:
+            return
+        self._write(self._snapshot())
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+from answer_cache import AnswerCache, normalize_question
+
+
+class FakeEmbeddings:
+
+    vectors = {
+        "when will my withdrawal arrive": [1.0, 0.0, 0.0],
+        "when does my withdrawal arrive": [0.99, 0.1, 0.0],
+        "how do i link my wallet": [0.0, 1.0, 0.0],
+    }
+
+    def embed_query(self, text):
+        return self.vectors[normalize_question(text)]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class AnswerCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_cache(self, **kwargs):
+        kwargs.setdefault("embeddings", FakeEmbeddings())
+        kwargs.setdefault("kb_version", "v1")
+        return AnswerCache(cache_dir=self.tmp.name, **kwargs)
+
+    async def cached(self, cache, question):
+        """The exactly matching cached answer, without embedding the question."""
+        return (await cache.aget(question, embed=False))[0]
+
+    async def test_exact_match_after_normalization(self):
+        cache = self.make_cache()
+        await cache.aput("When will my withdrawal arrive?", "7 business days")
+        answer, _ = await cache.aget("  when will my WITHDRAWAL arrive  ")
+        self.assertEqual(answer, "7 business days")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    async def test_semantic_match(self):
+        cache = self.make_cache(similarity=0.9)
+        _, vector = await cache.aget("When will my withdrawal arrive?")
+        await cache.aput("When will my withdrawal arrive?", "7 business days", vector)
+
+        answer, _ = await cache.aget("When does my withdrawal arrive?")
+        self.assertEqual(answer, "7 business days")
+        answer, _ = await cache.aget("How do I link my wallet?")
+        self.assertIsNone(answer)
+        self.assertEqual(cache.stats()["semantic_hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    async def test_lookup_without_embedding(self):
+        cache = self.make_cache(similarity=0.9)
+        await cache.aput("When will my withdrawal arrive?", "7 business days", [1.0, 0.0, 0.0])
+        answer, vector = await cache.aget("When does my withdrawal arrive?", embed=False)
+        self.assertIsNone(answer)
+        self.assertIsNone(vector)
+
+    async def test_ttl_and_lru_eviction(self):
+        cache = self.make_cache(max_entries=2)
+        await cache.aput("a", "1")
+        await cache.aput("b", "2")
+        await cache.aget("a", embed=False)
+        await cache.aput("c", "3")
+        self.assertIsNone(await self.cached(cache, "b"))
+        self.assertEqual(await self.cached(cache, "a"), "1")
+
+        cache.ttl = -1
+        self.assertIsNone(await self.cached(cache, "a"))
+
+    async def test_expired_closest_match_does_not_hide_a_valid_one(self):
+        cache = self.make_cache(similarity=0.9)
+        await cache.aput("When will my withdrawal arrive?", "old answer", [1.0, 0.0, 0.0])
+        await cache.aput("When does my withdrawal arrive?", "7 business days", [0.99, 0.1, 0.0])
+        cache.entries["when will my withdrawal arrive"]["created_at"] -= cache.ttl + 1
+        cache._matrix = None
+
+        answer, _ = await cache.aget("when will my withdrawal arrive")
+        self.assertEqual(answer, "7 business days")
+
+    async def test_aput_persists_off_the_event_loop(self):
+        cache = self.make_cache()
+        await cache.aput("When will my withdrawal arrive?", "7 business days", [1.0, 0.0, 0.0])
+        cache._write((0, "v1", []))  # A stale snapshot finishing late is ignored
+        reloaded = self.make_cache()
+        self.assertEqual(await self.cached(reloaded, "when will my withdrawal arrive"), "7 business days")
+
+    async def test_persists_until_knowledge_base_changes(self):
+        cache = self.make_cache()
+        await cache.aput("When will my withdrawal arrive?", "7 business days", [1.0, 0.0, 0.0])
+
+        reloaded = self.make_cache()
+        self.assertEqual(await self.cached(reloaded, "when will my withdrawal arrive"), "7 business days")
+        self.assertEqual(list(reloaded.entries.values())[0]["vector"].tolist(), [1.0, 0.0, 0.0])
+
+        rebuilt = self.make_cache(kb_version="v2")
+        self.assertIsNone(await self.cached(rebuilt, "when will my withdrawal arrive"))
+
+    async def test_read_only_cache_follows_the_writer(self):
+        writer = self.make_cache()
+        await writer.aput("When will my withdrawal arrive?", "7 business days", [1.0, 0.0, 0.0])
+        reader = self.make_cache(read_only=True)
+        await reader.aput("How do I link my wallet?", "From your profile", [0.0, 1.0, 0.0])
+
+        answer, _ = await reader.aget("when does my withdrawal arrive")
+        self.assertEqual(answer, "7 business days")
+
+        await writer.aput("How do I link my wallet?", "Open settings", [0.0, 1.0, 0.0])
+        reader.loaded_mtime = -1  # Both writes may fall within the file system's mtime resolution
+        reader.refresh()
+        # The reader keeps its own answer and never writes the shared files
+        self.assertEqual((await reader.aget("how do i link my wallet"))[0], "From your profile")
+        self.assertEqual(len(self.make_cache().entries), 2)
+
+    async def test_entries_are_paired_with_the_vectors_of_their_save(self):
+        writer = self.make_cache()
+        await writer.aput("When will my withdrawal arrive?", "7 business days", [1.0, 0.0, 0.0])
+        await writer.aput("How do I link my wallet?", "Open settings", [0.0, 1.0, 0.0])
+        entries_file = os.path.join(self.tmp.name, "entries.json")
+        shutil.copyfile(entries_file, entries_file + ".old")
+
+        # The next save lists the entries, and so their vectors, in another order
+        await writer.aget("when will my withdrawal arrive", embed=False)
+        writer.save()
+        # A reader loading the entries.json it read before that save still gets their vectors
+        os.replace(entries_file + ".old", entries_file)
+        reader = self.make_cache(read_only=True)
+        self.assertEqual(reader.entries["how do i link my wallet"]["vector"].tolist(), [0.0, 1.0, 0.0])
+
+        writer.save()
+        writer.save()
+        # Only the vectors of the last two saves are kept
+        self.assertEqual(len([n for n in os.listdir(self.tmp.name) if n.endswith(".npy")]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import re
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 150))
+MIN_BODY_CHUNK_SIZE = 200
+
+# Records written by eda-data.py: "Title: ...\nURL: ...\nBody: ...", separated by blank lines
+ARTICLE_PATTERN = re.compile(
+    r"^Title: (?P<title>[^\n]*)\nURL: (?P<url>[^\n]*)\nBody: (?P<body>.*?)(?=\n\s*\nTitle: |\Z)",
+    re.MULTILINE | re.DOTALL,
+)
+ARTICLE_ID_PATTERN = re.compile(r"/articles/(\d+)")
+
+
+def parse_articles(text: str, source: str = "") -> list[Document]:
+    """Parse the cleaned data into one document per article, with its title and URL as metadata."""
+    articles = []
+    for match in ARTICLE_PATTERN.finditer(text):
+        title = match.group("title").strip()
+        url = match.group("url").strip()
+        body = match.group("body").strip()
+        if not body:
+            continue
+
+        article_id = ARTICLE_ID_PATTERN.search(url)
+        articles.append(
+            Document(
+                page_content=body,
+                metadata={
+                    "title": title,
+                    "url": url,
+                    "article_id": article_id.group(1) if article_id else url,
+                    "source": source,
+                },
+            )
+        )
+    return articles
+
+
+def load_articles(file_path: str) -> list[Document]:
+    """Load the articles from a cleaned data file."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return parse_articles(f.read(), source=file_path)
+    except Exception as e:
+        print(f"Error loading articles: {e}")
+        return []
+
+
+def article_header(article: Document) -> str:
+    return f"Title: {article.metadata['title']}\nURL: {article.metadata['url']}\nBody: "
+
+
+def chunk_articles(
+    articles: list[Document],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+) -> list[Document]:
+    """
+    Split each article into overlapping chunks that never cross article boundaries.
+
+    Every chunk repeats the article's Title/URL header, so it can be cited on
+    its own, and is at most `chunk_size` characters long including the header
+    (unless the header alone leaves less than `MIN_BODY_CHUNK_SIZE`).
+    """
+    chunks = []
+    for article in articles:
+        header = article_header(article)
+        body_size = max(chunk_size - len(header), MIN_BODY_CHUNK_SIZE)
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=body_size,
+            chunk_overlap=min(chunk_overlap, body_size // 2),
+            separators=["\n\n", "\n", ". ", " ", ""],
+            keep_separator="end",
+        )
+        parts = splitter.split_text(article.page_content)
+        for index, part in enumerate(parts):
+            chunks.append(
+                Document(
+                    page_content=header + part,
+                    metadata={
+                        **article.metadata,
+                        "chunk": index,
+                        "chunks": len(parts),
+                    },
+                )
+            )
+    return chunks
+
+
+def chunking_settings() -> str:
+    """Describe the chunking so an index built with other settings is treated as stale."""
+    return f"articles-{CHUNK_SIZE}-{CHUNK_OVERLAP}"
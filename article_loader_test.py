@@ -0,0 +1,35 @@
+import unittest
+from article_loader import parse_articles, chunk_articles
+
+
+DATA = (
+    "Title: Withdrawals\n"
+    "URL: https://stackuphelpcentre.zendesk.com/hc/en-us/articles/111-Withdrawals\n"
+    "Body: " + "Withdrawals take seven business days. " * 60 + "\n\n\n"
+    "Title: Wallets\n"
+    "URL: https://stackuphelpcentre.zendesk.com/hc/en-us/articles/222-Wallets\n"
+    "Body: Link your wallet from the profile page.\n\n\n"
+)
+
+
+class ArticleLoaderTest(unittest.TestCase):
+
+    def test_parses_one_document_per_article(self):
+        articles = parse_articles(DATA)
+        self.assertEqual([a.metadata["title"] for a in articles], ["Withdrawals", "Wallets"])
+        self.assertEqual(articles[1].metadata["article_id"], "222")
+        self.assertEqual(articles[1].page_content, "Link your wallet from the profile page.")
+
+    def test_chunks_repeat_header_and_stay_within_article(self):
+        chunks = chunk_articles(parse_articles(DATA), chunk_size=500, chunk_overlap=50)
+        withdrawal_chunks = [c for c in chunks if c.metadata["article_id"] == "111"]
+
+        self.assertGreater(len(withdrawal_chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk.page_content), 500)
+            self.assertTrue(chunk.page_content.startswith(f"Title: {chunk.metadata['title']}\n"))
+        self.assertNotIn("wallet", " ".join(c.page_content for c in withdrawal_chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import aclosing
+from metrics import ERRORS, REGISTRY, STAGE_SECONDS, StageTimer
+
+
+MAX_CONCURRENT_ASKS = int(os.getenv("MAX_CONCURRENT_ASKS", 4))
+MAX_QUEUED_ASKS = int(os.getenv("MAX_QUEUED_ASKS", 50))
+
+
+class AskQueueFull(Exception):
+    """Raised when too many questions are already waiting for an answer."""
+
+
+class AskQueue:
+    """
+    Runs RAG chain calls on the event loop with a bounded concurrency.
+
+    Up to `max_concurrent` questions are answered at the same time through
+    `ainvoke`, so their embedding, retrieval and LLM latency overlap. Extra
+    questions wait their turn, and once `max_queued` are waiting new ones are
+    rejected with `AskQueueFull` instead of piling up.
+    """
+
+    def __init__(
+        self, max_concurrent: int = MAX_CONCURRENT_ASKS, max_queued: int = MAX_QUEUED_ASKS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.running = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def is_full(self) -> bool:
+        """Check whether a new question would be rejected."""
+        return self.waiting >= self.max_queued
+
+    def position(self) -> int:
+        """Place a new question would take in line; 0 if a slot is free."""
+        return self.waiting + 1 if self.running >= self.max_concurrent else 0
+
+    async def _acquire(self):
+        if self.is_full():
+            ERRORS.inc(stage="queue_full")
+            raise AskQueueFull(f"{self.waiting} question(s) already waiting")
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="queue_wait")
+        self.running += 1
+
+    def _release(self):
+        self.running -= 1
+        self._semaphore.release()
+
+    def _finished(self, timer: StageTimer, started: float, error: bool):
+        total = time.perf_counter() - started
+        STAGE_SECONDS.observe(total, stage="total")
+        if error:
+            ERRORS.inc(stage="chain")
+        timings = ", ".join(
+            f"{k}={v:.3f}s" if isinstance(v, float) else f"{k}={v}"
+            for k, v in timer.timings.items()
+        )
+        logging.info(f"RAG chain {'failed' if error else 'answered'} in {total:.3f}s ({timings})")
+
+    async def invoke(self, rag_chain, inputs: dict) -> dict:
+        """Run `rag_chain.ainvoke(inputs)` once a slot is free."""
+        await self._acquire()
+        timer = StageTimer()
+        started = time.perf_counter()
+        error = True
+        try:
+            response = await rag_chain.ainvoke(inputs, config={"callbacks": [timer]})
+            error = False
+            return response
+        finally:
+            self._release()
+            self._finished(timer, started, error)
+
+    async def stream(self, rag_chain, inputs: dict):
+        """Yield the chunks of `rag_chain.astream(inputs)`, holding a slot until the stream ends."""
+        await self._acquire()
+        timer = StageTimer()
+        started = time.perf_counter()
+        error = True
+        try:
+            async for chunk in rag_chain.astream(inputs, config={"callbacks": [timer]}):
+                yield chunk
+            error = False
+        finally:
+            self._release()
+            self._finished(timer, started, error)
+
+    def register_metrics(self):
+        """Export the queue depth on /metrics."""
+        REGISTRY.gauge(
+            "rag_ask_queue",
+            "Questions being answered or waiting for a slot",
+            lambda: {"running": self.running, "waiting": self.waiting},
+            label="state",
+        )
+
+    async def answer(self, question: str, rag_chain) -> str:
+        """Retrieve an answer to the given question without blocking the event loop."""
+        response = await self.invoke(rag_chain, {"input": question})
+        return response.get("answer", "I don't know.")
+
+    async def stream_answer(self, question: str, rag_chain):
+        """
+        Yield the answer to the given question as it is generated.
+
+        Iterate it inside `contextlib.aclosing`, so the slot is released as
+        soon as the caller stops, even if it raises.
+        """
+        async with aclosing(self.stream(rag_chain, {"input": question})) as chunks:
+            async for chunk in chunks:
+                if chunk.get("answer"):
+                    yield chunk["answer"]
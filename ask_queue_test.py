@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+from contextlib import aclosing
+from ask_queue import AskQueue, AskQueueFull
+
+
+class FakeChain:
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, inputs, config=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return {"answer": f"answer to {inputs['input']}"}
+
+    async def astream(self, inputs, config=None):
+        for token in ("answer ", "to ", inputs["input"]):
+            yield {"answer": token}
+
+
+class AskQueueTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_answers_overlap_up_to_limit(self):
+        chain = FakeChain()
+        queue = AskQueue(max_concurrent=3, max_queued=10)
+        answers = await asyncio.gather(
+            *(queue.answer(str(i), chain) for i in range(6))
+        )
+        self.assertEqual(answers, [f"answer to {i}" for i in range(6)])
+        self.assertEqual(chain.peak, 3)
+
+    async def test_rejects_when_queue_is_full(self):
+        chain = FakeChain(delay=0.1)
+        queue = AskQueue(max_concurrent=1, max_queued=1)
+        first = asyncio.ensure_future(queue.answer("a", chain))
+        second = asyncio.ensure_future(queue.answer("b", chain))
+        await asyncio.sleep(0)
+        with self.assertRaises(AskQueueFull):
+            await queue.answer("c", chain)
+        await asyncio.gather(first, second)
+
+    async def test_position_in_line(self):
+        chain = FakeChain(delay=0.1)
+        queue = AskQueue(max_concurrent=1, max_queued=5)
+        self.assertEqual(queue.position(), 0)
+        first = asyncio.ensure_future(queue.answer("a", chain))
+        await asyncio.sleep(0)
+        self.assertEqual(queue.position(), 1)
+        second = asyncio.ensure_future(queue.answer("b", chain))
+        await asyncio.sleep(0)
+        self.assertEqual(queue.position(), 2)
+        await asyncio.gather(first, second)
+
+    async def test_stream_releases_slot_when_consumer_raises(self):
+        queue = AskQueue(max_concurrent=1, max_queued=1)
+        with self.assertRaises(RuntimeError):
+            async with aclosing(queue.stream_answer("a", FakeChain())) as tokens:
+                async for token in tokens:
+                    self.assertEqual(queue.running, 1)
+                    raise RuntimeError("Discord edit failed")
+        self.assertEqual(queue.running, 0)
+        self.assertEqual(queue.position(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
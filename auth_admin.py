@@ -12,7 +12,8 @@ def check_if_owner(intraction: discord.Interaction) -> bool:
     Checks if the user of the interaction is
     the owner of the guild which the interaction came from
     """
-    return intraction.user == intraction.guild.owner
+    # Compare IDs; `guild.owner` needs the members intent to be cached
+    return intraction.user.id == intraction.guild.owner_id
 
 
 def check_admin_permission(user: discord.Member) -> bool:
@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import resource
+import tempfile
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from ask_queue import AskQueue
+from bm25_index import tokenize
+from context_budget import ContextBudgetRetriever
+from embedding_cache import CachedEmbeddings
+from metrics import StageTimer
+from numpy_index import VECTOR_DTYPE
+from rag import DATA_FILE, RETRIEVER_K, setup_rag_chain, setup_retriever
+
+
+QUESTIONS_FILE = "benchmark_questions.json"
+PERCENTILES = (50, 95, 99)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings using feature hashing, so runs need no network."""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for term in tokenize(text):
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering instantly after `latency` seconds, with a token count per call."""
+
+    latency: float = 0.0
+    answer: str = "Please check the linked article for details."
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def _result(self, messages) -> ChatResult:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        message = AIMessage(
+            content=self.answer,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(self.answer.split()),
+                "total_tokens": prompt_tokens + len(self.answer.split()),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+def load_questions(path: str = QUESTIONS_FILE) -> list[dict]:
+    """Load the labelled questions: `{"question": ..., "articles": [article ids]}`."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def recall_at_k(retrieved: list[str], relevant: list[str]) -> float:
+    """Share of the relevant articles found among the retrieved ones."""
+    if not relevant:
+        return 1.0
+    return len(set(retrieved) & set(relevant)) / len(set(relevant))
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+
+
+def max_rss_mb() -> float:
+    """Peak resident memory of this process (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_recall(retriever, questions: list[dict]) -> dict:
+    """Recall of the retrieved chunks, and of the context left after the budget."""
+    budget = ContextBudgetRetriever(retriever=retriever)
+    recalls, context_recalls, hits = [], [], 0
+    for q in questions:
+        docs = retriever.invoke(q["question"])
+        retrieved = [d.metadata.get("article_id", "") for d in docs]
+        recall = recall_at_k(retrieved, q["articles"])
+        recalls.append(recall)
+        hits += recall > 0
+
+        context = budget._budget(docs)
+        context_recalls.append(
+            recall_at_k([d.metadata.get("article_id", "") for d in context], q["articles"])
+        )
+    return {
+        "recall": sum(recalls) / len(recalls),
+        "hit_rate": hits / len(questions),
+        "context_recall": sum(context_recalls) / len(context_recalls),
+        "context_tokens": budget.stats["tokens_kept"] / len(questions),
+        "retrieved_tokens": budget.stats["tokens_retrieved"] / len(questions),
+        "paths": dict(retriever.stats),
+    }
+
+
+def measure_vector_search(vector_retriever, questions: list[dict], repeat: int) -> dict:
+    """
+    Latency of the vector search alone (query embedding included), one question at a time.
+
+    For backends that support it, also the time per question when all of
+    them are searched in one batch.
+    """
+    timings = []
+    for _ in range(repeat):
+        for q in questions:
+            started = time.perf_counter()
+            vector_retriever.invoke(q["question"])
+            timings.append(time.perf_counter() - started)
+    results = {"single": percentiles(timings)}
+    if hasattr(vector_retriever, "batch_search"):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            vector_retriever.batch_search([q["question"] for q in questions])
+        results["batched_per_question"] = (time.perf_counter() - started) / (repeat * len(questions))
+    return results
+
+
+async def measure_latency(rag_chain, questions: list[dict], repeat: int) -> dict:
+    """Answer every question one at a time and collect the per-stage timings."""
+    stages = {}
+    for _ in range(repeat):
+        for q in questions:
+            timer = StageTimer()
+            started = time.perf_counter()
+            await rag_chain.ainvoke({"input": q["question"]}, config={"callbacks": [timer]})
+            timer.timings["total"] = time.perf_counter() - started
+            for stage, value in timer.timings.items():
+                if not stage.endswith("_tokens"):
+                    stages.setdefault(stage, []).append(value)
+    return {stage: percentiles(values) for stage, values in stages.items()}
+
+
+async def measure_throughput(rag_chain, questions: list[dict], concurrency: int) -> float:
+    """Questions answered per second with `concurrency` answers in flight."""
+    queue = AskQueue(max_concurrent=concurrency, max_queued=len(questions))
+    started = time.perf_counter()
+    await asyncio.gather(*(queue.answer(q["question"], rag_chain) for q in questions))
+    return len(questions) / (time.perf_counter() - started)
+
+
+def run(args) -> dict:
+    questions = load_questions(args.questions)
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as work_dir:
+        embeddings = HashingEmbeddings()
+        if args.embedding_cache:
+            embeddings = CachedEmbeddings(embeddings, os.path.join(work_dir, "embedding_cache"))
+
+        started = time.perf_counter()
+        rss_before = max_rss_mb()
+        retriever = setup_retriever(
+            embeddings,
+            os.path.join(work_dir, "vectorstore"),
+            args.data,
+            args.k,
+            backend=args.backend,
+        )
+        if retriever is None:
+            sys.exit(f"No documents loaded from {args.data}")
+        retriever.mode = args.mode
+        index_seconds = time.perf_counter() - started
+        index_rss_mb = max_rss_mb() - rss_before
+
+        rag_chain = setup_rag_chain(retriever, FakeChatModel(latency=args.llm_latency))
+        results = {
+            "settings": {
+                "questions": len(questions),
+                "k": args.k,
+                "mode": args.mode,
+                "backend": args.backend,
+                "vector_dtype": VECTOR_DTYPE if args.backend == "numpy" else None,
+                "llm_latency": args.llm_latency,
+                "embedding_cache": args.embedding_cache,
+                "chunks": len(retriever.index.docs),
+            },
+            "index_seconds": index_seconds,
+            "index_rss_mb": index_rss_mb,
+            "retrieval": measure_recall(retriever, questions),
+            "vector_search": measure_vector_search(
+                retriever.vector_retriever, questions, args.repeat
+            ),
+            "latency": asyncio.run(measure_latency(rag_chain, questions, args.repeat)),
+            "throughput": {
+                c: asyncio.run(measure_throughput(rag_chain, questions * args.repeat, c))
+                for c in args.concurrency
+            },
+        }
+        results["max_rss_mb"] = max_rss_mb()
+    return results
+
+
+def print_report(results: dict):
+    settings = results["settings"]
+    print(
+        f"{settings['questions']} questions, {settings['chunks']} chunks, k={settings['k']}, "
+        f"mode={settings['mode']}, llm_latency={settings['llm_latency']}s"
+    )
+    backend = settings["backend"]
+    if settings["vector_dtype"]:
+        backend += f" ({settings['vector_dtype']})"
+    print(
+        f"{backend} index built in {results['index_seconds']:.2f}s, "
+        f"peak memory +{results['index_rss_mb']:.1f} MiB"
+    )
+    retrieval = results["retrieval"]
+    print(f"recall@{settings['k']}: {retrieval['recall']:.3f}  hit rate: {retrieval['hit_rate']:.3f}")
+    print(
+        f"Context after budget: recall {retrieval['context_recall']:.3f}, "
+        f"~{retrieval['context_tokens']:.0f} of ~{retrieval['retrieved_tokens']:.0f} tokens per question"
+    )
+    print(f"Retrieval paths: {retrieval['paths']}")
+    search = results["vector_search"]
+    row = "  ".join(f"{name}={value * 1000:8.2f}" for name, value in search["single"].items())
+    print(f"Vector search (ms): {row}")
+    if "batched_per_question" in search:
+        print(f"  batched: {search['batched_per_question'] * 1000:.3f} ms per question")
+    print("Latency (ms):")
+    for stage, values in results["latency"].items():
+        row = "  ".join(f"{name}={value * 1000:8.2f}" for name, value in values.items())
+        print(f"  {stage:<16} {row}")
+    print("Throughput (questions/s):")
+    for concurrency, value in results["throughput"].items():
+        print(f"  concurrency {concurrency:<3} {value:8.1f}")
+    print(f"Peak memory: {results['max_rss_mb']:.1f} MiB")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the changes from a previous run; False if recall dropped by more than `tolerance`."""
+    recall_delta = results["retrieval"]["recall"] - baseline["retrieval"]["recall"]
+    print(f"recall change vs baseline: {recall_delta:+.3f}")
+    for stage, values in results["latency"].items():
+        if stage in baseline["latency"]:
+            delta = values["p95"] - baseline["latency"][stage]["p95"]
+            print(f"  {stage:<16} p95 change: {delta * 1000:+8.2f}ms")
+    if "vector_search" in baseline:
+        delta = results["vector_search"]["single"]["p95"] - baseline["vector_search"]["single"]["p95"]
+        print(f"  {'vector_search':<16} p95 change: {delta * 1000:+8.2f}ms")
+    print(f"peak memory change: {results['max_rss_mb'] - baseline['max_rss_mb']:+.1f} MiB")
+    return recall_delta >= -tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark retrieval quality and latency offline, with fake embeddings and LLM."
+    )
+    parser.add_argument("--questions", default=QUESTIONS_FILE, help="Labelled questions file")
+    parser.add_argument("--data", default=DATA_FILE, help="Knowledge base file")
+    parser.add_argument("--k", type=int, default=RETRIEVER_K, help="Documents retrieved per question")
+    parser.add_argument("--mode", default="hybrid", choices=["hybrid", "vector", "lexical"])
+    parser.add_argument(
+        "--backend", default="chroma", choices=["chroma", "numpy"], help="Vector index (dtype from VECTOR_DTYPE)"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM delay in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the questions")
+    parser.add_argument("--embedding-cache", action="store_true", help="Wrap the embeddings in the cache")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Allowed recall drop")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit("Recall regressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import benchmark
+from benchmark import HashingEmbeddings, recall_at_k
+
+
+ARTICLES = [
+    ("1001", "Withdrawal processing times", "Withdrawals are processed within 7 business days."),
+    ("1002", "Linking a crypto wallet", "Link a wallet on Avalanche to receive USDC payments."),
+    ("1003", "Quest submission reviews", "Quest submissions are reviewed by the StackUp team."),
+    ("1004", "Resetting your password", "Reset your password from the login page by email."),
+]
+QUESTIONS = [
+    {"question": "How long are withdrawals processed?", "articles": ["1001"]},
+    {"question": "How do I link a wallet for USDC?", "articles": ["1002"]},
+    {"question": "Who reviews my quest submissions?", "articles": ["1003"]},
+]
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_hashing_embeddings_are_deterministic(self):
+        embeddings = HashingEmbeddings(size=64)
+        first = embeddings.embed_query("How do I withdraw my rewards?")
+        self.assertEqual(first, HashingEmbeddings(size=64).embed_query("how do i withdraw my rewards"))
+        self.assertEqual(len(first), 64)
+        self.assertAlmostEqual(sum(v * v for v in first), 1.0, places=5)
+        self.assertNotEqual(first, embeddings.embed_query("link a wallet"))
+
+    def test_recall_at_k(self):
+        self.assertEqual(recall_at_k(["1", "2", "3"], ["2", "4"]), 0.5)
+        self.assertEqual(recall_at_k(["1", "1"], ["1"]), 1.0)
+        self.assertEqual(recall_at_k([], ["1"]), 0.0)
+
+
+class BenchmarkSmokeTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.data = os.path.join(self.dir, "cleaned_data.txt")
+        with open(self.data, "w", encoding="utf-8") as f:
+            for article_id, title, body in ARTICLES:
+                url = f"https://example.zendesk.com/hc/en-us/articles/{article_id}-{title.replace(' ', '-')}"
+                f.write(f"Title: {title}\nURL: {url}\nBody: {body}\n\n\n")
+        self.questions = os.path.join(self.dir, "questions.json")
+        with open(self.questions, "w") as f:
+            json.dump(QUESTIONS, f)
+
+    def run_benchmark(self, *extra):
+        argv = [
+            "benchmark.py",
+            "--questions", self.questions,
+            "--data", self.data,
+            "--k", "2",
+            "--backend", "numpy",
+            "--llm-latency", "0",
+            "--concurrency", "1", "2",
+            *extra,
+        ]
+        output = io.StringIO()
+        original = sys.argv
+        sys.argv = argv
+        try:
+            with redirect_stdout(output):
+                benchmark.main()
+        finally:
+            sys.argv = original
+        return output.getvalue()
+
+    def test_reports_recall_and_latency(self):
+        results_file = os.path.join(self.dir, "results.json")
+        report = self.run_benchmark("--json", results_file)
+        with open(results_file) as f:
+            results = json.load(f)
+
+        self.assertEqual(results["settings"]["chunks"], len(ARTICLES))
+        self.assertEqual(results["retrieval"]["recall"], 1.0)
+        self.assertEqual(sum(results["retrieval"]["paths"].values()), len(QUESTIONS))
+        for stage in ("retrieval", "llm", "total"):
+            self.assertEqual(set(results["latency"][stage]), {"p50", "p95", "p99"})
+        self.assertEqual(set(results["throughput"]), {"1", "2"})
+        self.assertIn("recall@2: 1.000", report)
+        self.assertIn("Vector search (ms):", report)
+
+        # Comparing against its own results passes the recall check
+        report = self.run_benchmark("--baseline", results_file)
+        self.assertIn("recall change vs baseline: +0.000", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from langchain_core.documents import Document
+
+
+BM25_FILE = "bm25.json"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "if", "in", "is", "it", "me", "my", "of", "on", "or",
+    "the", "this", "to", "what", "when", "where", "which", "who", "why", "will",
+    "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase the text and split it into terms, dropping stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25.
+
+    Built from the same chunks as the vector store, so lexical and vector
+    results refer to the same documents.
+    """
+
+    def __init__(self, docs: list[Document], k1: float = 1.5, b: float = 0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.doc_lengths = []
+
+        for i, doc in enumerate(docs):
+            terms = Counter(tokenize(doc.page_content))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((i, tf))
+
+        self.avg_length = sum(self.doc_lengths) / len(docs) if docs else 0
+        self.idf = {
+            term: math.log(1 + (len(docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        # Weight of a term that appears in no document
+        self.max_idf = math.log(1 + (len(docs) + 0.5) / 0.5)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[Document, float]]:
+        """Return the top `k` documents for the query with their BM25 scores."""
+        scores = self.scores(query)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.docs[i], score) for i, score in top]
+
+    def scores(self, query: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def coverage(self, query: str, doc: Document) -> float:
+        """
+        Share of the query's term weight (idf) that appears in the document.
+
+        Terms unknown to the index count with the highest possible weight, so
+        a query with words no article contains never looks fully covered.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        doc_terms = set(tokenize(doc.page_content))
+        total = sum(self.idf.get(t, self.max_idf) for t in terms)
+        matched = sum(self.idf[t] for t in terms if t in doc_terms and t in self.idf)
+        return matched / total
+
+    def save(self, path: str, fingerprint: str = ""):
+        """Persist the indexed documents; the postings are rebuilt on load."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fingerprint": fingerprint,
+                    "docs": [
+                        {"page_content": d.page_content, "metadata": d.metadata}
+                        for d in self.docs
+                    ],
+                },
+                f,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str = ""):
+        """Load a persisted index, or return `None` if it is missing or from other data."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading BM25 index: {e}")
+            return None
+        if data.get("fingerprint") != fingerprint:
+            return None
+        return cls([Document(**d) for d in data["docs"]])
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Build the index from the chunks stored in a Chroma vector store."""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        return cls(
+            [
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(data["documents"], data["metadatas"])
+            ]
+        )
@@ -0,0 +1,77 @@
+import unittest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from bm25_index import BM25Index
+from hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+DOCS = [
+    Document(page_content="Withdrawals are paid in USDC on Avalanche.", metadata={"url": "usdc"}),
+    Document(page_content="Link your WISE account to receive withdrawals.", metadata={"url": "wise"}),
+    Document(page_content="Error code E1234 means your quest was rejected.", metadata={"url": "e1234"}),
+    Document(page_content="Quests are reviewed within seven days.", metadata={"url": "review"}),
+]
+
+
+class FakeVectorRetriever(BaseRetriever):
+
+    calls: int = 0
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        self.calls += 1
+        return [DOCS[3], DOCS[1]]
+
+
+class BM25IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = BM25Index(DOCS)
+
+    def test_ranks_exact_terms_first(self):
+        results = self.index.search("what does E1234 mean", k=2)
+        self.assertEqual(results[0][0].metadata["url"], "e1234")
+        self.assertEqual(self.index.search("nothing matches", k=2), [])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[DOCS[0], DOCS[1]], [DOCS[1], DOCS[2]]], k=3)
+        self.assertEqual(fused, [DOCS[1], DOCS[0], DOCS[2]])
+
+    def test_lexical_fast_path_skips_vector_search(self):
+        vector = FakeVectorRetriever()
+        retriever = HybridRetriever(vector_retriever=vector, index=self.index, k=2)
+
+        self.assertEqual(retriever.invoke("E1234")[0].metadata["url"], "e1234")
+        self.assertEqual(vector.calls, 0)
+
+        retriever.invoke("how long until my quest is reviewed")
+        self.assertEqual(vector.calls, 1)
+        self.assertEqual(retriever.stats["lexical_fast_path"], 1)
+        self.assertEqual(retriever.stats["hybrid"], 1)
+
+    def test_lexically_confident(self):
+        retriever = HybridRetriever(vector_retriever=FakeVectorRetriever(), index=self.index, k=2)
+        self.assertTrue(retriever.lexically_confident("E1234"))
+        self.assertFalse(retriever.lexically_confident("how long until my quest is reviewed"))
+        retriever.mode = "vector"
+        self.assertFalse(retriever.lexically_confident("E1234"))
+
+    def test_vector_search_runs_as_a_child_run(self):
+        class Starts(BaseCallbackHandler):
+            def __init__(self):
+                self.parents = []
+
+            def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+                self.parents.append(parent_run_id)
+
+        starts = Starts()
+        retriever = HybridRetriever(vector_retriever=FakeVectorRetriever(), index=self.index, k=2)
+        retriever.invoke("how long until my quest is reviewed", {"callbacks": [starts]})
+        # The hybrid retriever's own run, then the vector search nested in it
+        self.assertEqual(len(starts.parents), 2)
+        self.assertIsNone(starts.parents[0])
+        self.assertIsNotNone(starts.parents[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
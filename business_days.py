@@ -0,0 +1,79 @@
+import os
+import json
+import logging
+from datetime import date, datetime
+import numpy as np
+
+
+HOLIDAYS_FILE = os.getenv("HOLIDAYS_FILE", "holidays.json")
+WEEKMASK = "1111100"  # Monday to Friday
+
+
+class BusinessCalendar:
+    """
+    Business-day arithmetic over weekends and a holiday calendar.
+
+    Offsets use NumPy's busday functions, which keep the holidays sorted and
+    find them by binary search, so any offset is answered without walking
+    day by day and many start dates can be offset in one vectorized call.
+    """
+
+    def __init__(self, holidays: dict[date, str] = None, weekmask: str = WEEKMASK):
+        self.holidays = dict(sorted((holidays or {}).items()))
+        self.years = {d.year for d in self.holidays}
+        self.calendar = np.busdaycalendar(
+            weekmask=weekmask, holidays=np.array(list(self.holidays), dtype="datetime64[D]")
+        )
+
+    @classmethod
+    def load(cls, path: str = HOLIDAYS_FILE):
+        """
+        Load a calendar file mapping each year to its `{"YYYY-MM-DD": name}` holidays.
+
+        A missing or unreadable file gives a calendar with weekends only.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                years = json.load(f)
+        except Exception as e:
+            print(f"Error loading holiday calendar: {e}")
+            return cls()
+        holidays = {
+            date.fromisoformat(day): name
+            for days in years.values()
+            for day, name in days.items()
+        }
+        logging.info(f"Loaded {len(holidays)} holiday(s) for {', '.join(sorted(years))}")
+        return cls(holidays)
+
+    def covers(self, day: date) -> bool:
+        """Check whether the calendar lists the holidays of the year of `day`."""
+        return day.year in self.years
+
+    def add_business_days(self, start: datetime, days: int) -> datetime:
+        """Date `days` business days after `start`, keeping its time of day."""
+        return self.add_business_days_many([start], days)[0]
+
+    def add_business_days_many(self, starts: list[datetime], days: int) -> list[datetime]:
+        """
+        Offset many start dates at once.
+
+        A start on a weekend or holiday counts from the business day before
+        it, so the result is always the `days`-th business day after the start.
+        """
+        if not starts:
+            return []
+        offsets = np.busday_offset(
+            np.array([s.date() for s in starts], dtype="datetime64[D]"),
+            days,
+            roll="backward",
+            busdaycal=self.calendar,
+        )
+        results = [
+            datetime.combine(offset.astype(date), start.time())
+            for start, offset in zip(starts, offsets)
+        ]
+        uncovered = sorted({d.year for d in starts + results if not self.covers(d)})
+        if uncovered:
+            logging.warning(f"No holidays listed for {uncovered}; counting weekends only")
+        return results
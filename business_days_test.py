@@ -0,0 +1,57 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from business_days import BusinessCalendar
+
+
+def walk(start, days, holidays):
+    """The original day-by-day calculation."""
+    current, added = start, 0
+    while added < days:
+        current += timedelta(days=1)
+        if current.weekday() < 5 and current.date() not in holidays:
+            added += 1
+    return current
+
+
+class BusinessCalendarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calendar = BusinessCalendar.load("holidays.json")
+
+    def test_matches_day_by_day_walk(self):
+        rng = random.Random(0)
+        starts = [
+            datetime(2024, 10, 1, 10, 30) + timedelta(days=rng.randrange(800)) for _ in range(300)
+        ]
+        for days in (1, 7, 30):
+            expected = [walk(s, days, self.calendar.holidays) for s in starts]
+            self.assertEqual(self.calendar.add_business_days_many(starts, days), expected)
+
+    def test_skips_weekends_and_holidays(self):
+        # Christmas Eve 2025 is a Wednesday; Christmas and the weekend are skipped
+        self.assertEqual(
+            self.calendar.add_business_days(datetime(2025, 12, 24), 7), datetime(2026, 1, 6)
+        )
+        # Submitted on a Saturday before Chinese New Year 2026
+        self.assertEqual(
+            self.calendar.add_business_days(datetime(2026, 2, 14), 3), datetime(2026, 2, 20)
+        )
+        self.assertTrue(self.calendar.covers(date(2026, 5, 1)))
+        self.assertFalse(self.calendar.covers(date(2030, 5, 1)))
+
+    def test_load_per_year_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "holidays.json")
+            with open(path, "w") as f:
+                json.dump({"2030": {"2030-01-01": "New Year's Day"}}, f)
+            calendar = BusinessCalendar.load(path)
+        self.assertEqual(calendar.add_business_days(datetime(2029, 12, 31), 1), datetime(2030, 1, 2))
+        self.assertEqual(BusinessCalendar.load("missing.json").holidays, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import math
+import logging
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+from article_loader import CHUNK_OVERLAP, article_header
+from bm25_index import tokenize
+from metrics import REGISTRY
+from vectorstore_sync import article_key
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))
+CONTEXT_MIN_SCORE_RATIO = float(os.getenv("CONTEXT_MIN_SCORE_RATIO", 0.25))
+CONTEXT_DUPLICATE_OVERLAP = float(os.getenv("CONTEXT_DUPLICATE_OVERLAP", 0.8))
+CHARS_PER_TOKEN = 4
+MIN_OVERLAP_CHARS = 20
+
+CONTEXT_TOKENS = REGISTRY.counter(
+    "rag_context_tokens_total", "Estimated prompt context tokens, kept or saved by the budget"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count; about four characters per token for English text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def chunk_body(doc: Document) -> str:
+    """The chunk without its repeated Title/URL header."""
+    header = article_header(doc) if "title" in doc.metadata and "url" in doc.metadata else ""
+    if header and doc.page_content.startswith(header):
+        return doc.page_content[len(header):]
+    return doc.page_content
+
+
+def overlap(a: set, b: set) -> float:
+    """Share of the smaller term set contained in the other."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def strip_overlap(previous: str, text: str) -> str:
+    """Drop the start of `text` that repeats the end of `previous` (the chunk overlap)."""
+    longest = min(len(previous), len(text), 2 * CHUNK_OVERLAP)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:]
+    return text
+
+
+def merge_article_chunks(docs: list[Document]) -> list[Document]:
+    """
+    Merge the chunks of each article into one document with a single header.
+
+    Articles keep the position of their best chunk; their chunks are joined
+    in article order, without the text neighbouring chunks overlap on.
+    """
+    groups = {}
+    for doc in docs:
+        groups.setdefault(article_key(doc), []).append(doc)
+
+    merged = []
+    for chunks in groups.values():
+        if len(chunks) == 1:
+            merged.append(chunks[0])
+            continue
+        chunks = sorted(chunks, key=lambda d: d.metadata.get("chunk", 0))
+        body = chunk_body(chunks[0])
+        for previous, doc in zip(chunks, chunks[1:]):
+            text = chunk_body(doc)
+            if doc.metadata.get("chunk", 0) == previous.metadata.get("chunk", 0) + 1:
+                text = strip_overlap(chunk_body(previous), text)
+            else:
+                text = "\n...\n" + text
+            body += text
+        header = article_header(chunks[0])
+        merged.append(
+            Document(
+                page_content=header + body,
+                metadata={**chunks[0].metadata, "chunks_merged": len(chunks)},
+            )
+        )
+    return merged
+
+
+def budget_context(
+    docs: list[Document],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    min_score_ratio: float = CONTEXT_MIN_SCORE_RATIO,
+    duplicate_overlap: float = CONTEXT_DUPLICATE_OVERLAP,
+) -> tuple[list[Document], dict]:
+    """
+    Pick the retrieved chunks worth sending to the LLM, best first.
+
+    Chunks scoring below `min_score_ratio` times the best `score` metadata are
+    dropped, as are chunks whose terms mostly repeat an already picked one.
+    The rest are picked in rank order while they fit in `token_budget`
+    (the best chunk is always kept), then chunks of the same article are merged.
+    """
+    stats = {"low_score": 0, "duplicate": 0, "over_budget": 0}
+    scores = [d.metadata["score"] for d in docs if "score" in d.metadata]
+    threshold = max(scores) * min_score_ratio if scores else None
+
+    picked, picked_terms, articles, used = [], [], set(), 0
+    for doc in docs:
+        if threshold is not None and doc.metadata.get("score", threshold) < threshold:
+            stats["low_score"] += 1
+            continue
+        terms = set(tokenize(chunk_body(doc)))
+        if any(overlap(terms, other) >= duplicate_overlap for other in picked_terms):
+            stats["duplicate"] += 1
+            continue
+        # Further chunks of a picked article share its header once merged
+        key = article_key(doc)
+        cost = estimate_tokens(chunk_body(doc) if key in articles else doc.page_content)
+        if picked and used + cost > token_budget:
+            stats["over_budget"] += 1
+            continue
+        picked.append(doc)
+        picked_terms.append(terms)
+        articles.add(key)
+        used += cost
+
+    context = merge_article_chunks(picked)
+    stats["chunks_kept"] = len(picked)
+    stats["tokens_retrieved"] = sum(estimate_tokens(d.page_content) for d in docs)
+    stats["tokens_kept"] = sum(estimate_tokens(d.page_content) for d in context)
+    return context, stats
+
+
+class ContextBudgetRetriever(BaseRetriever):
+    """
+    Retriever trimming another retriever's results to a prompt token budget.
+
+    Sits between retrieval and the LLM so `create_stuff_documents_chain`
+    only pastes the chunks picked by `budget_context` into the prompt.
+    """
+
+    retriever: BaseRetriever
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+    min_score_ratio: float = CONTEXT_MIN_SCORE_RATIO
+    duplicate_overlap: float = CONTEXT_DUPLICATE_OVERLAP
+    stats: dict = Field(
+        default_factory=lambda: {"tokens_retrieved": 0, "tokens_kept": 0}
+    )
+
+    def _budget(self, docs: list[Document]) -> list[Document]:
+        context, stats = budget_context(
+            docs, self.token_budget, self.min_score_ratio, self.duplicate_overlap
+        )
+        saved = stats["tokens_retrieved"] - stats["tokens_kept"]
+        for key, value in stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        CONTEXT_TOKENS.inc(stats["tokens_kept"], kind="kept")
+        CONTEXT_TOKENS.inc(saved, kind="saved")
+        logging.info(
+            f"Context budget kept {stats['chunks_kept']} of {len(docs)} chunk(s), "
+            f"~{stats['tokens_kept']} tokens (~{saved} saved; dropped "
+            f"{stats['low_score']} low score, {stats['duplicate']} duplicate, "
+            f"{stats['over_budget']} over budget)"
+        )
+        return context
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self._budget(self.retriever.invoke(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self._budget(await self.retriever.ainvoke(query))
@@ -0,0 +1,75 @@
+import unittest
+from langchain_core.documents import Document
+from benchmark import HashingEmbeddings
+from bm25_index import BM25Index
+from context_budget import budget_context, estimate_tokens
+from hybrid_retriever import HybridRetriever
+from numpy_index import NumpyRetriever, NumpyVectorIndex
+
+
+def chunk(article, index, body, score=None):
+    metadata = {"title": article, "url": f"https://help/{article}", "article_id": article, "chunk": index}
+    if score is not None:
+        metadata["score"] = score
+    return Document(
+        page_content=f"Title: {article}\nURL: https://help/{article}\nBody: {body}",
+        metadata=metadata,
+    )
+
+
+class ContextBudgetTest(unittest.TestCase):
+
+    def test_drops_low_scores_and_duplicates(self):
+        docs = [
+            chunk("wise", 0, "Link your WISE account before requesting a withdrawal.", 1.0),
+            chunk("wise", 3, "Before requesting a withdrawal, link your WISE account.", 0.9),
+            chunk("usdc", 0, "USDC withdrawals are paid on Avalanche.", 0.8),
+            chunk("quests", 0, "Quests are reviewed within seven days.", 0.1),
+        ]
+        context, stats = budget_context(docs, token_budget=1000, min_score_ratio=0.25)
+        self.assertEqual([d.metadata["article_id"] for d in context], ["wise", "usdc"])
+        self.assertEqual((stats["duplicate"], stats["low_score"]), (1, 1))
+        self.assertLess(stats["tokens_kept"], stats["tokens_retrieved"])
+
+    def test_budget_keeps_best_chunks_and_merges_articles(self):
+        first = "Withdrawals take seven business days to arrive in your account. " * 3
+        second = "to arrive in your account. Contact support if the payment is late after that time."
+        docs = [
+            chunk("withdraw", 0, first, 1.0),
+            chunk("other", 0, "Unrelated text about badges and levels. " * 20, 0.9),
+            chunk("withdraw", 1, second, 0.8),
+        ]
+        budget = estimate_tokens(docs[0].page_content) + estimate_tokens(second)
+        context, stats = budget_context(docs, token_budget=budget)
+        self.assertEqual(stats["over_budget"], 1)
+        self.assertEqual(len(context), 1)
+        self.assertEqual(context[0].page_content.count("Title:"), 1)
+        self.assertTrue(context[0].page_content.endswith(first + "Contact support if the payment is late after that time."))
+
+    def test_drops_weak_hits_of_the_hybrid_retriever(self):
+        docs = [
+            chunk("withdraw", 0, "Withdrawals arrive within seven business days after you request them."),
+            chunk("wise", 0, "Link your WISE account to receive withdrawals in local currency."),
+            chunk("usdc", 0, "USDC payments are sent on the Avalanche network."),
+            chunk("badges", 0, "Badges are awarded when you complete a campaign."),
+            chunk("quests", 0, "Quest submissions are reviewed by the team within seven days, "
+                  "and rejected submissions can be resubmitted once."),
+        ]
+        embeddings = HashingEmbeddings()
+        vector = NumpyRetriever(
+            index=NumpyVectorIndex.from_documents(docs, embeddings), embeddings=embeddings, k=4
+        )
+        retriever = HybridRetriever(vector_retriever=vector, index=BM25Index(docs), k=4)
+
+        fused = retriever.invoke("how many days until withdrawals arrive")
+        self.assertEqual(retriever.stats["hybrid"], 1)
+        self.assertEqual(fused[0].metadata["score"], 1.0)
+        self.assertTrue(all("rrf_score" in d.metadata for d in fused))
+        # The vector search pads its results with an unrelated article
+        context, stats = budget_context(fused, token_budget=1000)
+        self.assertEqual(stats["low_score"], 1)
+        self.assertNotIn("badges", [d.metadata["article_id"] for d in context])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,102 @@
-import json
+import os
 import re
+import json
+import argparse
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
+
+
+# API URL to fetch articles
+API_URL = "https://stackuphelpcentre.zendesk.com/api/v2/help_center/en-us/articles?per_page=100"
+OUTPUT_FILE = "cleaned_data.txt"
+MANIFEST_FILE = "articles_manifest.json"
+MAX_WORKERS = 4
+
+
+def create_session(pool_size=MAX_WORKERS):
+    """Create a session whose connection pool is shared by the page downloads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def page_url(api_url, page):
+    """Return the API URL for the given page number."""
+    parts = urlparse(api_url)
+    query = parse_qs(parts.query)
+    query["page"] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def fetch_page(session, url, etag=None):
+    """
+    Fetch one page of articles.
+
+    Sends `If-None-Match` when an ETag from the last run is known. Returns a
+    tuple of the decoded page (`None` if not modified) and its ETag.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    response = session.get(url, headers=headers, timeout=30)
+    if response.status_code == 304:
+        return None, etag
+    response.raise_for_status()  # Raise an error for bad responses
+    return response.json(), response.headers.get("ETag")
+
+
+def fetch_pages(api_url, session=None, manifest=None, max_workers=MAX_WORKERS):
+    """
+    Fetch every page of articles from the given API URL.
+
+    The first page tells how many pages there are; the rest are downloaded
+    concurrently. If the API doesn't report a page count, `next_page` links
+    are followed one by one instead. Returns a tuple of the pages, as
+    `{"url", "etag", "articles"}` dicts where `articles` is `None` for pages
+    that haven't changed since the run recorded in `manifest`, and the page
+    count.
+    """
+    session = session or create_session(max_workers)
+    known_pages = (manifest or {}).get("pages", {})
+
+    def fetch(url):
+        data, etag = fetch_page(session, url, known_pages.get(url, {}).get("etag"))
+        return data, {
+            "url": url,
+            "etag": etag,
+            "articles": data.get("articles", []) if data is not None else None,
+        }
+
+    first_url = page_url(api_url, 1)
+    first_data, first_page = fetch(first_url)
+    pages = [first_page]
+
+    page_count = (
+        first_data.get("page_count")
+        if first_data is not None
+        else (manifest or {}).get("page_count")
+    )
+    if page_count:
+        urls = [page_url(api_url, page) for page in range(2, page_count + 1)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages += [page for _, page in executor.map(fetch, urls)]
+    else:
+        next_url = first_data.get("next_page") if first_data else None
+        while next_url:
+            data, page = fetch(next_url)
+            pages.append(page)
+            next_url = data.get("next_page") if data else None
+
+    return pages, page_count
 
 
 def fetch_articles(api_url):
     """Fetch articles from the given API URL."""
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise an error for bad responses
-        return response.json().get("articles", [])
+        pages, _ = fetch_pages(api_url)
+        return [article for page in pages for article in page["articles"] or []]
     except requests.exceptions.RequestException as e:
         print(f"Error fetching articles: {e}")
         return []
@@ -38,23 +126,109 @@ def extract_and_clean_article(article):
     return clean_body if clean_body else ""
 
 
-# API URL to fetch articles
-api_url = "https://stackuphelpcentre.zendesk.com/api/v2/help_center/en-us/articles?per_page=100"
-
-# Fetch articles from the API
-articles = fetch_articles(api_url)
-
-# Clean articles and prepare output
-cleaned_articles = []
-for article in articles:
-    title = article.get("title", "Untitled")
-    url = article.get("html_url", "No URL")
-    cleaned_body = extract_and_clean_article(article)
-    if cleaned_body:
-        cleaned_articles.append(f"Title: {title}\nURL: {url}\nBody: {cleaned_body}\n")
-        # cleaned_articles.append(f"{cleaned_body}\n")
-
-# Write cleaned articles to a text file
-with open("cleaned_data.txt", "w", encoding="utf-8") as output_file:
-    for entry in cleaned_articles:
-        output_file.write(entry + "\n\n")
+def load_manifest(path=MANIFEST_FILE):
+    """Load the manifest of the last run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def refresh_articles(pages, page_count=None, manifest=None):
+    """
+    Clean the fetched articles, reusing the results of the last run.
+
+    Articles whose `updated_at` hasn't changed, and all articles of pages
+    that weren't modified, are taken from `manifest` without cleaning them
+    again. Returns the cleaned articles in API order, the new manifest and a
+    summary of what changed.
+    """
+    manifest = manifest or {}
+    known_articles = manifest.get("articles", {})
+    known_pages = manifest.get("pages", {})
+
+    articles = {}
+    new_pages = {}
+    stats = {"changed": 0, "unchanged": 0, "pages_not_modified": 0}
+    for page in pages:
+        if page["articles"] is None:
+            stats["pages_not_modified"] += 1
+            ids = known_pages.get(page["url"], {}).get("article_ids", [])
+            for article_id in ids:
+                if article_id in known_articles:
+                    articles[article_id] = known_articles[article_id]
+                    stats["unchanged"] += 1
+        else:
+            ids = []
+            for article in page["articles"]:
+                article_id = str(article.get("id"))
+                ids.append(article_id)
+                known = known_articles.get(article_id)
+                if known and known["updated_at"] == article.get("updated_at"):
+                    articles[article_id] = known
+                    stats["unchanged"] += 1
+                    continue
+
+                articles[article_id] = {
+                    "title": article.get("title", "Untitled"),
+                    "url": article.get("html_url", "No URL"),
+                    "updated_at": article.get("updated_at"),
+                    "body": extract_and_clean_article(article),
+                }
+                stats["changed"] += 1
+        new_pages[page["url"]] = {"etag": page["etag"], "article_ids": ids}
+
+    stats["removed"] = len(known_articles.keys() - articles.keys())
+    new_manifest = {"page_count": page_count, "pages": new_pages, "articles": articles}
+    return list(articles.values()), new_manifest, stats
+
+
+def write_cleaned_articles(articles, path=OUTPUT_FILE):
+    """Write cleaned articles to a text file."""
+    with open(path, "w", encoding="utf-8") as output_file:
+        for article in articles:
+            if article["body"]:
+                output_file.write(
+                    f"Title: {article['title']}\nURL: {article['url']}\nBody: {article['body']}\n"
+                    + "\n\n"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and clean Help Centre articles.")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument(
+        "--from-file",
+        help="Use a saved API response (e.g. response.json) instead of fetching",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Ignore the manifest and re-process every article"
+    )
+    args = parser.parse_args()
+
+    manifest = {} if args.full else load_manifest()
+    if args.from_file:
+        with open(args.from_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        pages = [{"url": args.from_file, "etag": None, "articles": data.get("articles", [])}]
+        page_count = 1
+    else:
+        try:
+            pages, page_count = fetch_pages(args.api_url, manifest=manifest)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching articles: {e}")
+            return
+
+    articles, manifest, stats = refresh_articles(pages, page_count, manifest)
+    write_cleaned_articles(articles)
+    save_manifest(manifest)
+    print(f"Saved {len(articles)} articles to {OUTPUT_FILE}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
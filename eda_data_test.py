@@ -0,0 +1,97 @@
+import json
+import importlib.util
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+spec = importlib.util.spec_from_file_location("eda_data", "eda-data.py")
+eda_data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(eda_data)
+
+with open("response.json", "r", encoding="utf-8") as f:
+    SAVED_ARTICLES = json.load(f)["articles"]
+PER_PAGE = 30
+
+
+class StubHelpCentre(BaseHTTPRequestHandler):
+    """Serves the saved response.json in pages of PER_PAGE, with ETags."""
+
+    articles = SAVED_ARTICLES
+    requests = []
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query).get("page", ["1"])[0])
+        page_count = -(-len(self.articles) // PER_PAGE)
+        body = {
+            "articles": self.articles[(page - 1) * PER_PAGE : page * PER_PAGE],
+            "page": page,
+            "page_count": page_count,
+            "next_page": None,
+        }
+        etag = f'"{hash(json.dumps(body, sort_keys=True))}"'
+        self.requests.append(self.path)
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetcherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHelpCentre)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f"http://127.0.0.1:{cls.server.server_port}/articles?per_page={PER_PAGE}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        StubHelpCentre.articles = list(SAVED_ARTICLES)
+        StubHelpCentre.requests = []
+
+    def test_follows_all_pages(self):
+        articles = eda_data.fetch_articles(self.api_url)
+        self.assertEqual(
+            [a["id"] for a in articles], [a["id"] for a in SAVED_ARTICLES]
+        )
+        self.assertEqual(len(StubHelpCentre.requests), 3)
+
+    def test_refresh_only_processes_changes(self):
+        pages, page_count = eda_data.fetch_pages(self.api_url)
+        articles, manifest, stats = eda_data.refresh_articles(pages, page_count)
+        self.assertEqual(stats["changed"], len(SAVED_ARTICLES))
+
+        edited = dict(SAVED_ARTICLES[-1], updated_at="2030-01-01T00:00:00Z", body="<p>New</p>")
+        StubHelpCentre.articles = SAVED_ARTICLES[1:-1] + [edited]
+        pages, page_count = eda_data.fetch_pages(self.api_url, manifest=manifest)
+        articles, manifest, stats = eda_data.refresh_articles(pages, page_count, manifest)
+
+        self.assertEqual(stats["changed"], 1)
+        self.assertEqual(stats["removed"], 1)
+        self.assertEqual(stats["unchanged"], len(SAVED_ARTICLES) - 2)
+        self.assertEqual(articles[-1]["body"], "New")
+
+        pages, page_count = eda_data.fetch_pages(self.api_url, manifest=manifest)
+        self.assertTrue(all(page["articles"] is None for page in pages))
+        articles, _, stats = eda_data.refresh_articles(pages, page_count, manifest)
+        self.assertEqual(len(articles), len(SAVED_ARTICLES) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
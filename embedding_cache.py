@@ -0,0 +1,168 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from metrics import timed
+
+
+EMBEDDING_CACHE_DIR = "embedding_cache"
+
+
+def text_key(kind: str, text: str) -> str:
+    """Key of a text; documents and queries are kept apart as some models embed them differently."""
+    return f"{kind}:{hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()}"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that persists every vector it computes.
+
+    Vectors are appended to `vectors.f32`, a raw float32 file that is
+    memory-mapped for reads, and their keys to `keys.txt`, one per line in
+    the same order. Use one `cache_dir` per embedding model. Both the
+    ingestion path (`embed_documents`) and the query path (`embed_query`)
+    only call the wrapped embeddings for texts they haven't seen before.
+
+    Rows are numbered by their position in the files, so only one process
+    may append to a `cache_dir`. A `read_only` cache (in the secondary
+    processes of a sharded bot) only looks up the vectors stored when it was
+    loaded and never writes; vectors it has to compute aren't kept.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str, read_only: bool = False):
+        self.embeddings = embeddings
+        self.cache_dir = cache_dir
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}
+        self._vectors = None
+        self._dim = None
+        self._load()
+
+    @property
+    def keys_file(self):
+        return os.path.join(self.cache_dir, "keys.txt")
+
+    @property
+    def vectors_file(self):
+        return os.path.join(self.cache_dir, "vectors.f32")
+
+    @property
+    def meta_file(self):
+        return os.path.join(self.cache_dir, "meta.json")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._rows)}
+
+    def _load(self):
+        if not os.path.exists(self.meta_file):
+            return
+        with open(self.meta_file, "r") as f:
+            self._dim = json.load(f)["dim"]
+        with open(self.keys_file, "r") as f:
+            keys = f.read().splitlines()
+
+        rows = os.path.getsize(self.vectors_file) // (4 * self._dim)
+        if len(keys) != rows and self.read_only:
+            # The writer is mid-append; use the entries complete in both files
+            rows = min(rows, len(keys))
+            keys = keys[:rows]
+        elif len(keys) != rows:
+            # Interrupted append: keep only the entries that were fully written
+            rows = min(rows, len(keys))
+            keys = keys[:rows]
+            with open(self.keys_file, "w") as f:
+                f.writelines(k + "\n" for k in keys)
+            with open(self.vectors_file, "r+b") as f:
+                f.truncate(rows * 4 * self._dim)
+
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._map()
+
+    def _map(self):
+        self._vectors = (
+            np.memmap(
+                self.vectors_file, dtype=np.float32, mode="r", shape=(len(self._rows), self._dim)
+            )
+            if self._rows
+            else None
+        )
+
+    def _lookup(self, keys: list[str]) -> list:
+        with self._lock:
+            found = []
+            for key in keys:
+                row = self._rows.get(key)
+                found.append(None if row is None else self._vectors[row].tolist())
+        hits = sum(v is not None for v in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def _store(self, keys: list[str], vectors: list[list[float]]):
+        if self.read_only:
+            return
+        with self._lock:
+            new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+            if not new:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if self._dim is None:
+                self._dim = len(new[0][1])
+                with open(self.meta_file, "w") as f:
+                    json.dump({"dim": self._dim}, f)
+
+            # Vectors first, so a crash never leaves a key without its vector
+            with open(self.vectors_file, "ab") as f:
+                f.write(np.asarray([v for _, v in new], dtype=np.float32).tobytes())
+            with open(self.keys_file, "a") as f:
+                f.writelines(k + "\n" for k, _ in new)
+            for key, _ in new:
+                self._rows[key] = len(self._rows)
+            self._map()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [text_key("d", t) for t in texts]
+        vectors = self._lookup(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            with timed("embed_documents"):
+                computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            self._store([keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        key = text_key("q", text)
+        vector = self._lookup([key])[0]
+        if vector is None:
+            with timed("embed_query"):
+                vector = self.embeddings.embed_query(text)
+            self._store([key], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [text_key("d", t) for t in texts]
+        vectors = self._lookup(keys)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            with timed("embed_documents"):
+                computed = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            self._store([keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = text_key("q", text)
+        vector = self._lookup([key])[0]
+        if vector is None:
+            with timed("embed_query"):
+                vector = await self.embeddings.aembed_query(text)
+            self._store([key], [vector])
+        return vector
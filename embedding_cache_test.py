@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings:
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), -1.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class CachedEmbeddingsTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    async def test_only_new_texts_are_embedded(self):
+        backend = CountingEmbeddings()
+        cached = CachedEmbeddings(backend, self.cache_dir)
+
+        self.assertEqual(cached.embed_documents(["a", "bb"]), [[1.0, 1.0], [2.0, 1.0]])
+        self.assertEqual(cached.embed_documents(["a", "bb", "ccc"])[2], [3.0, 1.0])
+        self.assertEqual(backend.calls, 3)
+
+        # Queries are cached apart from documents
+        self.assertEqual(await cached.aembed_query("a"), [1.0, -1.0])
+        self.assertEqual(cached.embed_query("a"), [1.0, -1.0])
+        self.assertEqual(backend.calls, 4)
+
+    def test_persists_across_restarts(self):
+        CachedEmbeddings(CountingEmbeddings(), self.cache_dir).embed_documents(["a", "bb"])
+
+        backend = CountingEmbeddings()
+        cached = CachedEmbeddings(backend, self.cache_dir)
+        self.assertEqual(cached.embed_documents(["bb", "a"]), [[2.0, 1.0], [1.0, 1.0]])
+        self.assertEqual(backend.calls, 0)
+        self.assertEqual(cached.stats(), {"hits": 2, "misses": 0, "entries": 2})
+
+    def test_read_only_cache_never_writes(self):
+        writer = CachedEmbeddings(CountingEmbeddings(), self.cache_dir)
+        writer.embed_query("a")
+        reader = CachedEmbeddings(CountingEmbeddings(), self.cache_dir, read_only=True)
+        reader.embed_query("bb")  # Computed but not stored
+        writer.embed_query("ccc")
+
+        self.assertEqual(writer.embed_query("ccc"), [3.0, -1.0])
+        self.assertEqual(reader.embed_query("a"), [1.0, -1.0])
+        self.assertEqual(reader.stats()["entries"], 1)
+        self.assertEqual(CachedEmbeddings(CountingEmbeddings(), self.cache_dir).stats()["entries"], 2)
+
+    def test_read_only_cache_ignores_a_partial_append(self):
+        CachedEmbeddings(CountingEmbeddings(), self.cache_dir).embed_documents(["a", "bb"])
+        vectors_file = os.path.join(self.cache_dir, "vectors.f32")
+        with open(vectors_file, "ab") as f:
+            f.write(b"\0" * 8)  # The writer's vector is on disk, its key not yet
+
+        reader = CachedEmbeddings(CountingEmbeddings(), self.cache_dir, read_only=True)
+        self.assertEqual(reader.embed_documents(["bb"]), [[2.0, 1.0]])
+        self.assertEqual(os.path.getsize(vectors_file), 3 * 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
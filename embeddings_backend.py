@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import logging
+from langchain_core.embeddings import Embeddings
+
+
+DEFAULT_EMBEDDINGS_CONFIG = {"model": "models/embedding-001"}
+
+
+def available_cores() -> int:
+    """Number of CPU cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class LocalSentenceEmbeddings(Embeddings):
+    """
+    In-process sentence-transformers embeddings on CPU.
+
+    Documents are embedded in batches of `batch_size`; queries are embedded
+    one at a time without a network round trip. `threads` caps the torch
+    intra-op thread pool (0 means one per available core). Requires the
+    optional `sentence-transformers` package, which isn't in requirements.txt.
+    """
+
+    def __init__(
+        self,
+        model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        threads: int = 0,
+        device: str = "cpu",
+    ):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The local embeddings backend requires `pip install sentence-transformers`"
+            ) from e
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.threads = threads or available_cores()
+        torch.set_num_threads(self.threads)
+        self.model = SentenceTransformer(
+            model, device=device, token=os.getenv("HUGGING_FACE") or None
+        )
+        logging.info(
+            f"Loaded local embeddings {model} on {device} with {self.threads} thread(s)"
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings_config(path: str) -> dict:
+    """Load the embeddings configuration, writing the default one if missing."""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    with open(path, "w") as f:
+        json.dump(DEFAULT_EMBEDDINGS_CONFIG, f)
+    return dict(DEFAULT_EMBEDDINGS_CONFIG)
+
+
+def create_embeddings(config: dict) -> Embeddings:
+    """
+    Create the embeddings selected by `config`.
+
+    `"backend": "local"` selects `LocalSentenceEmbeddings`; anything else (or
+    no backend, as in older configs) passes the remaining keys to
+    `GoogleGenerativeAIEmbeddings`.
+    """
+    config = dict(config)
+    backend = config.pop("backend", "google")
+    if backend == "local":
+        return LocalSentenceEmbeddings(**config)
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(**config)
+
+
+def embeddings_slug(config: dict) -> str:
+    """Directory-safe name for the configured embedding model."""
+    name = f"{config.get('backend', 'google')}-{config['model']}"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name)
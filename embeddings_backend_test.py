@@ -0,0 +1,89 @@
+import os
+import json
+import tempfile
+import unittest
+import importlib.util
+import embeddings_backend
+from embeddings_backend import (
+    DEFAULT_EMBEDDINGS_CONFIG,
+    create_embeddings,
+    embeddings_slug,
+    load_embeddings_config,
+)
+
+
+class FakeLocalEmbeddings:
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+class EmbeddingsBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config_file = os.path.join(tmp.name, "embeddings_config.json")
+
+    def test_missing_config_writes_the_default(self):
+        config = load_embeddings_config(self.config_file)
+        self.assertEqual(config, DEFAULT_EMBEDDINGS_CONFIG)
+        config["model"] = "changed"  # The default itself is never modified
+        self.assertEqual(DEFAULT_EMBEDDINGS_CONFIG, {"model": "models/embedding-001"})
+        with open(self.config_file) as f:
+            self.assertEqual(json.load(f), DEFAULT_EMBEDDINGS_CONFIG)
+
+    def test_existing_config_overrides_the_default(self):
+        local = {"backend": "local", "model": "sentence-transformers/all-MiniLM-L6-v2", "threads": 2}
+        with open(self.config_file, "w") as f:
+            json.dump(local, f)
+        self.assertEqual(load_embeddings_config(self.config_file), local)
+
+    def test_local_backend_gets_the_remaining_keys(self):
+        original = embeddings_backend.LocalSentenceEmbeddings
+        embeddings_backend.LocalSentenceEmbeddings = FakeLocalEmbeddings
+        self.addCleanup(setattr, embeddings_backend, "LocalSentenceEmbeddings", original)
+
+        config = {"backend": "local", "model": "all-MiniLM-L6-v2", "batch_size": 8}
+        embeddings = create_embeddings(config)
+        self.assertIsInstance(embeddings, FakeLocalEmbeddings)
+        self.assertEqual(embeddings.kwargs, {"model": "all-MiniLM-L6-v2", "batch_size": 8})
+        self.assertEqual(config["backend"], "local")  # The caller's config is left as it was
+
+    def test_google_is_the_default_backend(self):
+        for config in (
+            {"model": "models/embedding-001", "google_api_key": "test"},
+            {"backend": "google", "model": "models/embedding-001", "google_api_key": "test"},
+        ):
+            embeddings = create_embeddings(config)
+            self.assertEqual(type(embeddings).__name__, "GoogleGenerativeAIEmbeddings")
+            self.assertEqual(embeddings.model, "models/embedding-001")
+
+    @unittest.skipIf(
+        importlib.util.find_spec("sentence_transformers"), "sentence-transformers is installed"
+    )
+    def test_local_backend_explains_the_missing_package(self):
+        with self.assertRaisesRegex(ImportError, "pip install sentence-transformers"):
+            create_embeddings({"backend": "local", "model": "all-MiniLM-L6-v2"})
+
+    def test_slug_is_stable_and_distinct(self):
+        google = embeddings_slug({"model": "models/embedding-001"})
+        self.assertEqual(google, "google-models_embedding-001")
+        self.assertEqual(google, embeddings_slug({"backend": "google", "model": "models/embedding-001"}))
+        # Settings that don't change the vectors don't change the directory
+        self.assertEqual(
+            embeddings_slug({"backend": "local", "model": "all-MiniLM-L6-v2", "threads": 4}),
+            embeddings_slug({"backend": "local", "model": "all-MiniLM-L6-v2", "batch_size": 8}),
+        )
+        slugs = {
+            google,
+            embeddings_slug({"backend": "local", "model": "models/embedding-001"}),
+            embeddings_slug({"backend": "local", "model": "sentence-transformers/all-MiniLM-L6-v2"}),
+            embeddings_slug({"backend": "local", "model": "sentence-transformers/all-mpnet-base-v2"}),
+        }
+        self.assertEqual(len(slugs), 4)
+        self.assertTrue(all("/" not in slug for slug in slugs))
+
+
+if __name__ == "__main__":
+    unittest.main()
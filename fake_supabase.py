@@ -0,0 +1,91 @@
+class FakeResult:
+
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Supports the insert and select/filter/order/range chains used by the bot."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.rows = list(client.tables.get(name, []))
+        self.columns = None
+        self.inserted = None
+
+    def insert(self, rows):
+        self.inserted = rows
+        return self
+
+    def select(self, columns):
+        self.columns = columns.split(",")
+        return self
+
+    def gte(self, column, value):
+        self.rows = [r for r in self.rows if r[column] >= value]
+        return self
+
+    def lt(self, column, value):
+        self.rows = [r for r in self.rows if r[column] < value]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda r: r[column])
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start : end + 1]
+        return self
+
+    def execute(self):
+        if self.client.fail:
+            raise ConnectionError("offline")
+        if self.inserted is not None:
+            self.client.tables.setdefault(self.name, []).extend(self.inserted)
+            return FakeResult(self.inserted)
+        self.client.pages += 1
+        return FakeResult([{c: r[c] for c in self.columns} for r in self.rows])
+
+
+class FakeCall:
+
+    def __init__(self, client, run):
+        self.client = client
+        self.run = run
+
+    def execute(self):
+        if self.client.fail:
+            raise ConnectionError("offline")
+        return FakeResult(self.run())
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the supabase-py client, shared by the tests.
+
+    `tables` maps table names to their rows, `activity` holds what the
+    increment function has added per user, and `fail` makes every call raise.
+    """
+
+    def __init__(self, tables: dict = None):
+        self.tables = tables or {}
+        self.activity = {}
+        self.calls = 0
+        self.pages = 0
+        self.fail = False
+
+    def table(self, name):
+        self.calls += 1
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.calls += 1
+
+        def run():
+            for row in params["deltas"]:
+                current = self.activity.setdefault(row["username"], {"coins_earned": 0, "count": 0})
+                current["coins_earned"] += row["coins_earned"]
+                current["count"] += row["count"]
+
+        return FakeCall(self, run)
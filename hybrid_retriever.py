@@ -0,0 +1,184 @@
+import os
+import logging
+from typing import Any
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+
+
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "hybrid")  # "hybrid", "vector" or "lexical"
+RRF_K = 60
+LEXICAL_FAST_PATH_COVERAGE = float(os.getenv("LEXICAL_FAST_PATH_COVERAGE", 0.9))
+LEXICAL_FAST_PATH_MARGIN = float(os.getenv("LEXICAL_FAST_PATH_MARGIN", 1.5))
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[Document]], k: int, rrf_k: int = RRF_K, with_scores: bool = False
+):
+    """
+    Merge ranked lists of documents, scoring each by the sum of 1 / (rrf_k + rank).
+
+    With `with_scores`, return `(document, score)` pairs instead of documents.
+    """
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    if with_scores:
+        return [(docs[key], scores[key]) for key in ranked]
+    return [docs[key] for key in ranked]
+
+
+def scored_documents(hits: list[tuple[Document, float]]) -> list[Document]:
+    """Copy the documents with their retrieval score in the `score` metadata."""
+    return [
+        Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+        for doc, score in hits
+    ]
+
+
+def relevance(result_lists: list[list[Document]]) -> dict:
+    """
+    Map each document's content to its best score relative to the top score of its list.
+
+    Scores of different retrievers (BM25, cosine similarity) aren't comparable,
+    but their share of the best hit in the same list is. Unscored lists count as fully relevant.
+    """
+    relevance = {}
+    for results in result_lists:
+        scores = [max(doc.metadata.get("score", 1.0), 0.0) for doc in results]
+        best = max(scores, default=0.0)
+        for doc, score in zip(results, scores):
+            share = score / best if best > 0 else 1.0
+            relevance[doc.page_content] = max(relevance.get(doc.page_content, 0.0), share)
+    return relevance
+
+
+class VectorStoreScoreRetriever(BaseRetriever):
+    """Similarity search on a LangChain vector store, keeping the relevance scores."""
+
+    vectorstore: Any
+    k: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        hits = self.vectorstore.similarity_search_with_relevance_scores(query, k=self.k)
+        return scored_documents(hits)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        hits = await self.vectorstore.asimilarity_search_with_relevance_scores(query, k=self.k)
+        return scored_documents(hits)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing BM25 and vector search results with reciprocal rank fusion.
+
+    When the best lexical hit covers (almost) all of the query terms and
+    clearly beats the best hit from any other article, e.g. for an exact product name or error
+    code, the lexical results are returned directly without a vector search.
+    Callers that would embed the question for other reasons (the semantic
+    answer cache) can check `lexically_confident` first and skip that too.
+
+    Results carry a `score` metadata for the context budget to compare:
+    the BM25 score of lexical results, the similarity of vector results, and
+    for fused results the best share of the top score in either list (see
+    `relevance`), with the RRF score kept in `rrf_score`.
+    """
+
+    vector_retriever: BaseRetriever
+    index: Any
+    k: int = 5
+    mode: str = RETRIEVER_MODE
+    fast_path_coverage: float = LEXICAL_FAST_PATH_COVERAGE
+    fast_path_margin: float = LEXICAL_FAST_PATH_MARGIN
+    stats: dict = Field(
+        default_factory=lambda: {"lexical_fast_path": 0, "hybrid": 0, "vector": 0}
+    )
+
+    def _lexical(self, query: str):
+        """Return the lexical results, and whether they are confident enough on their own."""
+        hits = self.index.search(query, self.k)
+        if not hits or self.mode == "lexical":
+            return scored_documents(hits), self.mode == "lexical"
+
+        best_doc, best = hits[0]
+        # Other chunks of the same article don't count as competition
+        runner_up = next(
+            (
+                score
+                for doc, score in hits[1:]
+                if doc.metadata.get("url") != best_doc.metadata.get("url")
+            ),
+            0.0,
+        )
+        confident = (
+            self.index.coverage(query, best_doc) >= self.fast_path_coverage
+            and best >= self.fast_path_margin * runner_up
+        )
+        return scored_documents(hits), confident
+
+    def lexically_confident(self, query: str) -> bool:
+        """Whether the query would be answered from the lexical results alone, without embedding it."""
+        if self.mode == "vector":
+            return False
+        return self._lexical(query)[1]
+
+    def _fuse(self, lexical_docs, vector_docs):
+        self.stats["hybrid"] += 1
+        result_lists = [vector_docs, lexical_docs]
+        shares = relevance(result_lists)
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "score": shares[doc.page_content], "rrf_score": rrf},
+            )
+            for doc, rrf in reciprocal_rank_fusion(result_lists, self.k, with_scores=True)
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        if self.mode == "vector":
+            self.stats["vector"] += 1
+            return self.vector_retriever.invoke(query, {"callbacks": run_manager.get_child()})
+
+        lexical_docs, confident = self._lexical(query)
+        if confident:
+            self.stats["lexical_fast_path"] += 1
+            logging.info(f"Lexical fast path for query: {query}")
+            return lexical_docs
+
+        vector_docs = self.vector_retriever.invoke(query, {"callbacks": run_manager.get_child()})
+        return self._fuse(lexical_docs, vector_docs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        if self.mode == "vector":
+            self.stats["vector"] += 1
+            return await self.vector_retriever.ainvoke(
+                query, {"callbacks": run_manager.get_child()}
+            )
+
+        lexical_docs, confident = self._lexical(query)
+        if confident:
+            self.stats["lexical_fast_path"] += 1
+            logging.info(f"Lexical fast path for query: {query}")
+            return lexical_docs
+
+        vector_docs = await self.vector_retriever.ainvoke(
+            query, {"callbacks": run_manager.get_child()}
+        )
+        return self._fuse(lexical_docs, vector_docs)
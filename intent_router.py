@@ -0,0 +1,165 @@
+import os
+import re
+import time
+import logging
+from datetime import datetime
+import numpy as np
+
+
+ROUTER_SIMILARITY = float(os.getenv("ROUTER_SIMILARITY", 0))  # 0 disables routing by embeddings
+DATE_PATTERN = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b")
+
+# Each rule is a list of patterns that must all be found in the question.
+# A question matching any of an intent's `exclude` patterns is never routed to it.
+INTENTS = {
+    "withdrawal_date": {
+        "rules": [
+            [
+                r"\b(when (will|does|do|should|can|would)|how long (does|do|will|until|till|for|to)"
+                r"|how many (business |working )?days|what date|eta)\b",
+                r"\bwithdr[ae]w\w*",
+                r"\b(arrive|receive|reach|get|credited|processed|take|come)\w*",
+            ],
+            [r"\b(calculate|estimate)\b", r"\bwithdrawal date\b"],
+        ],
+        "exclude": [r"\b(error|fail\w*|network|declined|rejected|problem|issue)s?\b"],
+        "prototypes": [
+            "When will I receive my withdrawal?",
+            "How long does a withdrawal take to arrive?",
+            "What date will my withdrawal be credited?",
+            "How many business days until my withdrawal is processed?",
+        ],
+    },
+    "ticket": {
+        # Only questions that are about opening a ticket and nothing else
+        "rules": [
+            [
+                r"^\W*((how|where) (do|can|should) i|can i|i (want|need) to|please)"
+                r" (open|submit|create|raise|file|make|start) (an? |my )?(new )?"
+                r"(support )?(ticket|request)\W*$"
+            ],
+            [
+                r"^\W*((how|where) (do|can|should) i|can i|i (want|need) to)"
+                r" (contact|reach) (the )?(support|team|staff)( team)?\W*$"
+            ],
+        ],
+        "prototypes": [
+            "How do I open a ticket?",
+            "Where can I submit a support request?",
+            "How can I contact the support team?",
+        ],
+    },
+    "greeting": {
+        "rules": [[r"^\W*(hi|hello|hey|gm|good (morning|afternoon|evening))( there| everyone| bot)?\W*$"]],
+        "prototypes": [],
+    },
+    "thanks": {
+        "rules": [[r"^\W*(thanks|thank you|thx|ty)( so much| a lot)?\W*$"]],
+        "prototypes": [],
+    },
+}
+
+CANNED_REPLIES = {
+    "withdrawal_date": (
+        "Withdrawals are processed within 7 business days, excluding weekends and public holidays. "
+        "To estimate when yours will arrive, use the </calculate_withdrawal:1321343083690070019> "
+        "command with the date you submitted it (DD-MM-YYYY)."
+    ),
+    "ticket": "You can open a ticket with the `/ticket` command, which walks you through submitting a request.",
+    "ticket_started": "Sure, let's open a ticket so the team can help you.",
+    "greeting": "Hi! Ask me anything about StackUp and I'll look it up in the Help Centre.",
+    "thanks": "You're welcome! Let me know if there's anything else.",
+}
+
+
+def find_date(question: str) -> datetime | None:
+    """The first DD-MM-YYYY (or DD/MM/YYYY) date in the question, if it is a valid date."""
+    for day, month, year in DATE_PATTERN.findall(question):
+        try:
+            return datetime(int(year), int(month), int(day))
+        except ValueError:
+            continue
+    return None
+
+
+class Route:
+    """Where a question was routed: its intent, how it was matched, and the date it mentions."""
+
+    def __init__(self, intent: str, method: str, score: float = 1.0, date: datetime = None):
+        self.intent = intent
+        self.method = method
+        self.score = score
+        self.date = date
+
+
+class IntentRouter:
+    """
+    Routes questions with a fixed answer away from the RAG chain.
+
+    Keyword rules are tried first and take microseconds. When prototype
+    embeddings are loaded, a question no rule matches can still be routed
+    by the cosine similarity of its embedding (already computed for the
+    answer cache) to the closest prototype, if it reaches `similarity`.
+    """
+
+    def __init__(self, intents: dict = INTENTS, similarity: float = ROUTER_SIMILARITY):
+        self.rules = [
+            (intent, [re.compile(p, re.IGNORECASE) for p in patterns])
+            for intent, spec in intents.items()
+            for patterns in spec["rules"]
+        ]
+        self.excludes = {
+            intent: [re.compile(p, re.IGNORECASE) for p in spec.get("exclude", [])]
+            for intent, spec in intents.items()
+        }
+        self.prototypes = [
+            (intent, text) for intent, spec in intents.items() for text in spec["prototypes"]
+        ]
+        self.similarity = similarity
+        self._matrix = None
+        self.stats = {intent: 0 for intent in intents}
+        self.stats["unrouted"] = 0
+
+    def embed_prototypes(self, embeddings):
+        """Embed the prototype questions. Blocking, run it off the event loop."""
+        if not self.prototypes or self.similarity <= 0:
+            return
+        vectors = np.array(
+            embeddings.embed_documents([text for _, text in self.prototypes]), dtype=np.float32
+        )
+        self._matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _routed(self, route: Route, started: float) -> Route:
+        self.stats[route.intent] += 1
+        logging.info(
+            f"Routed question to {route.intent} by {route.method} "
+            f"in {(time.perf_counter() - started) * 1e6:.0f}µs: {self.stats}"
+        )
+        return route
+
+    def _excluded(self, intent: str, question: str) -> bool:
+        return any(p.search(question) for p in self.excludes[intent])
+
+    def route(self, question: str) -> Route | None:
+        """Match the question against the keyword rules."""
+        started = time.perf_counter()
+        for intent, patterns in self.rules:
+            if self._excluded(intent, question):
+                continue
+            if all(p.search(question) for p in patterns):
+                return self._routed(Route(intent, "rule", date=find_date(question)), started)
+        return None
+
+    def route_vector(self, question: str, vector) -> Route | None:
+        """Match the question's embedding against the prototypes; counts it as unrouted otherwise."""
+        started = time.perf_counter()
+        if self._matrix is not None and vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            scores = self._matrix @ (vector / (np.linalg.norm(vector) or 1))
+            best = int(np.argmax(scores))
+            intent = self.prototypes[best][0]
+            if scores[best] >= self.similarity and not self._excluded(intent, question):
+                route = Route(intent, "embedding", float(scores[best]), find_date(question))
+                return self._routed(route, started)
+        self.stats["unrouted"] += 1
+        return None
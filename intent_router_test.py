@@ -0,0 +1,86 @@
+import time
+import unittest
+from datetime import datetime
+from benchmark import HashingEmbeddings, load_questions
+from intent_router import IntentRouter, find_date
+
+
+class IntentRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.router = IntentRouter(similarity=0.8)
+
+    def intent(self, question):
+        route = self.router.route(question)
+        return route.intent if route else None
+
+    def test_rules(self):
+        cases = {
+            "When will my withdrawal arrive?": "withdrawal_date",
+            "how long does a withdrawal take to get to my wallet": "withdrawal_date",
+            "I withdrew on 03-01-2025, when will I receive it?": "withdrawal_date",
+            "How do I open a ticket?": "ticket",
+            "where can I contact support": "ticket",
+            "I want to submit a support request.": "ticket",
+            "Hello!": "greeting",
+            "thank you so much": "thanks",
+            # Left to the RAG chain
+            "How do I withdraw my rewards?": None,
+            "My withdrawal failed, what should I do?": None,
+            "I opened a ticket but nobody replied": None,
+            "hello, how do I link my wallet?": None,
+            "When I try to withdraw I get an error": None,
+            "When withdrawing, which network should I choose to receive USDC?": None,
+            "When will my withdrawal arrive? It failed last time": None,
+            "I need to contact support about my account ban": None,
+            "How do I start a quest and make a ticket?": None,
+        }
+        for question, intent in cases.items():
+            self.assertEqual(self.intent(question), intent, question)
+
+    def test_help_centre_questions_reach_the_rag_chain(self):
+        routed = {q["question"] for q in load_questions() if self.router.route(q["question"])}
+        # Only the questions about withdrawal timing, which rule 8 of the prompt redirects anyway
+        self.assertEqual(
+            routed,
+            {
+                "When will my withdrawal arrive?",
+                "How long does it take to receive my withdrawn rewards?",
+            },
+        )
+
+    def test_rules_are_fast(self):
+        started = time.perf_counter()
+        for _ in range(1000):
+            self.router.route("How do I reset my password and update my email address?")
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+    def test_withdrawal_date_is_extracted(self):
+        route = self.router.route("when will a withdrawal made on 31/12/2024 arrive")
+        self.assertEqual(route.date, datetime(2024, 12, 31))
+        self.assertIsNone(find_date("withdrew on 31-02-2025"))
+
+    def test_embedding_routing(self):
+        embeddings = HashingEmbeddings()
+        self.router.embed_prototypes(embeddings)
+        question = "how do i open a ticket"
+        route = self.router.route_vector(question, embeddings.embed_query(question))
+        self.assertEqual((route.intent, route.method), ("ticket", "embedding"))
+
+        question = "when will my withdrawal arrive, it failed"
+        vector = embeddings.embed_query("how long does a withdrawal take to arrive")
+        self.assertIsNone(self.router.route_vector(question, vector))
+
+        question = "what are quests"
+        self.assertIsNone(self.router.route_vector(question, embeddings.embed_query(question)))
+        self.assertEqual(self.router.stats["unrouted"], 2)
+        self.assertEqual(self.router.stats["ticket"], 1)
+
+    def test_embedding_routing_is_optional(self):
+        router = IntentRouter(similarity=0)
+        router.embed_prototypes(HashingEmbeddings())
+        self.assertIsNone(router.route_vector("how do i open a ticket", [1.0, 0.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,49 +1,144 @@
-from flask import Flask, request, Response
-from flask_httpauth import HTTPBasicAuth
-from threading import Thread
+from aiohttp import web
+import asyncio
+import base64
+import binascii
+import hmac
+import html
 import logging
 import os
-
-app = Flask(__name__)
+from metrics import REGISTRY
+from log_viewer import LOG_BACKUPS, chunked, log_path, read_range, record_filter, setup_logging, tail
 
 # Set up logging
-logging.basicConfig(
-    filename="bot.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+setup_logging()
 
+LOGS_DEFAULT_TAIL = 1000
 
-auth = HTTPBasicAuth()
 USERNAME = os.getenv("USERNAME")
 PASSWORD = os.getenv("PASSWORD")
 
-# Sample log data (for demonstration)
-log_data = []
+HEALTH_CHECK = web.AppKey("health_check")
+_runner = None
+
 
+def verify_password(username, password):
+    if not USERNAME or not PASSWORD:
+        return False
+    return hmac.compare_digest(username, USERNAME) and hmac.compare_digest(password, PASSWORD)
 
-@app.route("/")
-def home():
-    return "Bot is alive 😊"
 
+def login_required(handler):
+    """Require HTTP basic auth with the USERNAME/PASSWORD credentials."""
 
-@app.route("/logs")
-@auth.login_required
-def view_logs():
-    with open("bot.log", "r") as log_file:
-        logs = log_file.read()
-    return f"<pre>{logs}</pre>"
+    async def wrapper(request: web.Request):
+        try:
+            scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+            username, _, password = base64.b64decode(credentials).decode().partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            scheme = ""
+        if scheme.lower() != "basic" or not verify_password(username, password):
+            return web.Response(
+                status=401,
+                text="Unauthorized Access",
+                headers={"WWW-Authenticate": 'Basic realm="Authentication Required"'},
+            )
+        return await handler(request)
 
+    return wrapper
+
+
+async def home(request: web.Request):
+    return web.Response(text="Bot is alive 😊")
+
+
+async def health(request: web.Request):
+    """Report the bot's state; 503 until it is connected and ready."""
+    status = request.app[HEALTH_CHECK]()
+    return web.json_response(status, status=200 if status.get("ok", True) else 503)
+
+
+@login_required
+async def view_logs(request: web.Request):
+    """
+    Stream log records, newest last.
+
+    Query parameters: `tail` (last N records, the default view), `since` /
+    `until` (timestamp prefixes like 2026-10-17 or 2026-10-17 09:30),
+    `start` / `end` (byte offsets), `level` (e.g. WARNING,ERROR),
+    `command` (e.g. ask) and `file` (1 for the most recent rotated log).
+    """
+    args = request.query
+    try:
+        backup = int(args.get("file", 0))
+        start = int(args.get("start", 0))
+        end = int(args["end"]) if "end" in args else None
+        count = int(args.get("tail", LOGS_DEFAULT_TAIL))
+    except ValueError:
+        return web.Response(status=400, text="Invalid query parameter")
+    if not 0 <= backup <= LOG_BACKUPS:
+        return web.Response(status=400, text="Invalid log file")
+    # Checked before the response starts: a bad offset would otherwise fail mid-stream
+    if start < 0 or count < 1:
+        return web.Response(status=400, text="start must be at least 0 and tail at least 1")
+
+    path = log_path(backup)
+    if not os.path.exists(path):
+        return web.Response(text="<pre></pre>", content_type="text/html")
+    match = record_filter(args.get("level", ""), args.get("command", ""))
+    ranged = any(key in args for key in ("since", "until", "start", "end"))
+    if ranged and "tail" not in args:
+        found = read_range(path, start, end, args.get("since", ""), args.get("until", ""), match)
+    else:
+        found = await asyncio.to_thread(tail, path, count, match)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+    await response.prepare(request)
+    await response.write(b"<pre>")
+    # File reads happen in a worker thread so the bot's event loop never waits on the disk
+    chunks = chunked(found)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        await response.write(html.escape(chunk.decode("utf-8", errors="replace")).encode())
+    await response.write(b"</pre>")
+    await response.write_eof()
+    return response
+
+
+@login_required
+async def metrics(request: web.Request):
+    return web.Response(
+        text=REGISTRY.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
 
-@auth.verify_password
-def verify_password(username, password):
-    return username == USERNAME and password == PASSWORD
 
+def create_app(health_check=None) -> web.Application:
+    """Build the web app; `health_check` returns a dict describing the bot's state."""
+    app = web.Application()
+    app[HEALTH_CHECK] = health_check or (lambda: {"ok": True})
+    app.router.add_get("/", home)
+    app.router.add_get("/health", health)
+    app.router.add_get("/logs", view_logs)
+    app.router.add_get("/metrics", metrics)
+    return app
 
-def run():
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
 
+async def keep_alive(health_check=None, port: int = None):
+    """
+    Serve the web app on the running event loop (the bot's), once per process.
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+    Later calls, e.g. after a gateway reconnect, return without starting a second server.
+    """
+    global _runner
+    if _runner is not None:
+        return
+    runner = web.AppRunner(create_app(health_check), access_log=None)
+    await runner.setup()
+    port = int(os.environ.get("PORT", 5000)) if port is None else port
+    try:
+        await web.TCPSite(runner, "0.0.0.0", port).start()
+    except OSError as e:
+        await runner.cleanup()
+        logging.error(f"Error starting keep-alive server on port {port}: {e}")
+        return
+    _runner = runner
+    logging.info(f"Keep-alive server listening on port {port}")
@@ -0,0 +1,65 @@
+import base64
+import socket
+import unittest
+from aiohttp.test_utils import TestClient, TestServer
+import keep_alive
+
+
+def auth(username, password):
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+class KeepAliveTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        keep_alive.USERNAME, keep_alive.PASSWORD = "admin", "secret"
+        self.ready = False
+        app = keep_alive.create_app(lambda: {"ok": self.ready})
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_health(self):
+        response = await self.client.get("/health")
+        self.assertEqual(response.status, 503)
+        self.ready = True
+        response = await self.client.get("/health")
+        self.assertEqual(await response.json(), {"ok": True})
+
+    async def test_logs_and_metrics_require_auth(self):
+        for path in ("/logs", "/metrics"):
+            response = await self.client.get(path)
+            self.assertEqual(response.status, 401)
+            response = await self.client.get(path, headers=auth("admin", "wrong"))
+            self.assertEqual(response.status, 401)
+
+        response = await self.client.get("/metrics", headers=auth("admin", "secret"))
+        self.assertEqual(response.status, 200)
+        self.assertIn("rag_stage_seconds", await response.text())
+        response = await self.client.get("/logs?tail=5", headers=auth("admin", "secret"))
+        self.assertEqual(response.status, 200)
+        self.assertTrue((await response.text()).startswith("<pre>"))
+
+    async def test_invalid_log_ranges_are_rejected(self):
+        for query in ("start=-1", "start=-1&end=100", "tail=0", "tail=-5", "tail=x", "file=99"):
+            response = await self.client.get(f"/logs?{query}", headers=auth("admin", "secret"))
+            self.assertEqual(response.status, 400, query)
+
+    async def test_starts_once(self):
+        with socket.socket() as s:
+            s.bind(("", 0))
+            port = s.getsockname()[1]
+        await keep_alive.keep_alive(port=port)
+        runner = keep_alive._runner
+        self.addAsyncCleanup(runner.cleanup)
+        self.addCleanup(setattr, keep_alive, "_runner", None)
+        # A reconnect calling it again must not try to bind the port a second time
+        await keep_alive.keep_alive(port=port)
+        self.assertIs(keep_alive._runner, runner)
+
+
+if __name__ == "__main__":
+    unittest.main()
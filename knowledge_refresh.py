@@ -0,0 +1,132 @@
+import os
+import shutil
+import logging
+import importlib.util
+from datetime import datetime
+from embeddings_backend import embeddings_slug
+from rag import (
+    DATA_FILE,
+    EMBEDDINGS_CONFIG,
+    VECTORSTORE_DIR,
+    VECTORSTORE_PATH,
+    knowledge_base_version,
+    setup_retriever,
+)
+
+
+EDA_SCRIPT = "eda-data.py"
+INDEX_VERSIONS_DIR = os.path.join(VECTORSTORE_DIR, f"{embeddings_slug(EMBEDDINGS_CONFIG)}-versions")
+INDEX_VERSIONS_KEPT = int(os.getenv("INDEX_VERSIONS_KEPT", 2))
+KNOWLEDGE_REFRESH_HOURS = float(os.getenv("KNOWLEDGE_REFRESH_HOURS", 24))  # 0 to disable
+CURRENT_FILE = "CURRENT"
+VERSION_DATA_FILE = "cleaned_data.txt"
+
+
+def load_eda_data():
+    """Import eda-data.py, whose name isn't a valid module name."""
+    spec = importlib.util.spec_from_file_location("eda_data", EDA_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fetch_cleaned_articles() -> list[dict]:
+    """Fetch and clean the Help Centre articles like eda-data.py, reusing its manifest."""
+    eda_data = load_eda_data()
+    manifest = eda_data.load_manifest()
+    pages, page_count = eda_data.fetch_pages(eda_data.API_URL, manifest=manifest)
+    articles, manifest, stats = eda_data.refresh_articles(pages, page_count, manifest)
+    eda_data.save_manifest(manifest)
+    logging.info(f"Fetched {len(articles)} articles for the knowledge refresh: {stats}")
+    return articles
+
+
+class IndexVersions:
+    """
+    Versioned knowledge base directories, each with its cleaned data and index.
+
+    `CURRENT` names the version in use and is replaced atomically, so a
+    restart always opens a complete index. Until the first refresh the
+    unversioned `VECTORSTORE_PATH` and `DATA_FILE` are used.
+    """
+
+    def __init__(self, root: str = INDEX_VERSIONS_DIR, keep: int = INDEX_VERSIONS_KEPT):
+        self.root = root
+        self.keep = keep
+
+    def versions(self) -> list[str]:
+        """Versions on disk, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def current(self) -> str:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), "r", encoding="utf-8") as f:
+                version = f.read().strip()
+        except OSError:
+            return ""
+        return version if os.path.isdir(os.path.join(self.root, version)) else ""
+
+    def paths(self, version: str = None) -> tuple[str, str]:
+        """The index directory and data file of `version`, by default the current one."""
+        version = self.current() if version is None else version
+        if not version:
+            return VECTORSTORE_PATH, DATA_FILE
+        directory = os.path.join(self.root, version)
+        return directory, os.path.join(directory, VERSION_DATA_FILE)
+
+    def build(self, articles: list[dict], setup=setup_retriever, version: str = None):
+        """
+        Write the articles and index them into a new version. Blocking.
+
+        Versions are named by the time they are built unless `version` is
+        given. Returns `(version, retriever)`, or `None` if the cleaned data is
+        the same as the current version's.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        version = version or datetime.now().strftime("%Y%m%dT%H%M%S")
+        directory, data_file = self.paths(version)
+        os.makedirs(directory)
+        load_eda_data().write_cleaned_articles(articles, data_file)
+
+        if knowledge_base_version(data_file) == knowledge_base_version(self.paths()[1]):
+            shutil.rmtree(directory)
+            logging.info("Knowledge base unchanged, keeping the current index")
+            return None
+
+        retriever = setup(persist_directory=directory, data_file=data_file)
+        if retriever is None:
+            shutil.rmtree(directory)
+            return None
+        return version, retriever
+
+    def activate(self, version: str, data_file: str = DATA_FILE):
+        """Make `version` current, copy its data to `data_file` and remove old versions."""
+        path = os.path.join(self.root, CURRENT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(path + ".tmp", path)
+
+        shutil.copyfile(self.paths(version)[1], data_file + ".tmp")
+        os.replace(data_file + ".tmp", data_file)
+        self.collect_garbage()
+
+    def collect_garbage(self):
+        """
+        Remove all but the `keep` newest versions, never the current one.
+
+        The version just swapped out is among those kept, so questions still
+        answered from it can finish.
+        """
+        current = self.current()
+        for version in self.versions()[: -self.keep or None]:
+            if version == current:
+                continue
+            try:
+                shutil.rmtree(os.path.join(self.root, version))
+                logging.info(f"Removed old knowledge base version {version}")
+            except OSError as e:
+                print(f"Error removing knowledge base version {version}: {e}")
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from knowledge_refresh import IndexVersions, VERSION_DATA_FILE
+
+
+def article(title, body):
+    return {"title": title, "url": f"https://help.example.com/{title}", "body": body}
+
+
+class IndexVersionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "versions")
+        self.data_file = os.path.join(self.tmp.name, "cleaned_data.txt")
+        self.versions = IndexVersions(self.root, keep=2)
+        self.built = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def setup(self, persist_directory, data_file):
+        self.built.append(persist_directory)
+        with open(os.path.join(persist_directory, "index"), "w") as f:
+            f.write("index")
+        return f"retriever for {os.path.basename(persist_directory)}"
+
+    def build_and_activate(self, articles, version):
+        built = self.versions.build(articles, self.setup, version)
+        if built:
+            self.versions.activate(built[0], self.data_file)
+        return built
+
+    def test_builds_and_activates_a_new_version(self):
+        version, retriever = self.build_and_activate([article("a", "one")], "v1")
+        self.assertEqual(version, "v1")
+        self.assertEqual(retriever, "retriever for v1")
+        self.assertEqual(self.versions.current(), "v1")
+        directory, data_file = self.versions.paths()
+        self.assertEqual(directory, os.path.join(self.root, "v1"))
+        self.assertEqual(os.path.basename(data_file), VERSION_DATA_FILE)
+        with open(self.data_file) as f, open(data_file) as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_unchanged_articles_keep_the_current_version(self):
+        self.build_and_activate([article("a", "one")], "v1")
+        self.assertIsNone(self.build_and_activate([article("a", "one")], "v2"))
+        self.assertEqual(self.versions.versions(), ["v1"])
+        self.assertEqual(len(self.built), 1)
+
+    def test_old_versions_are_removed(self):
+        for i, body in enumerate(["one", "two", "three", "four"], 1):
+            self.build_and_activate([article("a", body)], f"v{i}")
+        self.assertEqual(self.versions.versions(), ["v3", "v4"])
+        self.assertEqual(self.versions.current(), "v4")
+
+    def test_current_version_is_never_removed(self):
+        for i, body in enumerate(["one", "two"], 1):
+            self.build_and_activate([article("a", body)], f"v{i}")
+        # A newer version was built but never activated
+        os.makedirs(os.path.join(self.root, "v3"))
+        os.makedirs(os.path.join(self.root, "v4"))
+        self.versions.collect_garbage()
+        self.assertEqual(self.versions.versions(), ["v2", "v3", "v4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
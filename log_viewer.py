@@ -0,0 +1,226 @@
+import os
+import re
+import bisect
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+
+
+# Each process of a sharded deployment logs to its own file and tags its records
+PROCESS_INDEX = os.getenv("PROCESS_INDEX") or None
+LOG_FILE = f"bot-{PROCESS_INDEX}.log" if PROCESS_INDEX not in (None, "0") else "bot.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - " + (
+    f"[process {PROCESS_INDEX}] %(message)s" if PROCESS_INDEX is not None else "%(message)s"
+)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 5))
+BLOCK_SIZE = 64 * 1024
+INDEX_EVERY = 256 * 1024  # bytes between entries of the time index
+
+# "2026-10-17 10:00:00,123 - INFO - message"; other lines continue the previous record
+RECORD_START = re.compile(rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3} - ([A-Z]+) - ")
+
+# Log messages written by each command, for filtering by command
+COMMAND_MESSAGES = {
+    "ask": "Question asked:",
+    "mark_ask": "Mark Question asked:",
+    "calculate_withdrawal": "Withdrawal date calculation request",
+    "withdrawal_estimates": "Withdrawal estimates request",
+    "lucky_winner": "Lucky winner",
+    "help": "Help command",
+}
+
+
+def setup_logging(path: str = LOG_FILE):
+    """Log to `path`, rotating it once it reaches LOG_MAX_BYTES and keeping LOG_BACKUPS old files."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            RotatingFileHandler(
+                path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, delay=True
+            )
+        ],
+    )
+
+
+def log_path(backup: int = 0, path: str = LOG_FILE) -> str:
+    """The current log file, or its `backup`-th rotated file."""
+    return f"{path}.{backup}" if backup else path
+
+
+def record_filter(level: str = "", command: str = ""):
+    """Build a predicate on raw records matching any of the given levels and the command."""
+    levels = {l.strip().upper().encode() for l in level.split(",") if l.strip()}
+    needle = COMMAND_MESSAGES.get(command, command).lower().encode() if command else b""
+
+    def match(record: bytes) -> bool:
+        if levels:
+            start = RECORD_START.match(record)
+            if not start or start.group(2) not in levels:
+                return False
+        return not needle or needle in record.lower()
+
+    return match
+
+
+def records(lines):
+    """Group lines into records, keeping continuation lines (e.g. tracebacks) with their record."""
+    record = b""
+    for line in lines:
+        if RECORD_START.match(line) and record:
+            yield record
+            record = b""
+        record += line
+    if record:
+        yield record
+
+
+def reverse_lines(f, block_size: int = BLOCK_SIZE):
+    """Yield the lines of a binary file from the last one to the first, reading blocks from the end."""
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    rest = b""
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + rest).split(b"\n")
+        rest = lines.pop(0)
+        for line in reversed(lines):
+            if line:
+                yield line + b"\n"
+    if rest:
+        yield rest + b"\n"
+
+
+def tail(path: str, n: int, match=None) -> list[bytes]:
+    """The last `n` records of the file (matching `match`), without reading the rest of it."""
+    found = []
+    continuation = []
+    with open(path, "rb") as f:
+        for line in reverse_lines(f):
+            continuation.append(line)
+            if not RECORD_START.match(line):
+                continue
+            record = b"".join(reversed(continuation))
+            continuation = []
+            if match is None or match(record):
+                found.append(record)
+                if len(found) >= n:
+                    break
+    return found[::-1]
+
+
+class LogIndex:
+    """
+    Sparse index from record timestamps to byte offsets in a log file.
+
+    An entry is kept for the first record after every INDEX_EVERY bytes, so
+    a time range query seeks close to its start instead of scanning the
+    whole file. The index is extended as the file grows and rebuilt when it
+    is rotated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.times = []
+        self.offsets = []
+        self.indexed = 0
+        self.inode = None
+        self._lock = threading.Lock()
+
+    def update(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if stat.st_ino != self.inode or stat.st_size < self.indexed:
+                self.times, self.offsets, self.indexed = [], [], 0
+                self.inode = stat.st_ino
+
+            with open(self.path, "rb") as f:
+                f.seek(self.indexed)
+                offset = self.indexed
+                next_entry = self.offsets[-1] + INDEX_EVERY if self.offsets else 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Still being written
+                    start = RECORD_START.match(line)
+                    if start and offset >= next_entry:
+                        self.times.append(start.group(1).decode())
+                        self.offsets.append(offset)
+                        next_entry = offset + INDEX_EVERY
+                    offset += len(line)
+                self.indexed = offset
+
+    def offset_before(self, time: str) -> int:
+        """A byte offset at or before the first record logged at `time` or later."""
+        self.update()
+        i = bisect.bisect_left(self.times, time)
+        return self.offsets[i - 1] if i > 0 else 0
+
+
+_indexes = {}
+
+
+def read_range(
+    path: str,
+    start: int = 0,
+    end: int = None,
+    since: str = "",
+    until: str = "",
+    match=None,
+):
+    """
+    Yield the records in a byte range and/or time range, matching `match`.
+
+    `start` must be at least 0; callers validate it, since this generator
+    only fails once it is read. `since` and `until` are timestamp prefixes such as "2026-10-17" or
+    "2026-10-17 09:30"; `until` is inclusive of its prefix.
+    """
+    if since:
+        index = _indexes.setdefault(path, LogIndex(path))
+        start = max(start, index.offset_before(since))
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()  # Skip the rest of the line the offset falls in
+        lines = iter(f.readline, b"")
+        if end is not None:
+            lines = _until_offset(f, lines, end)
+        for i, record in enumerate(records(lines)):
+            stamp = RECORD_START.match(record)
+            if not stamp and i == 0 and start:
+                continue  # The end of a record that started before the offset
+            if stamp:
+                time = stamp.group(1).decode()
+                if since and time < since:
+                    continue
+                if until and time[: len(until)] > until:
+                    break
+            if match is None or match(record):
+                yield record
+
+
+def _until_offset(f, lines, end: int):
+    for line in lines:
+        if f.tell() - len(line) >= end:
+            return
+        yield line
+
+
+def chunked(records, size: int = BLOCK_SIZE):
+    """Join records into chunks of about `size` bytes for a streamed response."""
+    chunk = []
+    length = 0
+    for record in records:
+        chunk.append(record)
+        length += len(record)
+        if length >= size:
+            yield b"".join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield b"".join(chunk)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import log_viewer
+from log_viewer import LogIndex, read_range, record_filter, tail
+
+
+class LogViewerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "bot.log")
+        lines = []
+        for i in range(2000):
+            minute = f"{i // 60:02}:{i % 60:02}"
+            if i % 100 == 0:
+                lines.append(f"2026-10-17 10:{minute},000 - ERROR - Error in 'ask' command: {i}\n")
+                lines.append("Traceback (most recent call last):\n  boom\n")
+            else:
+                lines.append(f"2026-10-17 10:{minute},000 - INFO - Question asked: q{i} by user\n")
+        with open(self.path, "w") as f:
+            f.writelines(lines)
+        index_every = log_viewer.INDEX_EVERY
+        log_viewer.INDEX_EVERY = 4096
+        self.addCleanup(setattr, log_viewer, "INDEX_EVERY", index_every)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_tail_reads_records_from_the_end(self):
+        last = tail(self.path, 2)
+        self.assertEqual(len(last), 2)
+        self.assertTrue(last[-1].endswith(b"q1999 by user\n"))
+
+        errors = tail(self.path, 3, record_filter(level="error"))
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(errors[-1].endswith(b"1900\nTraceback (most recent call last):\n  boom\n"))
+
+    def test_time_range_uses_the_index(self):
+        found = list(read_range(self.path, since="2026-10-17 10:20:00", until="2026-10-17 10:20:59"))
+        self.assertEqual(len(found), 60)
+        self.assertIn(b"command: 1200\nTraceback", found[0])
+        self.assertTrue(found[-1].endswith(b"q1259 by user\n"))
+        index = log_viewer._indexes[self.path]
+        self.assertGreater(len(index.offsets), 10)
+        self.assertGreater(index.offset_before("2026-10-17 10:20:00"), 0)
+
+    def test_byte_range_and_command_filter(self):
+        size = os.path.getsize(self.path)
+        found = list(read_range(self.path, start=size // 2 + 7, end=size, match=record_filter(command="ask")))
+        self.assertTrue(all(r.startswith(b"2026-10-17") for r in found))
+        self.assertLess(len(found), 1100)
+        self.assertTrue(found[-1].endswith(b"q1999 by user\n"))
+
+    def test_index_rebuilds_after_rotation(self):
+        index = LogIndex(self.path)
+        index.update()
+        os.replace(self.path, self.path + ".1")
+        with open(self.path, "w") as f:
+            f.write("2026-10-18 00:00:00,000 - INFO - Question asked: new\n")
+        index.update()
+        self.assertEqual(index.times, ["2026-10-18 00:00:00"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,43 @@
+import re
 import random
+from bisect import bisect_right
+
+
+MAX_WINNERS = 100_000  # Sanity limit
+RANGE_PATTERN = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+
+
+def sample_ranks(population: int, count: int, rng: random.Random) -> set[int]:
+    """
+    Pick `count` distinct ranks in `range(population)` uniformly (Floyd's algorithm).
+
+    Takes O(count) time and memory whatever the population size.
+    """
+    picked = set()
+    for j in range(population - count, population):
+        t = rng.randrange(j + 1)
+        picked.add(j if t in picked else t)
+    return picked
+
+
+def rank_to_number(rank: int, start: int, gaps: list[int]) -> int:
+    """
+    Map the `rank`-th allowed number (0-based) back to the number itself.
+
+    `gaps[i]` is how many allowed numbers precede the i-th excluded number
+    (sorted), so the excluded numbers before the answer are found by bisection.
+    """
+    return start + rank + bisect_right(gaps, rank)
 
 
 def pick_lucky_winner(range: str, count: int, seed: int, exclude: str):
     """Picks lucky number(s) from a given range
 
+    Winners are drawn uniformly without replacement from the range minus the
+    excluded numbers, in time depending on `count` and the number of
+    exclusions rather than the size of the range. The same arguments and seed
+    always give the same winners.
+
     Parameters:
         range (str): Range of numbers to choose from. Provided in `x-y` format. Both numbers are included as possible winners.
         count (int): Number of lucky winners. Should be more than 1.
@@ -24,52 +58,39 @@ def pick_lucky_winner(range: str, count: int, seed: int, exclude: str):
         return "Please provide a range.", None, None
 
     # Validate range
-    range = range.split("-")
-    range = list(map(str.strip, range))  # clean up whitespace
-    range = [x for x in range if len(x) > 0]  # drop empty string
-    if len(range) != 2:
-        return "Please provide range in format `x-y`.", None, None
-    if range[0] == range[1]:
-        return "In range `x-y`, `x` and `y` cannot be the same.", None, None
-    if not all(map(str.isdigit, range)):
+    match = RANGE_PATTERN.match(range)
+    if not match:
+        if len([x for x in range.split("-") if x.strip()]) != 2:
+            return "Please provide range in format `x-y`.", None, None
         return "In range `x-y`, both `x` and `y` must be digits.", None, None
-    range = [int(x) for x in range]  # cast to int
-
-    start_range, end_range = min(range), max(range)
-
-    # Validate exclude
-    if exclude.strip():
-        exclude = exclude.split(",")
-        exclude = list(map(str.strip, exclude))  # clean up whitespace
-        exclude = [x for x in exclude if len(x) > 0]  # drop empty string
-        exclude = [x for x in exclude if x.isdigit()]  # drop non-digits
-        exclude = list(set(exclude))  # get unique
-        exclude = [int(x) for x in exclude]  # cast to int
-        exclude = [
-            x for x in exclude if x >= start_range and x <= end_range
-        ]  # drop not-in-range
-    else:
-        exclude = []
+    bounds = [int(x) for x in match.groups()]
+    if bounds[0] == bounds[1]:
+        return "In range `x-y`, `x` and `y` cannot be the same.", None, None
+    start_range, end_range = min(bounds), max(bounds)
+
+    # Validate exclude: unique, sorted, in range; anything that isn't a number is ignored
+    excluded = sorted(
+        {
+            int(x)
+            for x in map(str.strip, exclude.split(","))
+            if x.isdigit() and start_range <= int(x) <= end_range
+        }
+    )
 
     # Validate count
-    soft_limit = (end_range - start_range + 1) - len(exclude)
+    soft_limit = (end_range - start_range + 1) - len(excluded)
     count = min(soft_limit, count)
     if soft_limit <= 0:
         return "You have excluded everyone. Who do you want me to pick?", None, None
     elif count <= 0:
         return f"I can't pick {count} winner(s).", None, None
-    elif count > 100:  # Sanity limit
+    elif count > MAX_WINNERS:
         return "Really? That's a really big range. I'm not doing it >:(", None, None
 
     # Logic to select lucky winners
-    winners = []
-    random.seed(seed)
-    while len(winners) != count:
-        candidate = random.randint(start_range, end_range)
-        if candidate not in exclude and candidate not in winners:
-            winners.append(candidate)
-
-    winners.sort()
+    gaps = [x - start_range - i for i, x in enumerate(excluded)]
+    ranks = sample_ranks(soft_limit, count, random.Random(seed))
+    winners = sorted(rank_to_number(rank, start_range, gaps) for rank in ranks)
     winners = list(map(str, winners))  # cast to str
     return None, winners, seed
 
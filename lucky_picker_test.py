@@ -0,0 +1,66 @@
+import time
+import random
+import unittest
+from collections import Counter
+from lucky_picker import MAX_WINNERS, pick_lucky_winner
+
+
+class PickLuckyWinnerTest(unittest.TestCase):
+
+    def test_same_seed_same_winners(self):
+        first = pick_lucky_winner("1-1000", 10, 42, "5,6,7")
+        second = pick_lucky_winner("1-1000", 10, 42, "5,6,7")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, pick_lucky_winner("1-1000", 10, 43, "5,6,7"))
+
+    def test_winners_are_unique_sorted_and_not_excluded(self):
+        error, winners, seed = pick_lucky_winner("10-30", 15, 7, "10,12, 14,abc,99,30")
+        self.assertIsNone(error)
+        self.assertEqual(seed, 7)
+        numbers = [int(w) for w in winners]
+        self.assertEqual(numbers, sorted(set(numbers)))
+        self.assertEqual(len(numbers), 15)
+        self.assertTrue(all(10 <= n <= 30 for n in numbers))
+        self.assertFalse({10, 12, 14, 30} & set(numbers))
+
+    def test_count_is_clamped_to_everyone_left(self):
+        _, winners, _ = pick_lucky_winner("5-1", 10, 1, "2,4")
+        self.assertEqual(winners, ["1", "3", "5"])
+
+    def test_uniform_over_allowed_numbers(self):
+        counts = Counter()
+        for seed in range(6000):
+            _, winners, _ = pick_lucky_winner("1-10", 2, seed, "3,7")
+            counts.update(winners)
+        self.assertEqual(set(counts), {"1", "2", "4", "5", "6", "8", "9", "10"})
+        # Each of the 8 numbers should be picked 6000 * 2 / 8 = 1500 times
+        self.assertTrue(all(1350 < c < 1650 for c in counts.values()), counts)
+
+    def test_large_range_with_many_exclusions(self):
+        rng = random.Random(0)
+        excluded = rng.sample(range(1, 1_000_001), 5000)
+        started = time.perf_counter()
+        error, winners, _ = pick_lucky_winner("1-1000000", 5000, 3, ",".join(map(str, excluded)))
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertIsNone(error)
+        self.assertEqual(len(set(winners)), 5000)
+        self.assertFalse(set(map(int, winners)) & set(excluded))
+
+    def test_errors(self):
+        self.assertEqual(pick_lucky_winner(" ", 1, 1, "")[0], "Please provide a range.")
+        self.assertEqual(pick_lucky_winner("1-2-3", 1, 1, "")[0], "Please provide range in format `x-y`.")
+        self.assertEqual(pick_lucky_winner("a-3", 1, 1, "")[0], "In range `x-y`, both `x` and `y` must be digits.")
+        self.assertEqual(pick_lucky_winner("3-3", 1, 1, "")[0], "In range `x-y`, `x` and `y` cannot be the same.")
+        self.assertEqual(
+            pick_lucky_winner("1-2", 1, 1, "1,2")[0],
+            "You have excluded everyone. Who do you want me to pick?",
+        )
+        self.assertEqual(pick_lucky_winner("1-2", 0, 1, "")[0], "I can't pick 0 winner(s).")
+        self.assertEqual(
+            pick_lucky_winner(f"1-{MAX_WINNERS * 2}", MAX_WINNERS + 1, 1, "")[0],
+            "Really? That's a really big range. I'm not doing it >:(",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,40 +1,55 @@
-import os, re, random, json, calendar, logging, asyncio
+import os, io, re, math, random, json, calendar, logging, asyncio, time
+from dotenv import load_dotenv
+
+# Load environment variables for API keys and settings, before the modules
+# below read their settings on import
+load_dotenv()
+
 import discord
 import pytz
 import auth_admin
 from pathlib import Path
+from contextlib import aclosing
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from keep_alive import keep_alive
-from dotenv import load_dotenv
+from log_viewer import setup_logging
 from discord.ext import tasks, commands
 from discord.ext.commands.context import Context
 from discord import app_commands
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
+from admission import LLM_CALLS_SAVED, Admission, RateLimited, SingleFlight
+from answer_cache import AnswerCache, normalize_question
+from ask_queue import AskQueue, AskQueueFull
+from streaming_reply import DISCORD_MESSAGE_LIMIT, StreamingReply
+from metrics import REGISTRY
+from business_days import BusinessCalendar, HOLIDAYS_FILE
+from intent_router import CANNED_REPLIES, IntentRouter
+from knowledge_refresh import IndexVersions, KNOWLEDGE_REFRESH_HOURS, fetch_cleaned_articles
+from sharding import PROCESS_INDEX, SHARD_COUNT, bot_intents, is_primary, shard_ids
+from rag import (
+    answer_cache_version,
+    create_or_load_embeddings,
+    embedding_cache_stats,
+    setup_rag_chain,
+    setup_retriever,
+)
 from lucky_picker import pick_lucky_winner, get_random_seed
 from ticket_helper import TicketHelper, start_ticket_embed
-from work_tracking import embeds_processing, generate_report
+from work_tracking import embeds_processing, send_report, writer as activity_writer
 
-# Load environment variables for API keys
-load_dotenv()
+setup_logging()
 
-logging.basicConfig(
-    filename="bot.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+
+process_started_at = time.perf_counter()
 
 
 # Constants
-EMBEDDINGS_CONFIG_FILE = "embeddings_config.json"
-VECTORSTORE_DIR = "vectorstore"
+WITHDRAWAL_BUSINESS_DAYS = 7
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "true").lower() == "true"
+INDEX_WAIT_SECONDS = 30  # Secondary processes poll for the primary's index this often
+LUCKY_WINNERS_LOGGED = 100
 
 
 singapore_tz = pytz.timezone("Asia/Singapore")
@@ -44,36 +59,8 @@ end_time = start_time + timedelta(days=1)
 team_holiday_end = singapore_tz.localize(datetime(2025, 1, 2, 0, 0))
 holiday_withdrawal_time_delay = datetime(2024, 12, 26, 10, 0)
 
-# Singapore public holidays (2024 and 2025) to consider
-HOLIDAYS = [
-    # 2024 holidays
-    datetime(2024, 10, 31),  # Deepavali
-    datetime(2024, 12, 25),  # Christmas Day
-    datetime(2024, 12, 30),  # Team Holiday Day
-    datetime(2024, 12, 31),  # Team Holiday Day
-    # 2025 holidays
-    datetime(2025, 1, 1),  # New Year's Day
-    datetime(2025, 1, 29),  # Chinese New Year
-    datetime(2025, 1, 30),  # Chinese New Year
-    datetime(2025, 3, 31),  # Hari Raya Puasa
-    datetime(2025, 4, 18),  # Good Friday
-    datetime(2025, 5, 1),  # Labour Day
-    datetime(2025, 5, 12),  # Vesak Day
-    datetime(2025, 6, 7),  # Hari Raya Haji
-    datetime(2025, 8, 9),  # National Day
-    datetime(2025, 10, 20),  # Deepavali (tentative)
-    datetime(2025, 12, 25),  # Christmas Day
-]
-
-
-def is_weekend(date: datetime):
-    """Check if the date is on a weekend (Saturday or Sunday)."""
-    return date.weekday() >= 5
-
-
-def is_holiday(date: datetime):
-    """Check if the date is a holiday."""
-    return date in HOLIDAYS
+# Singapore public holidays and team holidays, per year
+business_calendar = BusinessCalendar.load(HOLIDAYS_FILE)
 
 
 def is_team_on_holiday():
@@ -87,137 +74,312 @@ def is_team_on_holiday():
     return holiday_note
 
 
-def calculate_withdrawal_date(start_date: datetime, days_to_add: int):
-    """Calculate the expected withdrawal date considering weekends and public holidays."""
-    current_date = start_date
-    days_added = 0
+async def init_rag_chain():
+    """
+    Build the RAG chain once, with the blocking index work off the event loop.
 
-    while days_added < days_to_add:
-        current_date += timedelta(days=1)
-        if not is_weekend(current_date) and not is_holiday(current_date):
-            days_added += 1
-
-    return current_date
+    Secondary processes only open the index, waiting until the primary
+    process has built it.
+    """
+    global rag_chain, retriever, loaded_version
+    started = time.perf_counter()
+    try:
+        # Secondary processes only read the shared embedding cache
+        embeddings = await asyncio.to_thread(create_or_load_embeddings, not is_primary())
+        while True:
+            loaded_version = index_versions.current()
+            persist_directory, data_file = index_versions.paths(loaded_version)
+            retriever = await asyncio.to_thread(
+                setup_retriever,
+                embeddings,
+                persist_directory,
+                data_file,
+                read_only=not is_primary(),
+            )
+            if retriever is not None or is_primary():
+                break
+            logging.info("Waiting for the primary process to build the index")
+            await asyncio.sleep(INDEX_WAIT_SECONDS)
+        if retriever is None:
+            return
+        rag_chain = setup_rag_chain(retriever)
+
+        answer_cache.embeddings = embeddings
+        kb_version = answer_cache_version()
+        if kb_version != answer_cache.kb_version:
+            answer_cache.invalidate(kb_version)
+    except Exception as e:
+        logging.error(f"Error setting up RAG chain: {e}")
+        return
 
+    logging.info(
+        f"RAG chain ready in {time.perf_counter() - started:.2f}s "
+        f"({time.perf_counter() - process_started_at:.2f}s after start)"
+    )
 
-def load_documents(file_path):
-    """Load documents from a text file."""
     try:
-        loader = TextLoader(file_path)
-        return loader.load()
+        await asyncio.to_thread(router.embed_prototypes, answer_cache.embeddings)
     except Exception as e:
-        print(f"Error loading documents: {e}")
-        return []
+        logging.error(f"Error embedding intent prototypes: {e}")
+
+
+async def refresh_knowledge():
+    """
+    Re-fetch the Help Centre articles and, if they changed, swap in a new index.
+
+    The new version is built off the event loop while questions are still
+    answered from the current one. Swapping the globals is a single step on
+    the event loop, and questions already running keep the chain they started
+    with.
+    """
+    global rag_chain, retriever, loaded_version
+    if rag_chain is None:
+        return  # Still starting up
+    started = time.perf_counter()
+    try:
+        articles = await asyncio.to_thread(fetch_cleaned_articles)
+        built = await asyncio.to_thread(index_versions.build, articles)
+        if built is None:
+            return
+        version, new_retriever = built
+        new_chain = setup_rag_chain(new_retriever)
+        await asyncio.to_thread(index_versions.activate, version)
+    except Exception as e:
+        logging.error(f"Error refreshing the knowledge base: {e}")
+        return
 
+    retriever, rag_chain, loaded_version = new_retriever, new_chain, version
+    answer_cache.invalidate(answer_cache_version())
+    logging.info(
+        f"Knowledge base version {version} live after {time.perf_counter() - started:.2f}s"
+    )
 
-def create_or_load_embeddings():
-    """Create new embeddings or load existing configuration."""
-    if os.path.exists(EMBEDDINGS_CONFIG_FILE):
-        with open(EMBEDDINGS_CONFIG_FILE, "r") as f:
-            config = json.load(f)
-        return GoogleGenerativeAIEmbeddings(**config)
-    else:
-        config = {"model": "models/embedding-001"}
-        embeddings = GoogleGenerativeAIEmbeddings(**config)
-        with open(EMBEDDINGS_CONFIG_FILE, "w") as f:
-            json.dump(config, f)
-        return embeddings
 
+async def follow_knowledge():
+    """
+    Swap to the index version the primary process made current (secondary processes).
 
-def create_or_load_vectorstore(docs, embeddings):
-    """Create new vector store or load existing one."""
-    if os.path.exists(VECTORSTORE_DIR):
-        return Chroma(persist_directory=VECTORSTORE_DIR, embedding_function=embeddings)
-    else:
-        vectorstore = Chroma.from_documents(
-            documents=docs, embedding=embeddings, persist_directory=VECTORSTORE_DIR
+    Also loads the answers the primary process has cached since the last check.
+    """
+    global rag_chain, retriever, loaded_version
+    if rag_chain is None:
+        return  # Still starting up
+    version = index_versions.current()
+    if version == loaded_version:
+        await asyncio.to_thread(answer_cache.refresh)
+        return
+    try:
+        persist_directory, data_file = index_versions.paths(version)
+        new_retriever = await asyncio.to_thread(
+            setup_retriever, None, persist_directory, data_file, read_only=True
         )
-        return vectorstore
+        if new_retriever is None:
+            return
+        new_chain = setup_rag_chain(new_retriever)
+    except Exception as e:
+        logging.error(f"Error loading knowledge base version {version}: {e}")
+        return
 
+    retriever, rag_chain, loaded_version = new_retriever, new_chain, version
+    answer_cache.invalidate(answer_cache_version())
+    logging.info(f"Knowledge base version {version} live")
 
-def setup_rag_chain():
-    """Set up the RAG chain."""
-    # Load the cleaned data
-    data = load_documents("cleaned_data.txt")
-    if not data:
-        print("No documents loaded. Please check the file.")
-        return None
 
-    # Split the data into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000)
-    docs = text_splitter.split_documents(data)
+def withdrawal_estimate_message(withdrawal_date: datetime) -> str:
+    """The estimated arrival of a withdrawal submitted on `withdrawal_date`."""
+    if datetime(2025, 1, 2, 0, 0) > withdrawal_date > holiday_withdrawal_time_delay:
+        return f"Withdrawals submitted after <t:{calendar.timegm(singapore_tz.localize(datetime(2024, 12, 26, 10, 0)).astimezone(pytz.utc).timetuple())}:f> will be processed and are expected to be received by January 3rd or January 6th 2025."
+    estimated_date = business_calendar.add_business_days(
+        withdrawal_date, WITHDRAWAL_BUSINESS_DAYS
+    )
+    return (
+        "The estimated withdrawal date is: "
+        + estimated_date.strftime("%d-%m-%Y")
+        + "\n-# Disclaimer: The estimated withdrawal time is based on a processing period of 7 business days, excluding weekends and public holidays."
+    )
 
-    # Set up embeddings and vector store
-    embeddings = create_or_load_embeddings()
-    vectorstore = create_or_load_vectorstore(docs, embeddings)
 
-    retriever = vectorstore.as_retriever(
-        search_type="similarity", search_kwargs={"k": 10}
+async def answer_route(route, reply: StreamingReply, open_ticket=None):
+    """Answer a routed question without the RAG chain."""
+    LLM_CALLS_SAVED.inc(reason="routed")
+    if route.intent == "ticket" and open_ticket:
+        # Answer first: after a public defer the first followup can't be ephemeral
+        answer = CANNED_REPLIES["ticket_started"]
+        await reply.feed(answer)
+        await open_ticket()
+        return answer
+    if route.intent == "withdrawal_date" and route.date:
+        answer = withdrawal_estimate_message(route.date)
+    else:
+        answer = CANNED_REPLIES[route.intent]
+    await reply.feed(answer)
+    return answer
+
+
+async def answer_question(question, reply: StreamingReply, notify=None, open_ticket=None):
+    """
+    Answer a question from the answer cache, falling back to the RAG chain.
+
+    The answer is fed to `reply`; with `STREAM_ANSWERS` it is fed token by
+    token while the LLM generates it. Call `reply.finish()` afterwards.
+    Questions with a fixed answer (withdrawal dates, tickets, greetings) are
+    routed away from the RAG chain first; `open_ticket()` starts the ticket
+    flow after a short reply is fed. The same question asked while it is already being answered waits
+    for that answer instead of calling the LLM again. `notify(position)` is
+    awaited if the question has to wait in line for the RAG chain.
+    """
+    global first_answer_logged
+    route = router.route(question)
+    if route:
+        return await answer_route(route, reply, open_ticket)
+
+    # A question the lexical index answers confidently is never embedded
+    confident = retriever is not None and retriever.lexically_confident(question)
+    answer, vector = await answer_cache.aget(question, embed=not confident)
+    if answer is not None:
+        logging.info(f"Answer cache hit: {answer_cache.stats()}")
+        await reply.feed(answer)
+        return answer
+
+    route = router.route_vector(question, vector)
+    if route:
+        return await answer_route(route, reply, open_ticket)
+
+    answer, shared = await single_flight.run(
+        normalize_question(question),
+        lambda: generate_answer(question, reply, vector, notify),
     )
+    if shared:
+        await reply.feed(answer)
+        return answer
 
-    # Set up the language model for responses
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash", temperature=0.3, max_tokens=500
-    )
+    if not first_answer_logged:
+        first_answer_logged = True
+        logging.info(
+            f"First answer {time.perf_counter() - process_started_at:.2f}s after start"
+        )
+    return answer
+
+
+async def generate_answer(question, reply: StreamingReply, vector, notify=None):
+    """Answer a question with the RAG chain, feeding `reply` and caching the answer."""
+    position = ask_queue.position()
+    if position and notify:
+        await notify(position)
+
+    if STREAM_ANSWERS:
+        async with aclosing(ask_queue.stream_answer(question, rag_chain)) as tokens:
+            async for token in tokens:
+                await reply.feed(token)
+        answer = reply.text or "I don't know."
+        if not reply.text:
+            await reply.feed(answer)
+    else:
+        answer = await ask_queue.answer(question, rag_chain)
+        await reply.feed(answer)
+    await answer_cache.aput(question, answer, vector)
+    return answer
 
-    system_prompt = (
-        "You are a helpdesk chatbot designed to provide support using relevant articles from the Stackup Help Center. Your role is to:\n"
-        "1. Provide solutions by retrieving and referencing information from the knowledge base articles.\n"
-        "2. Answer queries based on factual and relevant content from these articles.\n"
-        "3. Guide users through step-by-step troubleshooting and reference related articles.\n"
-        "4. Please ensure accuracy in your responses and avoid any assumptions. Only provide information that is explicitly mentioned in the articles provided.\n"
-        "5. Structure responses clearly by summarizing key points from articles, providing article links for more details, and using a helpful, professional tone.\n"
-        "6. If unsure, suggest the user seeks further help from the server's moderator if an article does not cover their issue\n"
-        "7. Please format all links as [text](URL) without any additional attributes, and create a descriptive text for each link.\n"
-        "8. If a user asks to calculate an estimated date for withdrawal, kindly inform them to use the </calculate_withdrawal:1321343083690070019> command. For all other inquiries related to withdrawal, respond in accordance with your usual process.\n"
-        "9. The articles are structured as follows: \n"
-        "  - Title: This is the title of the article.\n"
-        "  - URL: This is the URL to access the article online.\n"
-        "  - Body: This is the detailed content of the article, containing the full information, instructions, and related steps.\n"
-        "10. Be grammatically correct.\n\n"
-        "{context}"
-    )
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", "{input}"),
-        ]
-    )
 
-    # Create the retrieval chain
-    question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+def rate_limited_message(e: RateLimited) -> str:
+    wait = math.ceil(e.retry_after)
+    if e.scope == "channel":
+        return f"This channel is asking a lot of questions right now. Please try again in {wait} second(s)."
+    return f"You're asking questions too quickly. Please try again in {wait} second(s)."
 
-    return rag_chain
 
+# Set up Discord bot; with SHARD_IDS each process runs only its share of the shards
+bot = commands.AutoShardedBot(
+    command_prefix="!",
+    intents=bot_intents(),
+    shard_count=SHARD_COUNT,
+    shard_ids=shard_ids(),
+)
 
-def get_answer(question, rag_chain):
-    """Retrieve an answer to the given question using RAG."""
-    response = rag_chain.invoke({"input": question})
-    return response.get("answer", "I don't know.")
+scheduler = AsyncIOScheduler()
 
+rag_chain = None
+retriever = None
+loaded_version = ""
+rag_chain_task = None
+first_answer_logged = False
+index_versions = IndexVersions()
+ask_queue = AskQueue()
+admission = Admission()
+router = IntentRouter()
+single_flight = SingleFlight()
+answer_cache = AnswerCache(kb_version=answer_cache_version(), read_only=not is_primary())
+
+ask_queue.register_metrics()
+REGISTRY.gauge(
+    "rag_answer_cache", "Answer cache lookups and size", answer_cache.stats, label="stat"
+)
+REGISTRY.gauge(
+    "rag_embedding_cache",
+    "Embedding cache lookups and size",
+    embedding_cache_stats,
+    label="stat",
+)
+REGISTRY.gauge(
+    "rag_intent_routes", "Questions by intent they were routed to", lambda: router.stats, label="intent"
+)
+REGISTRY.gauge(
+    "rag_retrieval_paths",
+    "Questions by retrieval path",
+    lambda: retriever.stats if retriever else None,
+    label="path",
+)
 
-# Set up Discord bot
-intents = discord.Intents.all()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
 
-scheduler = AsyncIOScheduler()
+@bot.event
+async def setup_hook():
+    # Runs once before login, unlike on_ready which fires again on every reconnect
+    global rag_chain_task
+    if rag_chain_task is None:
+        rag_chain_task = asyncio.create_task(init_rag_chain())
+    if not scheduler.running:
+        if not is_primary():
+            scheduler.add_job(follow_knowledge, IntervalTrigger(minutes=1), max_instances=1)
+        elif KNOWLEDGE_REFRESH_HOURS > 0:
+            scheduler.add_job(
+                refresh_knowledge, IntervalTrigger(hours=KNOWLEDGE_REFRESH_HOURS), max_instances=1
+            )
+        scheduler.start()
+    await keep_alive(health_status)
+
+
+def health_status():
+    """State reported on /health."""
+    return {
+        "ok": bot.is_ready(),
+        "discord_latency": round(bot.latency, 3) if bot.is_ready() else None,
+        "process": PROCESS_INDEX,
+        "pid": os.getpid(),
+        "shard_latency": {
+            shard_id: None if math.isnan(latency) else round(latency, 3)
+            for shard_id, latency in bot.latencies
+        },
+        "guilds": len(bot.guilds),
+        "rag_chain": rag_chain is not None,
+        "knowledge_base_version": loaded_version or None,
+        "ask_queue": {"running": ask_queue.running, "waiting": ask_queue.waiting},
+        "coalesced_questions": single_flight.coalesced,
+    }
 
 
 @bot.event
 async def on_ready():
-    keep_alive()
     logging.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    if not is_primary():
+        print("------")
+        return  # Commands are global; the primary process syncs them
     try:
         synced = await bot.tree.sync()
         print(f"Synced {len(synced)} command(s)")
     except Exception as e:
         logging.info(e)
     print("------")
-    global rag_chain
-    rag_chain = setup_rag_chain()
 
 
 #     scheduler.add_job(start_tracking, DateTrigger(run_date=start_time))
@@ -225,12 +387,17 @@ async def on_ready():
 #     scheduler.start()
 
 
+# STACKING_REPORT = (
+#     "# DAY 2: DECEMBER GRIND REPORT\n",
+#     "### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies who completed Day 2 milestone and getting extra and bonus stackcoin <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>",
+#     "### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies getting extra stackcoins <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>",
+# )
+
+
 # @bot.tree.command(name="stacking_report", description="DAY 2: DECEMBER GRIND REPORT")
 # async def stacking_report(interaction: discord.Interaction):
-#     milestone_achieved_report, milestone_not_achieved_report = await generate_report()
-#     await interaction.response.send_message(
-#         f"\n# DAY 2: DECEMBER GRIND REPORT\n\n### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies who completed Day 2 milestone and getting extra and bonus stackcoin <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>\n```{milestone_achieved_report}```\n### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies getting extra stackcoins <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>\n```{milestone_not_achieved_report}```"
-#     )
+#     await interaction.response.defer()
+#     await send_report(interaction.followup.send, *STACKING_REPORT)
 #     logging.info("Report sent to coin transfer channel.")
 
 
@@ -268,6 +435,7 @@ async def on_ready():
 # async def start_tracking():
 #     """Start tracking user activity."""
 #     logging.info("DAY 2: DECEMBER GRIND tracking has started")
+#     activity_writer.start()
 #     users = [735548895878185001, 890986684580233216]
 #     for user in users:
 #         user = await bot.fetch_user(user)
@@ -277,6 +445,7 @@ async def on_ready():
 # async def stop_tracking():
 #     """Stop tracking and generate a report."""
 #     logging.info("DAY 2: DECEMBER GRIND tracking has ended")
+#     await activity_writer.stop()
 
 #     users = [735548895878185001, 890986684580233216]
 
@@ -286,14 +455,10 @@ async def on_ready():
 #             "DAY 2: DECEMBER GRIND tracking has ended. Report will be generated in <#1092443920576807024>"
 #         )
 
-#     milestone_achieved_report, milestone_not_achieved_report = await generate_report()
-
 #     coin_transfer_channel_id = 1092443920576807024
 #     coin_transfer_channel = bot.get_channel(coin_transfer_channel_id)
 #     if coin_transfer_channel:
-#         await coin_transfer_channel.send(
-#             f"\n# DAY 2: DECEMBER GRIND REPORT\n\n### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies who completed Day 2 milestone and getting extra and bonus stackcoin <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>\n```{milestone_achieved_report}```\n### <:StackUp:935796086231171112> <:yaycoin:1076423261572837538> Stackies getting extra stackcoins <:yaycoin:1076423261572837538> <:StackUp:935796086231171112>\n```{milestone_not_achieved_report}```"
-#         )
+#         await send_report(coin_transfer_channel.send, *STACKING_REPORT)
 #         logging.info("Report sent to coin transfer channel.")
 #     else:
 #         logging.error("Coin transfer channel not found. Check the channel ID.")
@@ -344,17 +509,42 @@ async def ask(interaction: discord.Interaction, question: str):
         f"Question asked: {question} by {interaction.user.name} in #{interaction.channel}"
     )
 
+    try:
+        admission.admit(interaction.user.id, interaction.channel_id)
+    except RateLimited as e:
+        logging.warning(f"Rejecting question by {interaction.user.name}: {e}")
+        await interaction.response.send_message(rate_limited_message(e), ephemeral=True)
+        return
+
     try:
         await interaction.response.defer(thinking=True)
 
         if rag_chain:
-            answer = get_answer(question, rag_chain)
-            await interaction.followup.send(answer + is_team_on_holiday())
+            reply = StreamingReply(
+                lambda content: interaction.followup.send(content, wait=True)
+            )
+            await answer_question(
+                question,
+                reply,
+                # The first followup replaces "thinking…" and can't be ephemeral, so the
+                # notice is shown in the message the answer then replaces it in
+                lambda position: reply.status(f"You're #{position} in line, I'll answer shortly."),
+                lambda: interaction.followup.send(
+                    view=TicketHelper(), embed=start_ticket_embed, ephemeral=True
+                ),
+            )
+            await reply.finish(is_team_on_holiday())
         else:
             await interaction.followup.send(
                 "Sorry, I'm not ready to answer questions yet. Please try again later."
             )
 
+    except AskQueueFull as e:
+        logging.warning("Ask queue full, rejecting question: %s", e)
+        await interaction.followup.send(
+            "I'm answering a lot of questions right now. Please try again in a moment.",
+            ephemeral=True,
+        )
     except Exception as e:
         logging.error("Error in 'ask' command: %s", e)
         await interaction.followup.send(
@@ -367,13 +557,41 @@ async def ask(interaction: discord.Interaction, question: str):
 async def mark_ask(ctx: Context, *, question: str = None):
     logging.info(f"Mark Question asked: {question}")
 
-    if question:
-        answer = get_answer(question, rag_chain)
-        await ctx.reply(answer + is_team_on_holiday())
-    else:
+    if not question:
         await ctx.reply(
             "Please ask a question after the command, e.g., `!ask <your question>`.", delete_after=10, ephemeral=True
         )
+    elif not rag_chain:
+        await ctx.reply(
+            "Sorry, I'm not ready to answer questions yet. Please try again later."
+        )
+    else:
+        try:
+            admission.admit(ctx.author.id, ctx.channel.id)
+            reply = StreamingReply(ctx.reply)
+            await answer_question(
+                question,
+                reply,
+                lambda position: ctx.reply(
+                    f"You're #{position} in line, I'll answer shortly.", delete_after=10
+                ),
+                # A reply can't be ephemeral, so ticket questions get a pointer to /ticket
+            )
+            await reply.finish(is_team_on_holiday())
+        except RateLimited as e:
+            logging.warning(f"Rejecting question by {ctx.author.name}: {e}")
+            await ctx.reply(rate_limited_message(e), delete_after=10)
+        except AskQueueFull as e:
+            logging.warning("Ask queue full, rejecting question: %s", e)
+            await ctx.reply(
+                "I'm answering a lot of questions right now. Please try again in a moment.",
+                delete_after=10,
+            )
+        except Exception as e:
+            logging.error("Error in '!ask' command: %s", e)
+            await ctx.reply(
+                "An error occurred while processing your request. Please try again later."
+            )
 
 
 # Add the new command for calculating the withdrawal date
@@ -388,15 +606,10 @@ async def calculate_withdrawal(interaction: discord.Interaction, withdrawal_date
         f"Withdrawal date calculation request by {interaction.user.name} in #{interaction.channel}, Start Date: {withdrawal_date}"
     )
     try:
-        disclaimer = "\n-# Disclaimer: The estimated withdrawal time is based on a processing period of 7 business days, excluding weekends and public holidays."
-        holiday_disclaimer = f"Withdrawals submitted after <t:{calendar.timegm(singapore_tz.localize(datetime(2024, 12, 26, 10, 0)).astimezone(pytz.utc).timetuple())}:f> will be processed and are expected to be received by January 3rd or January 6th 2025."
         withdrawal_date_obj = datetime.strptime(withdrawal_date, "%d-%m-%Y")
-
-        estimated_date = calculate_withdrawal_date(withdrawal_date_obj, 7)
-
         await interaction.response.send_message(
-            f"{holiday_disclaimer if (datetime(2025, 1, 2, 0, 0) > withdrawal_date_obj > holiday_withdrawal_time_delay) else ('The estimated withdrawal date is: ' + estimated_date.strftime('%d-%m-%Y') + disclaimer)}"
-        )  # <t:{calendar.timegm(estimated_date.timetuple())}:D>"
+            withdrawal_estimate_message(withdrawal_date_obj)
+        )
 
     except ValueError:
         await interaction.response.send_message(
@@ -411,6 +624,66 @@ async def calculate_withdrawal(interaction: discord.Interaction, withdrawal_date
         )
 
 
+@bot.tree.command(
+    name="withdrawal_estimates",
+    description="Calculate the estimated withdrawal dates for many submission dates",
+)
+@app_commands.describe(
+    dates="Submission dates in DD-MM-YYYY format, separated by commas or spaces.",
+    days="Business days to add, from 1 to 365. Defaults to 7.",
+)
+async def withdrawal_estimates(
+    interaction: discord.Interaction,
+    dates: str,
+    days: app_commands.Range[int, 1, 365] = WITHDRAWAL_BUSINESS_DAYS,
+):
+    if not auth_admin.check_has_permissions(interaction):
+        logging.info(
+            f"Unauthorized request of withdrawal estimates command by {interaction.user.name} in #{interaction.channel}"
+        )
+        await interaction.response.send_message(
+            "You don't have access to this command!", ephemeral=True
+        )
+        return
+
+    logging.info(
+        f"Withdrawal estimates request by {interaction.user.name} in #{interaction.channel} for {days} business day(s): {dates}"
+    )
+    try:
+        submitted = [datetime.strptime(d, "%d-%m-%Y") for d in re.split(r"[,\s]+", dates.strip())]
+    except ValueError:
+        await interaction.response.send_message(
+            "Invalid date format. Please use `DD-MM-YYYY` format for every date.",
+            ephemeral=True,
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        estimates = business_calendar.add_business_days_many(submitted, days)
+        reply = StreamingReply(
+            lambda content: interaction.followup.send(content, ephemeral=True, wait=True)
+        )
+        await reply.feed(
+            "\n".join(
+                f"{s.strftime('%d-%m-%Y')} -> {e.strftime('%d-%m-%Y')}"
+                for s, e in zip(submitted, estimates)
+            )
+        )
+        uncovered = sorted({d.year for d in submitted + estimates if not business_calendar.covers(d)})
+        await reply.finish(
+            f"\n-# No holidays are listed for {', '.join(map(str, uncovered))}; only weekends were skipped."
+            if uncovered
+            else ""
+        )
+    except Exception as e:
+        print(f"Error calculating withdrawal estimates: {e}")
+        await interaction.followup.send(
+            "An error occurred while calculating the estimates. Please check the dates and try again.",
+            ephemeral=True,
+        )
+
+
 @bot.tree.command(name="ticket", description="Open a new ticket")
 async def ticket(interaction: discord.Interaction):
     await interaction.response.send_message(
@@ -449,11 +722,17 @@ async def lucky_winner(
             logging.info(
                 f"Lucky winner request by {interaction.user.name} in #{interaction.channel}, "
                 f"for range {range} excluding {exclude if len(exclude) > 1 else None} using seed {seed} "
-                f"yields {count} winner(s): {winners}"
-            )
-            await interaction.response.send_message(
-                f"The lucky {'winner is' if len(winners) == 1 else 'winners are'} {', '.join(winners)}."
+                f"yields {len(winners)} winner(s): {winners[:LUCKY_WINNERS_LOGGED]}"
             )
+            message = f"The lucky {'winner is' if len(winners) == 1 else 'winners are'} {', '.join(winners)}."
+            if len(message) <= DISCORD_MESSAGE_LIMIT:
+                await interaction.response.send_message(message)
+            else:
+                # Too many winners for one message; attach the full list instead
+                await interaction.response.send_message(
+                    f"The {len(winners)} lucky winners (seed {seed_used}) are attached.",
+                    file=discord.File(io.BytesIO("\n".join(winners).encode()), filename="lucky_winners.txt"),
+                )
     else:
         logging.info(
             f"Unauthorized request of Lucky winner command by {interaction.user.name} in #{interaction.channel}"
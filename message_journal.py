@@ -0,0 +1,132 @@
+import os
+import json
+import logging
+
+
+TRACKING_JOURNAL = os.getenv("TRACKING_JOURNAL", "tracking_journal.jsonl")
+COMPACT_AFTER = 1000
+STAGES = ("activity", "messages")
+
+
+class MessageJournal:
+    """
+    Append-only journal of counted leaderboard messages.
+
+    Every message is appended before it is counted, so the set of seen
+    message IDs survives a restart and a replayed or re-fetched message is
+    never counted twice. Appending a message doesn't fsync, which would block
+    the event loop for every message: the writer calls `sync` off the event
+    loop before it stores a batch, so a message lost with the OS buffers was
+    never stored either. Once the writer has stored a batch it appends a
+    fsynced commit mark per stage: `activity` once the coins are added to
+    stacking_activity, `messages` once a batch of message_tracking rows is
+    inserted. On load, entries past a mark are handed back to the writer by
+    `pending`.
+
+    Lines are JSON objects: `{"seq", "id", "user", "coins"}` for a message,
+    `{"commit": stage, "seq"}` for a commit mark, and after compaction a
+    `{"seen", "totals", "seq"}` snapshot of the committed messages.
+    """
+
+    def __init__(self, path: str = TRACKING_JOURNAL):
+        self.path = path
+        self.seen = set()
+        self.totals = {}
+        self.entries = []
+        self.committed = {stage: 0 for stage in STAGES}
+        self.seq = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data and not data.endswith(b"\n"):
+            # A crash mid-append leaves a partial last line; drop it so new lines start clean
+            logging.warning(f"Dropping a partial last line in {self.path}")
+            data = data[: data.rfind(b"\n") + 1]
+            with open(self.path, "r+b") as f:
+                f.truncate(len(data))
+        for line in data.decode("utf-8").splitlines():
+            self._apply(json.loads(line))
+        if sum(e["seq"] <= min(self.committed.values()) for e in self.entries) >= COMPACT_AFTER:
+            self.compact()
+
+    def _apply(self, record: dict):
+        if "commit" in record:
+            stage = record["commit"]
+            self.committed[stage] = max(self.committed[stage], record["seq"])
+        elif "seen" in record:
+            self.seen.update(record["seen"])
+            self.totals = record["totals"]
+            self.seq = record["seq"]
+            self.committed = {stage: record["seq"] for stage in STAGES}
+        else:
+            self.seen.add(record["id"])
+            self.entries.append(record)
+            self.seq = max(self.seq, record["seq"])
+            total = self.totals.setdefault(record["user"], {"coins": 0, "count": 0})
+            total["coins"] += record["coins"]
+            total["count"] += 1
+
+    def _append(self, record: dict, sync: bool = True):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def sync(self):
+        """Flush the appended messages to disk. Blocking, run it off the event loop."""
+        if os.path.exists(self.path):
+            with open(self.path, "a") as f:
+                os.fsync(f.fileno())
+
+    def record(self, message_id: int, username: str, coins: int) -> int:
+        """Journal a message and return its sequence number, or 0 if it was already counted."""
+        if message_id in self.seen:
+            return 0
+        record = {"seq": self.seq + 1, "id": message_id, "user": username, "coins": coins}
+        self._append(record, sync=False)
+        self._apply(record)
+        return record["seq"]
+
+    def commit(self, stage: str, seq: int):
+        """Mark every message up to `seq` as stored for `stage`. Blocking, run it off the event loop."""
+        if seq > self.committed[stage]:
+            self._append({"commit": stage, "seq": seq})
+            self.committed[stage] = seq
+
+    def pending(self, stage: str) -> list[dict]:
+        """Messages not yet stored for `stage`."""
+        return [e for e in self.entries if e["seq"] > self.committed[stage]]
+
+    def compact(self):
+        """Rewrite the journal as a snapshot of the committed messages plus the pending ones."""
+        done = min(self.committed.values())
+        pending = [e for e in self.entries if e["seq"] > done]
+        # The snapshot only covers committed messages; pending ones are re-applied on load
+        committed_totals = {user: dict(total) for user, total in self.totals.items()}
+        for entry in pending:
+            committed_totals[entry["user"]]["coins"] -= entry["coins"]
+            committed_totals[entry["user"]]["count"] -= 1
+        pending_ids = {e["id"] for e in pending}
+        snapshot = {
+            "seen": sorted(self.seen - pending_ids),
+            "totals": committed_totals,
+            "seq": done,
+        }
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot) + "\n")
+            for entry in pending:
+                f.write(json.dumps(entry) + "\n")
+            for stage in STAGES:
+                if self.committed[stage] > done:
+                    f.write(json.dumps({"commit": stage, "seq": self.committed[stage]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self.entries = pending
+        logging.info(f"Compacted {self.path}: {len(self.seen)} seen, {len(pending)} pending")
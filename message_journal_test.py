@@ -0,0 +1,113 @@
+import os
+import asyncio
+import tempfile
+import unittest
+import message_journal
+from activity_writer import ActivityWriter
+from fake_supabase import FakeSupabase
+from message_journal import MessageJournal
+
+
+class MessageJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "journal.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_duplicate_messages_are_counted_once(self):
+        client = FakeSupabase()
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        self.assertTrue(writer.add("alice", 100, 1))
+        self.assertFalse(writer.add("alice", 100, 1))
+        asyncio.run(writer.flush())
+
+        # After a restart the message is still known
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        self.assertFalse(writer.add("alice", 100, 1))
+        asyncio.run(writer.flush())
+        self.assertEqual(client.activity["alice"], {"coins_earned": 100, "count": 1})
+        self.assertEqual(len(client.tables["message_tracking"]), 1)
+        self.assertEqual(writer.journal.totals["alice"], {"coins": 100, "count": 1})
+
+    def test_resumes_unwritten_activity_after_restart(self):
+        client = FakeSupabase()
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        writer.add("alice", 100, 1)
+        asyncio.run(writer.flush())
+        writer.add("bob", 50, 2)
+        # Crash before the next flush; a partial line is left behind
+        with open(self.path, "a") as f:
+            f.write('{"seq": 3, "id"')
+
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        self.assertEqual(writer.pending(), 1)
+        writer.add("carol", 10, 3)
+        asyncio.run(writer.flush())
+        self.assertEqual(MessageJournal(self.path).seen, {1, 2, 3})
+        self.assertEqual(client.activity["alice"], {"coins_earned": 100, "count": 1})
+        self.assertEqual(client.activity["bob"], {"coins_earned": 50, "count": 1})
+
+    def test_compaction_keeps_seen_ids_and_totals(self):
+        message_journal.COMPACT_AFTER = 3
+        self.addCleanup(setattr, message_journal, "COMPACT_AFTER", 1000)
+        client = FakeSupabase()
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        for message_id in range(4):
+            writer.add("alice", 100, message_id)
+        asyncio.run(writer.flush())
+        writer.add("bob", 50, 10)
+
+        journal = MessageJournal(self.path)
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(journal.totals["alice"], {"coins": 400, "count": 4})
+        self.assertEqual(journal.totals["bob"], {"coins": 50, "count": 1})
+        self.assertEqual([e["id"] for e in journal.pending("activity")], [10])
+        self.assertEqual(journal.record(3, "alice", 100), 0)
+
+    def test_batches_inserted_before_a_failure_are_not_inserted_again(self):
+        client = FakeSupabase()
+        writer = ActivityWriter(client, MessageJournal(self.path), max_batch=2)
+        for message_id in range(5):
+            writer.add("alice", 100, message_id)
+        inserts = []
+        original = writer._insert_messages
+
+        def insert_then_fail(rows):
+            inserts.append(rows)
+            if len(inserts) == 2:
+                raise ConnectionError("offline")
+            original(rows)
+
+        writer._insert_messages = insert_then_fail
+        asyncio.run(writer.flush())
+        self.assertEqual(writer.pending(), 3)
+
+        # Restarting resumes from the failed batch
+        writer = ActivityWriter(client, MessageJournal(self.path))
+        self.assertEqual(writer.pending(), 3)
+        asyncio.run(writer.flush())
+        self.assertEqual([r["message_id"] for r in client.tables["message_tracking"]], [0, 1, 2, 3, 4])
+        self.assertEqual(client.activity["alice"], {"coins_earned": 500, "count": 5})
+
+    def test_messages_are_fsynced_once_per_flush(self):
+        fsyncs = []
+        original = message_journal.os.fsync
+        message_journal.os.fsync = lambda fd: fsyncs.append(fd) or original(fd)
+        self.addCleanup(setattr, message_journal.os, "fsync", original)
+
+        writer = ActivityWriter(FakeSupabase(), MessageJournal(self.path))
+        for message_id in range(10):
+            writer.add("alice", 100, message_id)
+        self.assertEqual(fsyncs, [])
+        asyncio.run(writer.flush())
+        # The messages, then the activity and messages commit marks
+        self.assertEqual(len(fsyncs), 3)
+        self.assertEqual(len(MessageJournal(self.path).seen), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
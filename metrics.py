@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    bucket_labels = format_labels(labels + (("le", bound),))
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = format_labels(labels + (("le", "+Inf"),))
+                lines.append(f"{self.name}_bucket{inf_labels} {counts[-1]}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {counts[-2]}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {counts[-1]}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback; a dict result is exported with one label value per key."""
+
+    def __init__(self, name: str, help: str, read, label: str = None):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label = label
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read()
+        except Exception as e:
+            logging.error(f"Error reading gauge {self.name}: {e}")
+            return lines
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                lines.append(f"{self.name}{format_labels(((self.label, key),))} {v}")
+        elif value is not None:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, read, label: str = None) -> Gauge:
+        self.metrics[name] = Gauge(name, help, read, label)
+        return self.metrics[name]
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds", "Time spent in each stage of answering a question"
+)
+LLM_TOKENS = REGISTRY.counter("rag_llm_tokens_total", "LLM tokens used, by direction")
+ERRORS = REGISTRY.counter("rag_errors_total", "Errors while answering questions, by stage")
+
+
+@contextmanager
+def timed(stage: str, timings: dict = None):
+    """Record how long the block takes as `stage`, also storing it in `timings` if given."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = elapsed
+
+
+class StageTimer(BaseCallbackHandler):
+    """
+    Callback handler timing the stages of one RAG chain run.
+
+    Records retrieval (including the query embedding), prompt assembly (from
+    the retrieved documents to the LLM call), LLM time to first token and
+    total LLM time, plus the LLM token usage.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.timings = {}
+        self._started = {}
+        self._first_token = set()
+        self._retrieved_at = None
+
+    def _observe(self, stage, elapsed):
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    def _start(self, run_id, stage):
+        self._started[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id):
+        if run_id not in self._started:
+            return None
+        stage, started = self._started.pop(run_id)
+        self._observe(stage, time.perf_counter() - started)
+        return stage
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        # Retrievers wrapping other retrievers overlap; time only the outermost one
+        if not any(stage == "retrieval" for stage, _ in self._started.values()):
+            self._start(run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        if self._end(run_id):
+            self._retrieved_at = time.perf_counter()
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        if self._started.pop(run_id, None):
+            ERRORS.inc(stage="retrieval")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if self._retrieved_at is not None:
+            self._observe("prompt", time.perf_counter() - self._retrieved_at)
+        self._start(run_id, "llm")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._started and run_id not in self._first_token:
+            self._first_token.add(run_id)
+            self._observe("llm_first_token", time.perf_counter() - self._started[run_id][1])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+        try:
+            usage = response.generations[0][0].message.usage_metadata or {}
+        except (AttributeError, IndexError):
+            usage = {}
+        for direction in ("input", "output"):
+            if usage.get(f"{direction}_tokens"):
+                LLM_TOKENS.inc(usage[f"{direction}_tokens"], direction=direction)
+                self.timings[f"{direction}_tokens"] = usage[f"{direction}_tokens"]
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+        ERRORS.inc(stage="llm")
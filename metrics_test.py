@@ -0,0 +1,137 @@
+import unittest
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from metrics import LLM_TOKENS, STAGE_SECONDS, Counter, Gauge, Histogram, Registry, StageTimer
+
+
+USAGE = {"input_tokens": 12, "output_tokens": 3, "total_tokens": 15}
+
+
+class InnerRetriever(BaseRetriever):
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [Document(page_content=f"about {query}")]
+
+
+class OuterRetriever(BaseRetriever):
+    """Wraps another retriever, like the hybrid retriever wraps the vector one."""
+
+    inner: BaseRetriever
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return self.inner.invoke(query, {"callbacks": run_manager.get_child()})
+
+
+class FakeChatModel(BaseChatModel):
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(content="an answer", usage_metadata=USAGE)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, token in enumerate(("an ", "answer")):
+            usage = USAGE if i == 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def fake_chain():
+    prompt = ChatPromptTemplate.from_messages([("human", "{context}\n\n{input}")])
+    retriever = OuterRetriever(inner=InnerRetriever())
+    return (
+        {
+            "context": lambda inputs: retriever.invoke(inputs["input"]),
+            "input": lambda inputs: inputs["input"],
+        }
+        | prompt
+        | FakeChatModel()
+    )
+
+
+class StageTimerTest(unittest.TestCase):
+
+    def tokens(self, direction):
+        return LLM_TOKENS.values.get((("direction", direction),), 0)
+
+    def observed(self, stage):
+        counts = STAGE_SECONDS.values.get((("stage", stage),))
+        return counts[-1] if counts else 0
+
+    def test_times_each_stage_of_a_chain_run(self):
+        input_tokens = self.tokens("input")
+        retrievals = self.observed("retrieval")
+        timer = StageTimer()
+        starts = []
+        original = timer.on_retriever_start
+        timer.on_retriever_start = lambda *args, **kwargs: starts.append(1) or original(*args, **kwargs)
+        fake_chain().invoke({"input": "withdrawals"}, config={"callbacks": [timer]})
+
+        self.assertEqual(
+            set(timer.timings), {"retrieval", "prompt", "llm", "input_tokens", "output_tokens"}
+        )
+        # Both retrievers ran, but only the outermost one is timed
+        self.assertEqual(len(starts), 2)
+        self.assertEqual(self.observed("retrieval"), retrievals + 1)
+        self.assertEqual(timer._started, {})
+        self.assertEqual((timer.timings["input_tokens"], timer.timings["output_tokens"]), (12, 3))
+        self.assertEqual(self.tokens("input"), input_tokens + 12)
+
+    def test_times_the_first_token_when_streaming(self):
+        timer = StageTimer()
+        chunks = list(fake_chain().stream({"input": "withdrawals"}, config={"callbacks": [timer]}))
+        self.assertEqual("".join(c.content for c in chunks), "an answer")
+        self.assertIn("llm_first_token", timer.timings)
+        self.assertLessEqual(timer.timings["llm_first_token"], timer.timings["llm"])
+
+
+class ExpositionTest(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("rag_test_seconds", "Test latency", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage="llm")
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP rag_test_seconds Test latency",
+                "# TYPE rag_test_seconds histogram",
+                'rag_test_seconds_bucket{stage="llm",le="0.1"} 1',
+                'rag_test_seconds_bucket{stage="llm",le="1"} 2',
+                'rag_test_seconds_bucket{stage="llm",le="+Inf"} 3',
+                'rag_test_seconds_sum{stage="llm"} 5.55',
+                'rag_test_seconds_count{stage="llm"} 3',
+            ],
+        )
+
+    def test_registry_render(self):
+        registry = Registry()
+        registry.counter("rag_test_total", "Test counter").inc(2, reason="routed")
+        registry.gauge("rag_test_queue", "Test gauge", lambda: {"running": 1}, label="state")
+        registry.gauge("rag_test_broken", "Broken gauge", lambda: 1 / 0)
+        self.assertIsInstance(registry.metrics["rag_test_total"], Counter)
+        self.assertIsInstance(registry.metrics["rag_test_queue"], Gauge)
+        self.assertEqual(
+            registry.render(),
+            "# HELP rag_test_total Test counter\n"
+            "# TYPE rag_test_total counter\n"
+            'rag_test_total{reason="routed"} 2\n'
+            "# HELP rag_test_queue Test gauge\n"
+            "# TYPE rag_test_queue gauge\n"
+            'rag_test_queue{state="running"} 1\n'
+            "# HELP rag_test_broken Broken gauge\n"
+            "# TYPE rag_test_broken gauge\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
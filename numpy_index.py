@@ -0,0 +1,178 @@
+import os
+import json
+import logging
+from typing import Any
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from hybrid_retriever import scored_documents
+
+
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")  # "float32", "float16" or "int8"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+DOCS_FILE = "vector_index.json"
+DTYPES = ("float32", "float16", "int8")
+SCORE_BLOCK_ROWS = 4096  # Rows converted to float32 at a time when scoring
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length, so a dot product is the cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Store normalized vectors as `dtype`.
+
+    int8 rows are scaled so their largest component maps to 127; the
+    per-row scales are returned to undo it. Returns `(matrix, scales)`.
+    """
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        matrix = np.round(vectors / scales[:, None]).astype(np.int8)
+        return matrix, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+class NumpyVectorIndex:
+    """
+    Chunk embeddings in one contiguous, normalized matrix.
+
+    A query is answered with one matrix-vector product and `argpartition`, so
+    only the top `k` scores are sorted; several queries share one
+    matrix-matrix product. Saved indexes are memory-mapped on load, so the
+    pages are shared by every process reading the same index. Optionally
+    stored as float16 or int8 (with a scale per row) to halve or quarter
+    the memory and disk used; queries convert `SCORE_BLOCK_ROWS` rows to
+    float32 at a time, never the whole matrix.
+    """
+
+    def __init__(self, matrix: np.ndarray, docs: list[Document], scales: np.ndarray = None):
+        self.matrix = matrix
+        self.docs = docs
+        self.scales = scales
+
+    @property
+    def dtype(self) -> str:
+        return str(self.matrix.dtype)
+
+    @classmethod
+    def from_documents(cls, docs: list[Document], embeddings, dtype: str = VECTOR_DTYPE):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype}, expected one of {DTYPES}")
+        vectors = np.array(
+            embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32
+        )
+        matrix, scales = quantize(normalize(vectors), dtype)
+        return cls(matrix, docs, scales)
+
+    def save(self, persist_directory: str, fingerprint: str = ""):
+        """Write the matrix and documents; the document file is replaced last and marks the index complete."""
+        os.makedirs(persist_directory, exist_ok=True)
+        files = [(VECTORS_FILE, self.matrix)]
+        if self.scales is not None:
+            files.append((SCALES_FILE, self.scales))
+        for name, array in files:
+            path = os.path.join(persist_directory, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+
+        path = os.path.join(persist_directory, DOCS_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fingerprint": fingerprint,
+                    "dtype": self.dtype,
+                    "docs": [{"page_content": d.page_content, "metadata": d.metadata} for d in self.docs],
+                },
+                f,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, persist_directory: str, fingerprint: str = "", dtype: str = VECTOR_DTYPE):
+        """Memory-map a saved index, or return `None` if it is missing, from other data or of another dtype."""
+        path = os.path.join(persist_directory, DOCS_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") != fingerprint or data.get("dtype") != dtype:
+                return None
+            matrix = np.load(os.path.join(persist_directory, VECTORS_FILE), mmap_mode="r")
+            scales = (
+                np.load(os.path.join(persist_directory, SCALES_FILE)) if dtype == "int8" else None
+            )
+        except Exception as e:
+            print(f"Error loading vector index: {e}")
+            return None
+        docs = [Document(**d) for d in data["docs"]]
+        logging.info(f"Loaded {dtype} vector index of {len(docs)} chunks from {persist_directory}")
+        return cls(matrix, docs, scales)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each (normalized) query to every chunk, one row per query."""
+        queries = normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        scores = np.empty((len(queries), len(self.matrix)), dtype=np.float32)
+        for start in range(0, len(self.matrix), SCORE_BLOCK_ROWS):
+            block = self.matrix[start : start + SCORE_BLOCK_ROWS]
+            scores[:, start : start + len(block)] = queries @ block.T.astype(np.float32, copy=False)
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search_many(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        """Top `k` `(chunk index, score)` pairs for each query, best first."""
+        scores = self.scores(queries)
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in scores]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([(int(i), float(row[i])) for i in ranked])
+        return results
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        return self.search_many(query, k)[0]
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Vector retriever over a `NumpyVectorIndex`, used in place of Chroma's.
+
+    Documents carry their cosine similarity in the `score` metadata.
+    """
+
+    index: Any
+    embeddings: Any
+    k: int = 5
+
+    def _documents(self, hits: list[tuple[int, float]]) -> list[Document]:
+        return scored_documents([(self.index.docs[i], score) for i, score in hits])
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self._documents(self.index.search(self.embeddings.embed_query(query), self.k))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        return self._documents(self.index.search(vector, self.k))
+
+    def batch_search(self, queries: list[str]) -> list[list[Document]]:
+        """Retrieve for several queries with a single matrix product."""
+        vectors = [self.embeddings.embed_query(q) for q in queries]
+        return [self._documents(hits) for hits in self.index.search_many(vectors, self.k)]
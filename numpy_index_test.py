@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+import numpy as np
+from langchain_core.documents import Document
+from benchmark import HashingEmbeddings
+import numpy_index
+from numpy_index import NumpyRetriever, NumpyVectorIndex
+
+
+TEXTS = [
+    "How to withdraw your rewards to a bank account",
+    "Link a crypto wallet to your profile",
+    "Quest submission was rejected, what next",
+    "Withdrawal fees and processing times",
+    "Reset your password or change your email",
+    "Referral program rewards explained",
+]
+
+
+class NumpyVectorIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.embeddings = HashingEmbeddings(size=64)
+        self.docs = [Document(page_content=t, metadata={"article_id": str(i)}) for i, t in enumerate(TEXTS)]
+
+    def brute_force(self, query, k):
+        vectors = np.array(self.embeddings.embed_documents(TEXTS))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(np.argsort(-(vectors @ np.array(self.embeddings.embed_query(query))))[:k])
+
+    def test_top_k_matches_brute_force(self):
+        index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, "float32")
+        for query in ("withdraw rewards bank", "wallet profile", "password email"):
+            hits = index.search(self.embeddings.embed_query(query), 3)
+            self.assertEqual([i for i, _ in hits], self.brute_force(query, 3))
+            scores = [s for _, s in hits]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_quantized_scores_stay_close(self):
+        exact = NumpyVectorIndex.from_documents(self.docs, self.embeddings, "float32")
+        query = self.embeddings.embed_query("withdrawal processing fees")
+        for dtype, tolerance in (("float16", 1e-3), ("int8", 2e-2)):
+            index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, dtype)
+            self.assertEqual(index.dtype, dtype)
+            np.testing.assert_allclose(index.scores(query), exact.scores(query), atol=tolerance)
+
+    def test_scores_are_computed_in_row_blocks(self):
+        query = self.embeddings.embed_query("withdrawal processing fees")
+        for dtype in ("float16", "int8"):
+            index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, dtype)
+            whole = index.scores(query)
+            original = numpy_index.SCORE_BLOCK_ROWS
+            numpy_index.SCORE_BLOCK_ROWS = 4  # Blocks of 4 and 2 rows
+            try:
+                np.testing.assert_allclose(index.scores(query), whole, rtol=1e-6)
+            finally:
+                numpy_index.SCORE_BLOCK_ROWS = original
+
+    def test_batch_matches_single_queries(self):
+        index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, "float32")
+        queries = [self.embeddings.embed_query(q) for q in ("wallet", "referral rewards")]
+        self.assertEqual(index.search_many(queries, 2), [index.search(q, 2) for q in queries])
+        # k larger than the index returns everything
+        self.assertEqual(len(index.search(queries[0], 100)), len(TEXTS))
+
+    def test_save_and_memory_map(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, "int8")
+            index.save(tmp, "v1")
+            loaded = NumpyVectorIndex.load(tmp, "v1", "int8")
+            self.assertIsInstance(loaded.matrix, np.memmap)
+            self.assertEqual(loaded.docs, self.docs)
+            query = self.embeddings.embed_query("wallet")
+            self.assertEqual(loaded.search(query, 3), index.search(query, 3))
+            # Stale data or another dtype needs a rebuild
+            self.assertIsNone(NumpyVectorIndex.load(tmp, "v2", "int8"))
+            self.assertIsNone(NumpyVectorIndex.load(tmp, "v1", "float32"))
+
+    def test_retriever(self):
+        index = NumpyVectorIndex.from_documents(self.docs, self.embeddings, "float16")
+        retriever = NumpyRetriever(index=index, embeddings=self.embeddings, k=2)
+        docs = retriever.invoke("link my crypto wallet")
+        self.assertEqual(docs[0].metadata["article_id"], "1")
+        hits = index.search(self.embeddings.embed_query("link my crypto wallet"), 2)
+        self.assertEqual([d.metadata["score"] for d in docs], [score for _, score in hits])
+        self.assertEqual(retriever.batch_search(["link my crypto wallet"]), [docs])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import os
+import hashlib
+from langchain_chroma import Chroma
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.prompts import ChatPromptTemplate
+from article_loader import load_articles, chunk_articles, chunking_settings
+from bm25_index import BM25Index, BM25_FILE
+from context_budget import ContextBudgetRetriever
+from embeddings_backend import create_embeddings, embeddings_slug, load_embeddings_config
+from embedding_cache import CachedEmbeddings, EMBEDDING_CACHE_DIR
+from hybrid_retriever import HybridRetriever, VectorStoreScoreRetriever
+from numpy_index import NumpyRetriever, NumpyVectorIndex, VECTOR_DTYPE
+from vectorstore_sync import is_current, sync_vectorstore
+
+
+# Constants
+EMBEDDINGS_CONFIG_FILE = "embeddings_config.json"
+VECTORSTORE_DIR = "vectorstore"
+EMBEDDINGS_CONFIG = load_embeddings_config(EMBEDDINGS_CONFIG_FILE)
+# One index per embedding model, so switching models never mixes vectors
+VECTORSTORE_PATH = os.path.join(VECTORSTORE_DIR, embeddings_slug(EMBEDDINGS_CONFIG))
+DATA_FILE = "cleaned_data.txt"
+VECTORSTORE_SYNC = os.getenv("VECTORSTORE_SYNC", "incremental")  # or "off"
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", 5))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # or "numpy"
+
+
+embeddings = None
+
+
+def create_or_load_embeddings(read_only=False):
+    """
+    Create embeddings from the configured backend, once per process, with a persistent cache.
+
+    `read_only` applies when they are first created: only the primary process
+    of a sharded bot may add to the shared embedding cache.
+    """
+    global embeddings
+    if embeddings is None:
+        embeddings = CachedEmbeddings(
+            create_embeddings(EMBEDDINGS_CONFIG),
+            os.path.join(EMBEDDING_CACHE_DIR, embeddings_slug(EMBEDDINGS_CONFIG)),
+            read_only=read_only,
+        )
+    return embeddings
+
+
+def create_or_load_vectorstore(
+    embeddings,
+    fingerprint="",
+    persist_directory=VECTORSTORE_PATH,
+    data_file=DATA_FILE,
+    read_only=False,
+):
+    """
+    Create new vector store or load existing one.
+
+    The data file is only loaded and split when the persisted index is
+    missing or, in incremental mode, was built from different data. With
+    `read_only` the index is never written; `None` is returned until another
+    process has built it.
+    """
+    if os.path.exists(persist_directory) and (
+        VECTORSTORE_SYNC != "incremental" or is_current(persist_directory, fingerprint)
+    ):
+        return Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    if read_only:
+        return None
+
+    # Load the cleaned data, one document per article, and split it into chunks
+    articles = load_articles(data_file)
+    if not articles:
+        print("No documents loaded. Please check the file.")
+        return None
+    docs = chunk_articles(articles)
+
+    if VECTORSTORE_SYNC == "incremental":
+        vectorstore = Chroma(
+            persist_directory=persist_directory, embedding_function=embeddings
+        )
+        sync_vectorstore(vectorstore, docs, persist_directory, fingerprint)
+        return vectorstore
+    else:
+        vectorstore = Chroma.from_documents(
+            documents=docs, embedding=embeddings, persist_directory=persist_directory
+        )
+        return vectorstore
+
+
+def create_or_load_vector_index(
+    embeddings,
+    fingerprint="",
+    persist_directory=VECTORSTORE_PATH,
+    data_file=DATA_FILE,
+    read_only=False,
+    dtype=VECTOR_DTYPE,
+):
+    """
+    Load the NumPy vector index, or build it if it is missing or from other data.
+
+    Unchanged chunks are not re-embedded when `embeddings` is cached. With
+    `read_only`, `None` is returned until another process has built it.
+    """
+    index = NumpyVectorIndex.load(persist_directory, fingerprint, dtype)
+    if index is not None or read_only:
+        return index
+
+    articles = load_articles(data_file)
+    if not articles:
+        print("No documents loaded. Please check the file.")
+        return None
+    index = NumpyVectorIndex.from_documents(chunk_articles(articles), embeddings, dtype)
+    index.save(persist_directory, fingerprint)
+    return index
+
+
+def setup_retriever(
+    embeddings=None,
+    persist_directory=VECTORSTORE_PATH,
+    data_file=DATA_FILE,
+    k=RETRIEVER_K,
+    read_only=False,
+    backend=VECTOR_BACKEND,
+):
+    """
+    Set up embeddings, vector store and retriever. Blocking, run it off the event loop.
+
+    `backend` is "chroma" for a Chroma vector store or "numpy" for an
+    in-process `NumpyVectorIndex`.
+    """
+    embeddings = embeddings or create_or_load_embeddings()
+    fingerprint = f"{knowledge_base_version(data_file)}:{chunking_settings()}"
+    if backend == "numpy":
+        vector_index = create_or_load_vector_index(
+            embeddings, fingerprint, persist_directory, data_file, read_only
+        )
+        if vector_index is None:
+            return None
+        vector_retriever = NumpyRetriever(index=vector_index, embeddings=embeddings, k=k)
+    else:
+        vectorstore = create_or_load_vectorstore(
+            embeddings, fingerprint, persist_directory, data_file, read_only
+        )
+        if vectorstore is None:
+            return None
+        vector_retriever = VectorStoreScoreRetriever(vectorstore=vectorstore, k=k)
+
+    # Lexical index over the same chunks, rebuilt whenever the vector store changes
+    bm25_file = os.path.join(persist_directory, BM25_FILE)
+    index = BM25Index.load(bm25_file, fingerprint)
+    if index is None:
+        if read_only:
+            return None
+        if backend == "numpy":
+            index = BM25Index(vector_index.docs)
+        else:
+            index = BM25Index.from_vectorstore(vectorstore)
+        index.save(bm25_file, fingerprint)
+
+    return HybridRetriever(vector_retriever=vector_retriever, index=index, k=k)
+
+
+def setup_rag_chain(retriever=None, llm=None):
+    """Set up the RAG chain."""
+    if retriever is None:
+        retriever = setup_retriever()
+        if retriever is None:
+            return None
+
+    # Set up the language model for responses
+    if llm is None:
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash", temperature=0.3, max_tokens=500
+        )
+
+    system_prompt = (
+        "You are a helpdesk chatbot designed to provide support using relevant articles from the Stackup Help Center. Your role is to:\n"
+        "1. Provide solutions by retrieving and referencing information from the knowledge base articles.\n"
+        "2. Answer queries based on factual and relevant content from these articles.\n"
+        "3. Guide users through step-by-step troubleshooting and reference related articles.\n"
+        "4. Please ensure accuracy in your responses and avoid any assumptions. Only provide information that is explicitly mentioned in the articles provided.\n"
+        "5. Structure responses clearly by summarizing key points from articles, providing article links for more details, and using a helpful, professional tone.\n"
+        "6. If unsure, suggest the user seeks further help from the server's moderator if an article does not cover their issue\n"
+        "7. Please format all links as [text](URL) without any additional attributes, and create a descriptive text for each link.\n"
+        "8. If a user asks to calculate an estimated date for withdrawal, kindly inform them to use the </calculate_withdrawal:1321343083690070019> command. For all other inquiries related to withdrawal, respond in accordance with your usual process.\n"
+        "9. The articles are structured as follows: \n"
+        "  - Title: This is the title of the article.\n"
+        "  - URL: This is the URL to access the article online.\n"
+        "  - Body: This is the detailed content of the article, containing the full information, instructions, and related steps.\n"
+        "10. Be grammatically correct.\n\n"
+        "{context}"
+    )
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", "{input}"),
+        ]
+    )
+
+    # Create the retrieval chain, trimming the retrieved chunks to the context budget
+    question_answer_chain = create_stuff_documents_chain(llm, prompt)
+    rag_chain = create_retrieval_chain(
+        ContextBudgetRetriever(retriever=retriever), question_answer_chain
+    )
+
+    return rag_chain
+
+
+def knowledge_base_version(file_path=DATA_FILE):
+    """Fingerprint the knowledge base so cached answers can be invalidated when it changes."""
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def answer_cache_version():
+    """Cached answers and question vectors depend on both the data and the embedding model."""
+    return f"{knowledge_base_version()}:{embeddings_slug(EMBEDDINGS_CONFIG)}"
+
+
+def embedding_cache_stats():
+    """Embedding cache counters, once the embeddings have been created."""
+    return embeddings.stats() if embeddings else None
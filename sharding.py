@@ -0,0 +1,97 @@
+import os
+import sys
+import argparse
+import subprocess
+import discord
+
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0) or None  # None lets Discord recommend one
+SHARD_IDS = os.getenv("SHARD_IDS", "")  # Shards run by this process, e.g. "0,1"; empty for all
+PROCESS_INDEX = int(os.getenv("PROCESS_INDEX") or 0)
+BASE_PORT = int(os.getenv("PORT", 5000))
+
+
+def is_primary() -> bool:
+    """
+    Whether this is the first (or only) process.
+
+    The primary process builds and refreshes the shared index, persists the
+    answer cache and syncs the slash commands; the others only read them.
+    """
+    return PROCESS_INDEX == 0
+
+
+def shard_ids(value: str = SHARD_IDS) -> list[int] | None:
+    """Parse a comma-separated list of shard IDs; `None` when empty."""
+    ids = [int(x) for x in value.split(",") if x.strip()]
+    return ids or None
+
+
+def bot_intents() -> discord.Intents:
+    """
+    Only the gateway events the bot uses.
+
+    Slash commands need the guilds intent and `!ask` needs guild and direct
+    messages with their content. Member, presence, typing, reaction and voice
+    events aren't used, so they aren't sent to the bot at all.
+    """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    return intents
+
+
+def assign_shards(shard_count: int, processes: int) -> list[list[int]]:
+    """Split the shards into contiguous, nearly equal groups, one per process."""
+    processes = min(processes, shard_count)
+    size, extra = divmod(shard_count, processes)
+    groups = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (i < extra)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def launch(shard_count: int, processes: int, base_port: int = BASE_PORT, script: str = "main.py"):
+    """
+    Run the bot as `processes` processes, each with its share of the shards.
+
+    Each process serves its own web server on `base_port + PROCESS_INDEX`
+    and logs to its own file. Stops all of them on Ctrl+C.
+    """
+    children = []
+    for index, ids in enumerate(assign_shards(shard_count, processes)):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=",".join(map(str, ids)),
+            PROCESS_INDEX=str(index),
+            PORT=str(base_port + index),
+        )
+        print(f"Starting process {index} with shards {ids} on port {base_port + index}")
+        children.append(subprocess.Popen([sys.executable, script], env=env))
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded processes.")
+    parser.add_argument("--shards", type=int, required=True, help="Total number of shards")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=BASE_PORT, help="Port of the first process")
+    args = parser.parse_args()
+    launch(args.shards, args.processes, args.port)
+
+
+if __name__ == "__main__":
+    main()
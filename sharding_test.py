@@ -0,0 +1,27 @@
+import unittest
+from sharding import assign_shards, bot_intents, shard_ids
+
+
+class ShardingTest(unittest.TestCase):
+
+    def test_shards_are_split_evenly(self):
+        self.assertEqual(assign_shards(5, 2), [[0, 1, 2], [3, 4]])
+        self.assertEqual(assign_shards(4, 4), [[0], [1], [2], [3]])
+        # Never more processes than shards
+        self.assertEqual(assign_shards(2, 3), [[0], [1]])
+
+    def test_shard_ids(self):
+        self.assertEqual(shard_ids("2, 3"), [2, 3])
+        self.assertIsNone(shard_ids(""))
+
+    def test_only_used_intents(self):
+        intents = bot_intents()
+        self.assertTrue(intents.guilds and intents.guild_messages and intents.message_content)
+        # `!ask` also works in direct messages
+        self.assertTrue(intents.dm_messages)
+        self.assertFalse(intents.members or intents.presences or intents.typing)
+        self.assertFalse(intents.guild_reactions or intents.voice_states or intents.dm_typing)
+
+
+if __name__ == "__main__":
+    unittest.main()
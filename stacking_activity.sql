@@ -0,0 +1,23 @@
+-- Run once in the Supabase SQL editor. activity_writer.py adds per-user deltas
+-- to stacking_activity in a single atomic statement; work_tracking.py reads the
+-- report a page at a time.
+
+create unique index if not exists stacking_activity_username_key
+    on stacking_activity (username);
+
+-- The report fetches users above or below the milestone count separately
+create index if not exists stacking_activity_count_idx
+    on stacking_activity (count);
+
+create or replace function increment_stacking_activity(deltas jsonb)
+returns void
+language sql
+as $$
+    insert into stacking_activity (username, coins_earned, count, modified_at)
+    select d.username, d.coins_earned, d.count, now()
+    from jsonb_to_recordset(deltas) as d(username text, coins_earned integer, count integer)
+    on conflict (username) do update set
+        coins_earned = stacking_activity.coins_earned + excluded.coins_earned,
+        count = stacking_activity.count + excluded.count,
+        modified_at = excluded.modified_at;
+$$;
@@ -0,0 +1,86 @@
+import os
+import time
+
+
+DISCORD_MESSAGE_LIMIT = 2000
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.0))
+
+
+def split_point(text: str, limit: int) -> int:
+    """Find where to cut `text` to fit in `limit` characters, preferring line then word breaks."""
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, 0, limit)
+        if cut > limit // 2:
+            return cut
+    return limit
+
+
+class StreamingReply:
+    """
+    Shows an answer in Discord while it is being generated.
+
+    Text passed to `feed` is accumulated and the current message is edited at
+    most once per `interval` seconds, to stay clear of Discord's edit rate
+    limit. Once the text grows past `limit` characters the current message is
+    completed and the rest continues in a new one.
+
+    `send` is a coroutine function creating a message from its content and
+    returning it; the message must support `await message.edit(content=...)`.
+    """
+
+    def __init__(
+        self,
+        send,
+        interval: float = STREAM_EDIT_INTERVAL,
+        limit: int = DISCORD_MESSAGE_LIMIT,
+        clock=time.monotonic,
+    ):
+        self.send = send
+        self.interval = interval
+        self.limit = limit
+        self.clock = clock
+        self.text = ""
+        self.messages = []
+        self._current = None
+        self._buffer = ""
+        self._shown = ""
+        self._last_update = None
+
+    async def feed(self, token: str):
+        """Add generated text, updating Discord if the last update is old enough."""
+        self.text += token
+        self._buffer += token
+        await self._roll()
+        if self._last_update is None or self.clock() - self._last_update >= self.interval:
+            await self._show(self._buffer)
+
+    async def status(self, content: str):
+        """Show `content` until the answer starts, which replaces it in the same message."""
+        if not self.text:
+            await self._show(content)
+
+    async def finish(self, suffix: str = ""):
+        """Append `suffix` and show the complete answer."""
+        self._buffer += suffix
+        await self._roll()
+        await self._show(self._buffer)
+
+    async def _roll(self):
+        """Complete the current message and start a new one while the text is over the limit."""
+        while len(self._buffer) > self.limit:
+            cut = split_point(self._buffer, self.limit)
+            await self._show(self._buffer[:cut])
+            self._current = None
+            self._shown = ""
+            self._buffer = self._buffer[cut:].lstrip()
+
+    async def _show(self, content: str):
+        if not content.strip() or content == self._shown:
+            return
+        if self._current is None:
+            self._current = await self.send(content)
+            self.messages.append(self._current)
+        else:
+            await self._current.edit(content=content)
+        self._shown = content
+        self._last_update = self.clock()
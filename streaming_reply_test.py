@@ -0,0 +1,73 @@
+import unittest
+from streaming_reply import StreamingReply
+
+
+class FakeMessage:
+
+    def __init__(self, content):
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content):
+        self.content = content
+        self.edits += 1
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StreamingReplyTest(unittest.IsolatedAsyncioTestCase):
+
+    async def send(self, content):
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+    def setUp(self):
+        self.sent = []
+        self.clock = FakeClock()
+
+    async def test_edits_are_throttled(self):
+        reply = StreamingReply(self.send, interval=1.0, clock=self.clock)
+        for token in ["Hello", " there", ",", " friend"]:
+            await reply.feed(token)
+            self.clock.now += 0.4
+        await reply.finish("!")
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0].content, "Hello there, friend!")
+        self.assertEqual(self.sent[0].edits, 2)
+
+    async def test_rolls_into_new_messages_past_limit(self):
+        reply = StreamingReply(self.send, interval=0, limit=20, clock=self.clock)
+        for word in "one two three four five six seven eight nine ten".split():
+            await reply.feed(word + " ")
+        await reply.finish("\n-# note")
+
+        self.assertTrue(all(len(m.content) <= 20 for m in self.sent))
+        self.assertEqual(
+            " ".join(m.content for m in self.sent).split(),
+            "one two three four five six seven eight nine ten \n-# note".split(),
+        )
+
+    async def test_status_is_replaced_by_the_answer(self):
+        reply = StreamingReply(self.send, interval=0, clock=self.clock)
+        await reply.status("You're #2 in line")
+        self.assertEqual(self.sent[0].content, "You're #2 in line")
+        await reply.feed("Withdrawals take")
+        await reply.status("You're #1 in line")  # Ignored once the answer has started
+        await reply.finish(" 7 business days.")
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0].content, "Withdrawals take 7 business days.")
+        self.assertEqual(reply.text, "Withdrawals take")
+
+
+if __name__ == "__main__":
+    unittest.main()
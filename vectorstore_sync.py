@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import logging
+from langchain_core.documents import Document
+
+
+MANIFEST_FILE = "manifest.json"
+
+
+def content_hash(text: str) -> str:
+    """Hash the content of a chunk."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def article_key(doc: Document) -> str:
+    """Identify the article a chunk belongs to."""
+    metadata = doc.metadata
+    return str(
+        metadata.get("article_id") or metadata.get("url") or metadata.get("source", "")
+    )
+
+
+def chunk_ids(docs: list[Document]) -> list[str]:
+    """
+    Build a stable ID for each chunk from its article and content hash.
+
+    Identical chunks within one article get an occurrence suffix so IDs stay unique.
+    """
+    ids = []
+    seen = {}
+    for doc in docs:
+        key = f"{article_key(doc)}:{content_hash(doc.page_content)}"
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}:{seen[key]}"
+        ids.append(hashlib.sha1(key.encode("utf-8")).hexdigest())
+    return ids
+
+
+def load_manifest(persist_directory: str) -> dict:
+    """Load the chunk manifest of a persisted vector store."""
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading vector store manifest: {e}")
+        return {}
+
+
+def save_manifest(persist_directory: str, manifest: dict):
+    """Persist the chunk manifest next to the vector store."""
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def is_current(persist_directory: str, fingerprint: str) -> bool:
+    """Check whether the persisted vector store was synced from data with this fingerprint."""
+    return bool(fingerprint) and load_manifest(persist_directory).get("fingerprint") == fingerprint
+
+
+def sync_vectorstore(
+    vectorstore, docs: list[Document], persist_directory: str, fingerprint: str = ""
+) -> dict:
+    """
+    Bring a persisted vector store in line with `docs`.
+
+    Only chunks that are new or changed are embedded, and chunks that no
+    longer exist (edited or removed articles) are deleted. `fingerprint`
+    identifies the source data and is recorded in the manifest for
+    `is_current`. Returns a summary with the number of added, deleted and
+    unchanged chunks.
+    """
+    ids = chunk_ids(docs)
+    manifest = load_manifest(persist_directory)
+    if "chunks" in manifest:
+        existing = set(manifest["chunks"])
+    else:
+        # No manifest yet, e.g. a store built before syncing existed
+        existing = set(vectorstore.get(include=[])["ids"])
+
+    wanted = dict(zip(ids, docs))
+    to_delete = sorted(existing - wanted.keys())
+    to_add = [i for i in ids if i not in existing]
+
+    if to_delete:
+        vectorstore.delete(ids=to_delete)
+    if to_add:
+        vectorstore.add_documents([wanted[i] for i in to_add], ids=to_add)
+
+    save_manifest(
+        persist_directory,
+        {
+            "fingerprint": fingerprint,
+            "chunks": {
+                i: {"article": article_key(doc), "hash": content_hash(doc.page_content)}
+                for i, doc in wanted.items()
+            }
+        },
+    )
+
+    summary = {
+        "added": len(to_add),
+        "deleted": len(to_delete),
+        "unchanged": len(ids) - len(to_add),
+    }
+    logging.info(f"Vector store synced: {summary}")
+    return summary
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+from langchain_core.documents import Document
+from vectorstore_sync import sync_vectorstore
+
+
+class FakeVectorStore:
+
+    def __init__(self):
+        self.docs = {}
+        self.embedded = 0
+
+    def get(self, include=None):
+        return {"ids": list(self.docs)}
+
+    def delete(self, ids):
+        for i in ids:
+            del self.docs[i]
+
+    def add_documents(self, docs, ids):
+        self.embedded += len(docs)
+        self.docs.update(zip(ids, docs))
+
+
+def article(url, body):
+    return Document(page_content=body, metadata={"url": url})
+
+
+class SyncVectorStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.persist_directory = tmp.name
+        self.store = FakeVectorStore()
+
+    def test_only_delta_is_embedded(self):
+        docs = [article("a", "first"), article("b", "second"), article("c", "third")]
+        self.assertEqual(
+            sync_vectorstore(self.store, docs, self.persist_directory),
+            {"added": 3, "deleted": 0, "unchanged": 0},
+        )
+
+        docs = [article("a", "first"), article("b", "second, edited"), article("d", "new")]
+        self.assertEqual(
+            sync_vectorstore(self.store, docs, self.persist_directory),
+            {"added": 2, "deleted": 2, "unchanged": 1},
+        )
+        self.assertEqual(self.store.embedded, 5)
+        self.assertEqual(
+            sorted(d.page_content for d in self.store.docs.values()),
+            ["first", "new", "second, edited"],
+        )
+
+    def test_duplicate_chunks_get_unique_ids(self):
+        docs = [article("a", "same"), article("a", "same")]
+        sync_vectorstore(self.store, docs, self.persist_directory)
+        self.assertEqual(len(self.store.docs), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,18 +2,27 @@ import os, re
 import discord
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.date import DateTrigger
-from datetime import datetime, time, timedelta, timezone
 from supabase import create_client, Client
+from activity_writer import ActivityWriter
+from message_journal import MessageJournal
+from streaming_reply import DISCORD_MESSAGE_LIMIT
 
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 
 supabase: Client = create_client(url, key)
+journal = MessageJournal()
+writer = ActivityWriter(supabase, journal)
 
 USER_PATTERN = re.compile(r"^[a-zA-Z0-9_\.]{2,32}")
 COIN_EARNED_PATTERN = re.compile(r"(?<=You gain\s)\d+(?=\s<:Stackcoin:)")
-track = {}
+# Per-user totals, restored from the journal after a restart
+track = journal.totals
+
+MILESTONE_COUNT = 7
+MILESTONE_REWARD = 1200
+REWARD_PER_COUNT = 100
+REPORT_PAGE_SIZE = int(os.getenv("REPORT_PAGE_SIZE", 1000))
 
 scheduler = AsyncIOScheduler()
 
@@ -32,97 +41,75 @@ async def embeds_processing(embeds: discord.Embed, message_id: int):
             coins = coins_match.group(0) if coins_match else None
 
             if user and coins:
-                await upsert_user_data(user, int(coins), message_id)
-                if user not in track:
-                    track[user] = {"coins": int(coins), "count": 1}
-                else:
-                    track[user]["coins"] += int(coins)
-                    track[user]["count"] += 1
-
-
-async def upsert_user_data(
-    username: str,
-    coins_earned: int,
-    message_id: int,
-    count: int = 1,
-):
+                # Counted once per message, even if it is processed again
+                writer.add(user, int(coins), message_id)
+
+
+async def report_lines(milestone: bool):
     """
-    Upsert user activity into the database.
+    Yield the `!give-coins` lines of the users who did (or didn't) reach the milestone.
+
+    Only the matching rows and the columns needed are fetched, a page at a
+    time and off the event loop, so the report never holds the whole table.
     """
-    try:
-        existing_data = (
-            supabase.table("stacking_activity")
-            .select("*")
-            .eq("username", username)
-            .execute()
-        )
-        if existing_data.data:
-            supabase.table("stacking_activity").update(
-                {
-                    "coins_earned": existing_data.data[0]["coins_earned"]
-                    + coins_earned,
-                    "count": existing_data.data[0]["count"] + count,
-                    "modified_at": datetime.now(timezone.utc).isoformat(),
-                }
-            ).eq("username", username).execute()
-
-            supabase.table("message_tracking").insert(
-                {
-                    "username": username,
-                    "message_id": message_id,
-                }
-            ).execute()
+    start = 0
+    while True:
+        query = supabase.table("stacking_activity").select("username,count")
+        if milestone:
+            query = query.gte("count", MILESTONE_COUNT)
         else:
-            supabase.table("stacking_activity").insert(
-                {
-                    "username": username,
-                    "coins_earned": coins_earned,
-                    "count": count,
-                }
-            ).execute()
-
-            supabase.table("message_tracking").insert(
-                {
-                    "username": username,
-                    "message_id": message_id,
-                }
-            ).execute()
-    except Exception as e:
-        print(f"Error upserting user data: {e}")
+            query = query.lt("count", MILESTONE_COUNT)
+        query = query.order("username").range(start, start + REPORT_PAGE_SIZE - 1)
+        page = await asyncio.to_thread(query.execute)
 
+        for user in page.data:
+            coins = MILESTONE_REWARD if milestone else user["count"] * REWARD_PER_COUNT
+            yield f"!give-coins @{user['username']} {coins}"
+        if len(page.data) < REPORT_PAGE_SIZE:
+            return
+        start += REPORT_PAGE_SIZE
 
-async def generate_report():
-    try:
-        data = supabase.table("stacking_activity").select("*").execute()
-
-        if data.data:
-            milestone_achieved_lines = []
-            milestone_not_achieved_lines = []
-
-            for user in data.data:
-                if user["count"] >= 7:
-                    milestone_achieved_lines.append(
-                        f"!give-coins @{user['username']} 1200"
-                    )
-                else:
-                    milestone_not_achieved_lines.append(
-                        f"!give-coins @{user['username']} {user['count'] * 100}"
-                    )
-
-            milestone_achieved_report = (
-                "\n".join(milestone_achieved_lines)
-                if milestone_not_achieved_lines
-                else ""
-            )
-            milestone_not_achieved_report = (
-                "\n".join(milestone_not_achieved_lines)
-                if milestone_not_achieved_lines
-                else ""
-            )
-            return milestone_achieved_report, milestone_not_achieved_report
-        else:
-            return "No data available for generating the report.", ""
 
+async def send_code_blocks(send, heading: str, lines, limit: int = DISCORD_MESSAGE_LIMIT) -> int:
+    """
+    Send lines from an async iterator in code blocks under `heading`.
+
+    A message is sent as soon as the next line would take it past `limit`,
+    and the rest continue in a new code block. Returns the number of lines.
+    """
+    prefix = f"{heading}\n```\n"
+    block = []
+    size = len(prefix) + 3
+    count = 0
+    async for line in lines:
+        if block and size + len(line) + 1 > limit:
+            await send(prefix + "\n".join(block) + "```")
+            prefix, block = "```\n", []
+            size = len(prefix) + 3
+        block.append(line)
+        size += len(line) + 1
+        count += 1
+    if block:
+        await send(prefix + "\n".join(block) + "```")
+    return count
+
+
+async def send_report(send, title: str, milestone_heading: str, other_heading: str):
+    """
+    Send the coin report through `send` (e.g. `channel.send`), split to fit Discord's limit.
+
+    `title` goes above the first section with any users.
+    """
+    try:
+        # Include activity that is still waiting to be written
+        await writer.flush()
+        count = 0
+        for heading, milestone in ((milestone_heading, True), (other_heading, False)):
+            if not count:
+                heading = f"{title}\n{heading}"
+            count += await send_code_blocks(send, heading, report_lines(milestone))
+        if not count:
+            await send("No data available for generating the report.")
     except Exception as e:
         print(f"Error generating report: {e}")
-        return "An error occurred while generating the report.", ""
+        await send("An error occurred while generating the report.")
@@ -0,0 +1,51 @@
+import os
+import asyncio
+import unittest
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test")
+
+import work_tracking
+from fake_supabase import FakeSupabase
+
+
+class ReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.supabase = work_tracking.supabase
+        self.page_size = work_tracking.REPORT_PAGE_SIZE
+
+    def tearDown(self):
+        work_tracking.supabase = self.supabase
+        work_tracking.REPORT_PAGE_SIZE = self.page_size
+
+    def send_report(self, rows):
+        work_tracking.supabase = FakeSupabase({"stacking_activity": rows})
+        sent = []
+
+        async def send(content):
+            sent.append(content)
+
+        asyncio.run(work_tracking.send_report(send, "# Report", "### Milestone", "### Others"))
+        return sent
+
+    def test_report_is_paginated_and_split(self):
+        work_tracking.REPORT_PAGE_SIZE = 50
+        rows = [{"username": f"user{i:03}", "count": i % 10, "coins_earned": 0} for i in range(300)]
+        sent = self.send_report(rows)
+
+        self.assertTrue(all(len(message) <= 2000 for message in sent))
+        self.assertGreater(len(sent), 2)
+        self.assertTrue(sent[0].startswith("# Report\n### Milestone\n```\n!give-coins @user007 1200"))
+        text = "".join(sent)
+        self.assertEqual(text.count("!give-coins"), 300)
+        self.assertIn("### Others\n```\n!give-coins @user000 0", text)
+        self.assertIn("!give-coins @user006 600", text)
+        self.assertGreaterEqual(work_tracking.supabase.pages, 6)
+
+    def test_empty_report(self):
+        self.assertEqual(self.send_report([]), ["No data available for generating the report."])
+
+
+if __name__ == "__main__":
+    unittest.main()